@@ -0,0 +1,218 @@
+# Benchmark de escala do pipeline completo (Raw → Silver → Gold)
+# Para cada volume gera um CSV Raw sintético (synthetic_raw.py), executa
+# etl_raw_to_silver.py e etl_silver_to_gold.py como subprocessos em um projeto
+# temporário e coleta o JSON de métricas de cada execução (etl_metrics.py):
+# vazão, pico de memória e tempo por estágio. O resultado vai para
+# Data Layer/metrics/benchmark_<label>.json, para comparar otimizações entre si.
+#
+# ATENÇÃO: as execuções recarregam silver.* e gold.* do banco configurado
+# (POSTGRES_*); use uma base própria para benchmark.
+#
+# Uso:
+#   python benchmark.py --sizes 100000 1000000 10000000 --label baseline [--start-postgres]
+#   ETL_GOLD_ENGINE=pushdown python benchmark.py --label pushdown
+#   python benchmark.py --compare baseline pushdown
+
+import argparse
+import json
+import os
+import shutil
+import subprocess
+import sys
+import tempfile
+import time
+from datetime import datetime
+from pathlib import Path
+
+from synthetic_raw import generate_raw_csv
+
+TRANSFORMER_PATH = Path(__file__).resolve().parent
+REPO_ROOT = TRANSFORMER_PATH.parent.parent
+METRICS_PATH = REPO_ROOT / 'Data Layer' / 'metrics'
+WORK_PATH = Path(os.getenv("ETL_BENCH_DIR", Path(tempfile.gettempdir()) / 'sbd2_benchmark'))
+DEFAULT_SIZES = [100_000, 1_000_000, 10_000_000]
+PIPELINES = [('raw_to_silver', 'etl_raw_to_silver.py'), ('silver_to_gold', 'etl_silver_to_gold.py')]
+
+
+def prepare_project(work_path):
+    # Projeto mínimo com a estrutura "Data Layer" e os DDLs/SQL atuais do repositório
+    for layer in ['silver', 'gold']:
+        target = work_path / 'Data Layer' / layer
+        target.mkdir(parents=True, exist_ok=True)
+        for sql in (REPO_ROOT / 'Data Layer' / layer).glob('*.sql'):
+            shutil.copy(sql, target / sql.name)
+    (work_path / 'Data Layer' / 'raw').mkdir(parents=True, exist_ok=True)
+    shutil.rmtree(work_path / 'Data Layer' / 'metrics', ignore_errors=True)
+
+
+def raw_for_size(work_path, rows, seed):
+    # CSVs gerados ficam em cache por (linhas, seed); o ativo é copiado para data_raw.csv
+    cached = work_path / 'cache' / f"raw_{rows}_{seed}.csv"
+    if not cached.exists():
+        print(f"Gerando Raw sintético: {rows:,} linhas")
+        generate_raw_csv(cached, rows, seed=seed)
+    raw_path = work_path / 'Data Layer' / 'raw' / 'data_raw.csv'
+    raw_path.unlink(missing_ok=True)
+    try:
+        os.link(cached, raw_path)
+    except OSError:
+        shutil.copy(cached, raw_path)
+    return raw_path
+
+
+def wait_for_postgres(timeout=60):
+    import psycopg2
+
+    deadline = time.time() + timeout
+    while True:
+        try:
+            psycopg2.connect(
+                dbname=os.getenv("POSTGRES_DB", "crime_data"), user=os.getenv("POSTGRES_USER", "postgres"),
+                password=os.getenv("POSTGRES_PASSWORD", "postgres"), host=os.getenv("POSTGRES_HOST", "localhost"),
+                port=os.getenv("POSTGRES_PORT", "5432"),
+            ).close()
+            return
+        except psycopg2.OperationalError:
+            if time.time() > deadline:
+                raise
+            time.sleep(1)
+
+
+def start_postgres():
+    print("Subindo PostgreSQL (docker compose)...")
+    subprocess.run(['docker', 'compose', 'up', '-d', 'postgres'], cwd=REPO_ROOT, check=True)
+    wait_for_postgres()
+
+
+def run_pipeline(work_path, pipeline, script, log_path):
+    metrics_dir = work_path / 'Data Layer' / 'metrics'
+    before = set(metrics_dir.glob(f"{pipeline}_*.json"))
+    # Cache de estágios desligado: toda execução mede o pipeline inteiro, mesmo com
+    # o banco já carregado com o mesmo volume por uma execução anterior
+    env = {**os.environ, 'ETL_METRICS': 'true', 'ETL_STAGE_CACHE': 'false', 'PYTHONUNBUFFERED': '1'}
+
+    start = time.perf_counter()
+    with open(log_path, 'w', encoding='utf-8') as log:
+        result = subprocess.run([sys.executable, str(TRANSFORMER_PATH / script)], cwd=work_path, env=env,
+                                stdout=log, stderr=subprocess.STDOUT)
+    wall = time.perf_counter() - start
+    if result.returncode != 0:
+        raise RuntimeError(f"{script} falhou (código {result.returncode}); log em {log_path}")
+
+    new = sorted(set(metrics_dir.glob(f"{pipeline}_*.json")) - before)
+    if not new:
+        raise RuntimeError(f"{script} não gravou métricas em {metrics_dir}")
+    run = json.loads(new[-1].read_text(encoding='utf-8'))
+    run['process_wall_seconds'] = wall
+    return run
+
+
+def summarize(rows, run):
+    wall = run['wall_seconds']
+    return {
+        'rows': rows,
+        'wall_seconds': round(wall, 3),
+        'process_wall_seconds': round(run['process_wall_seconds'], 3),
+        'cpu_seconds': round(run['cpu_seconds'], 3),
+        'rows_per_second': round(rows / wall, 1) if wall else None,
+        'peak_rss_mb': round(run['peak_rss_mb'], 1) if run['peak_rss_mb'] is not None else None,
+        'run_id': run['run_id'],
+        'stages': {s['name']: {'wall_seconds': round(s['wall_seconds'], 4), 'cpu_seconds': round(s['cpu_seconds'], 4),
+                               'calls': s['calls'], 'rows_in': s['rows_in'], 'rows_out': s['rows_out']}
+                   for s in run['stages']},
+    }
+
+
+def git_revision():
+    try:
+        return subprocess.run(['git', 'rev-parse', '--short', 'HEAD'], cwd=REPO_ROOT, capture_output=True,
+                              text=True, check=True).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def print_report(results):
+    print(f"\n{'Volume':>12} {'Pipeline':<16} {'Tempo (s)':>10} {'CPU (s)':>9} {'Linhas/s':>12} {'Pico RSS (MB)':>14}")
+    for size in results['sizes']:
+        for pipeline, r in size['pipelines'].items():
+            rss = f"{r['peak_rss_mb']:.0f}" if r['peak_rss_mb'] is not None else '-'
+            print(f"{size['rows']:>12,} {pipeline:<16} {r['wall_seconds']:>10.2f} {r['cpu_seconds']:>9.2f} "
+                  f"{r['rows_per_second']:>12,.0f} {rss:>14}")
+            top = sorted(r['stages'].items(), key=lambda kv: -kv[1]['wall_seconds'])[:5]
+            print(f"{'':>30}" + ', '.join(f"{name} {s['wall_seconds']:.2f}s" for name, s in top))
+
+
+def result_path(label):
+    return METRICS_PATH / f"benchmark_{label}.json"
+
+
+def compare(label_a, label_b):
+    # Compara duas execuções do benchmark por volume, pipeline e estágio
+    a, b = (json.loads(result_path(label).read_text(encoding='utf-8')) for label in (label_a, label_b))
+    b_sizes = {s['rows']: s for s in b['sizes']}
+    print(f"Comparação: {label_a} → {label_b}")
+    for size_a in a['sizes']:
+        size_b = b_sizes.get(size_a['rows'])
+        if size_b is None:
+            continue
+        for pipeline, ra in size_a['pipelines'].items():
+            rb = size_b['pipelines'].get(pipeline)
+            if rb is None:
+                continue
+            speedup = ra['wall_seconds'] / rb['wall_seconds'] if rb['wall_seconds'] else float('nan')
+            print(f"\n{size_a['rows']:,} linhas, {pipeline}: {ra['wall_seconds']:.2f}s → {rb['wall_seconds']:.2f}s "
+                  f"({speedup:.2f}x), pico RSS {ra['peak_rss_mb']} → {rb['peak_rss_mb']} MB")
+            for name in sorted(set(ra['stages']) | set(rb['stages']),
+                               key=lambda n: -max(ra['stages'].get(n, {}).get('wall_seconds', 0),
+                                                  rb['stages'].get(n, {}).get('wall_seconds', 0))):
+                wa = ra['stages'].get(name, {}).get('wall_seconds')
+                wb = rb['stages'].get(name, {}).get('wall_seconds')
+                print(f"   {name:<32} {'-' if wa is None else f'{wa:.3f}s':>10} → {'-' if wb is None else f'{wb:.3f}s':>10}")
+
+
+def run_benchmark(sizes, label, seed, work_path):
+    prepare_project(work_path)
+    results = {
+        'label': label,
+        'started_at': datetime.now().isoformat(),
+        'git_revision': git_revision(),
+        'seed': seed,
+        'env': {k: v for k, v in os.environ.items() if k.startswith('ETL_')},
+        'sizes': [],
+    }
+
+    for rows in sizes:
+        raw_for_size(work_path, rows, seed)
+        size_result = {'rows': rows, 'pipelines': {}}
+        for pipeline, script in PIPELINES:
+            print(f"Executando {script} com {rows:,} linhas...")
+            log_path = work_path / f"{pipeline}_{rows}.log"
+            run = run_pipeline(work_path, pipeline, script, log_path)
+            size_result['pipelines'][pipeline] = summarize(rows, run)
+            print(f"   {run['wall_seconds']:.2f}s, {rows / run['wall_seconds']:,.0f} linhas/s (log: {log_path})")
+        results['sizes'].append(size_result)
+
+    METRICS_PATH.mkdir(parents=True, exist_ok=True)
+    path = result_path(label)
+    path.write_text(json.dumps(results, indent=2), encoding='utf-8')
+    print_report(results)
+    print(f"\nResultado: {path}")
+    return results
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description="Benchmark de escala do pipeline Raw → Silver → Gold.")
+    parser.add_argument('--sizes', type=int, nargs='+', default=DEFAULT_SIZES)
+    parser.add_argument('--label', default=datetime.now().strftime('%Y%m%d_%H%M%S'))
+    parser.add_argument('--seed', type=int, default=42)
+    parser.add_argument('--work-dir', type=Path, default=WORK_PATH)
+    parser.add_argument('--start-postgres', action='store_true', help="sobe o serviço postgres do docker-compose.yml")
+    parser.add_argument('--compare', nargs=2, metavar=('LABEL_A', 'LABEL_B'))
+    args = parser.parse_args()
+
+    if args.compare:
+        compare(*args.compare)
+    else:
+        if args.start_postgres:
+            start_postgres()
+        run_benchmark(args.sizes, args.label, args.seed, args.work_dir)
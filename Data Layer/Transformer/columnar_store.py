@@ -0,0 +1,211 @@
+# Armazenamento colunar (Parquet)
+# Snapshot da Raw, cópia de silver.crimes e backups da Gold em Parquet: strings
+# com dictionary encoding e compressão por coluna (zstd no texto, snappy nas
+# colunas numéricas/datas). pyarrow só é exigido quando o formato Parquet é usado.
+
+import os
+from pathlib import Path
+
+import pandas as pd
+from sqlalchemy import text
+
+try:
+    import pyarrow as pa
+    import pyarrow.csv as pa_csv
+    import pyarrow.parquet as pq
+except ImportError:
+    pa = pa_csv = pq = None
+
+STORAGE_FORMAT = os.getenv("ETL_STORAGE_FORMAT", "csv").lower()  # 'csv' ou 'parquet'
+TEXT_CODEC = os.getenv("ETL_PARQUET_TEXT_CODEC", "zstd")
+NUMERIC_CODEC = os.getenv("ETL_PARQUET_NUMERIC_CODEC", "snappy")
+
+
+def require_pyarrow():
+    if pa is None:
+        raise ImportError("Formato Parquet requer o pacote pyarrow (pip install pyarrow).")
+
+
+def is_text(field):
+    return pa.types.is_string(field.type) or pa.types.is_large_string(field.type) or pa.types.is_dictionary(field.type)
+
+
+def write_options(schema):
+    return {
+        'compression': {f.name: TEXT_CODEC if is_text(f) else NUMERIC_CODEC for f in schema},
+        'use_dictionary': [f.name for f in schema if is_text(f)],
+    }
+
+
+def write_arrow_table(table, path):
+    # Grava em arquivo temporário e renomeia: leitores nunca veem um arquivo parcial
+    path = Path(path)
+    tmp = path.with_name(path.name + '.tmp')
+    pq.write_table(table, tmp, **write_options(table.schema))
+    os.replace(tmp, path)
+
+
+def write_parquet(df, path):
+    require_pyarrow()
+    write_arrow_table(pa.Table.from_pandas(df, preserve_index=False), path)
+
+
+class ParquetAppender:
+    # Grava lotes sucessivos em um único arquivo. Os lotes são convertidos para o
+    # schema (ex.: sk_* float com NaN → int64 com nulos). Sem schema explícito ele
+    # vem do primeiro lote: uma coluna só com nulos nesse lote teria tipo null e
+    # os lotes seguintes com valores falhariam, por isso as exportações passam o
+    # schema das colunas do banco (query_arrow_schema).
+    def __init__(self, path, schema=None):
+        require_pyarrow()
+        self.path = Path(path)
+        self.tmp = self.path.with_name(self.path.name + '.tmp')
+        self.writer = None
+        self.schema = schema
+        self.rows = 0
+
+    def write(self, df):
+        if self.schema is None:
+            self.schema = pa.Table.from_pandas(df, preserve_index=False).schema
+        table = pa.Table.from_pandas(df, schema=self.schema, preserve_index=False)
+        if self.writer is None:
+            self.writer = pq.ParquetWriter(self.tmp, self.schema, **write_options(self.schema))
+        self.writer.write_table(table)
+        self.rows += len(df)
+
+    def close(self):
+        if self.writer is not None:
+            self.writer.close()
+            os.replace(self.tmp, self.path)
+        return self.rows
+
+    def abort(self):
+        # Falha no meio da gravação: fecha o writer e descarta o arquivo temporário
+        # (o arquivo anterior, se houver, continua valendo)
+        if self.writer is not None:
+            self.writer.close()
+            self.writer = None
+        self.tmp.unlink(missing_ok=True)
+
+
+class CsvAppender:
+    def __init__(self, path):
+        self.path = Path(path)
+        self.path.unlink(missing_ok=True)
+        self.rows = 0
+
+    def write(self, df):
+        df.to_csv(self.path, index=False, mode='a', header=not self.path.exists())
+        self.rows += len(df)
+
+    def close(self):
+        return self.rows
+
+    def abort(self):
+        self.path.unlink(missing_ok=True)
+
+
+## Schema Arrow a partir dos tipos do PostgreSQL
+
+def arrow_type(type_code):
+    # OID do tipo PostgreSQL → tipo Arrow equivalente ao que o pandas produz na
+    # leitura (NUMERIC vira float64 no read_sql; texto como large_string)
+    types = {
+        16: pa.bool_(), 17: pa.binary(),
+        20: pa.int64(), 21: pa.int16(), 23: pa.int32(),
+        700: pa.float32(), 701: pa.float64(), 1700: pa.float64(),
+        18: pa.large_string(), 25: pa.large_string(), 1042: pa.large_string(), 1043: pa.large_string(),
+        1082: pa.date32(), 1114: pa.timestamp('us'), 1184: pa.timestamp('us', tz='UTC'),
+    }
+    return types.get(type_code)
+
+
+def query_arrow_schema(engine, sql):
+    # Schema Arrow das colunas de uma consulta (tipos do cursor, sem ler linhas).
+    # None quando algum tipo não tem equivalente: o schema vem do primeiro lote
+    require_pyarrow()
+    with engine.connect() as conn:
+        cursor = conn.connection.dbapi_connection.cursor()
+        try:
+            cursor.execute(f"SELECT * FROM ({sql}) q LIMIT 0")
+            columns = [(col.name, arrow_type(col.type_code)) for col in cursor.description]
+        finally:
+            cursor.close()
+    if any(t is None for _, t in columns):
+        return None
+    return pa.schema(columns)
+
+
+## Backups (Gold)
+
+def backup_path(directory, table, fmt=None):
+    fmt = fmt or STORAGE_FORMAT
+    return Path(directory) / f"{table}.{'parquet' if fmt == 'parquet' else 'csv'}"
+
+
+def save_backup(df, directory, table, fmt=None):
+    path = backup_path(directory, table, fmt)
+    if path.suffix == '.parquet':
+        write_parquet(df, path)
+    else:
+        df.to_csv(path, index=False)
+    return path
+
+
+def open_backup(directory, table, fmt=None, schema=None):
+    # Backup gravado em lotes (ex.: fato_crimes no modo streaming); schema: colunas
+    # da tabela (query_arrow_schema), usado apenas no formato Parquet
+    path = backup_path(directory, table, fmt)
+    return ParquetAppender(path, schema) if path.suffix == '.parquet' else CsvAppender(path)
+
+
+## Raw e Silver
+
+def snapshot_raw_csv(csv_path, parquet_path, source_file_hash):
+    # Converte o CSV Raw com o leitor colunar do pyarrow. O hash do arquivo vai
+    # nos metadados do Parquet: se o snapshot já corresponde ao CSV, nada é feito.
+    require_pyarrow()
+    parquet_path = Path(parquet_path)
+    key = b'source_file_hash'
+    if parquet_path.exists():
+        metadata = pq.read_schema(parquet_path).metadata or {}
+        if metadata.get(key) == source_file_hash.encode():
+            return False
+
+    table = pa_csv.read_csv(csv_path, convert_options=pa_csv.ConvertOptions(strings_can_be_null=True))
+    table = table.replace_schema_metadata({**(table.schema.metadata or {}), key: source_file_hash.encode()})
+    write_arrow_table(table, parquet_path)
+    return True
+
+
+def export_query_parquet(engine, sql, path, chunk_size=100000):
+    # Exporta o resultado da consulta em lotes (cursor server-side) para um Parquet,
+    # com o schema dos tipos das colunas no banco
+    appender = ParquetAppender(path, query_arrow_schema(engine, sql))
+    try:
+        with engine.connect().execution_options(stream_results=True, max_row_buffer=chunk_size) as conn:
+            for chunk in pd.read_sql(text(sql), conn, chunksize=chunk_size):
+                appender.write(chunk)
+    except BaseException:
+        appender.abort()
+        raise
+    return appender.close()
+
+
+def read_parquet_table(path, columns=None, after=None, after_column='collected_at'):
+    # Leitura com projeção de colunas; `after` filtra after_column > after
+    # (pushdown de predicado nos row groups do Parquet)
+    require_pyarrow()
+    filters = [(after_column, '>', after)] if after is not None else None
+    return pd.read_parquet(path, columns=columns, filters=filters)
+
+
+def iter_parquet_chunks(path, chunk_size, columns=None, after=None, after_column='collected_at'):
+    require_pyarrow()
+    parquet_file = pq.ParquetFile(path)
+    for batch in parquet_file.iter_batches(batch_size=chunk_size, columns=columns):
+        chunk = batch.to_pandas()
+        if after is not None:
+            chunk = chunk[chunk[after_column] > after].reset_index(drop=True)
+        if len(chunk):
+            yield chunk
@@ -0,0 +1,535 @@
+# Sketches por área, ano e mês para respostas aproximadas (prévias dos dashboards)
+# Contagens distintas e top-K (tipos de crime distintos por área, armas e locais
+# mais frequentes, ranking de células) exigem varrer a fato inteira. A etapa
+# Silver → Gold guarda, por grupo (sk_area, year, month) e métrica, sketches
+# combináveis em gold.agg_sketches:
+# - HyperLogLog (2^p registradores): contagem distinta; combinar = máximo por
+#   registrador; erro relativo padrão 1,04 / sqrt(2^p);
+# - Count-Min (profundidade d x largura w): frequência de um item; combinar = soma;
+#   nunca subestima e, com probabilidade 1 - e^-d, superestima no máximo e/w * N;
+# - os itens mais frequentes do grupo com a contagem exata (candidatos do top-K e
+#   limite inferior da frequência);
+# e em gold.agg_sketch_sample a amostra dos fatos de menor prioridade por grupo
+# (bottom-k sobre um hash de nk_crime_id): a união das amostras de vários grupos
+# cortada nas k menores prioridades é uma amostra uniforme desses grupos.
+#
+# Os sketches são uma função das contagens (grupo, métrica, item): na carga
+# completa em pandas as contagens saem dos lotes (partial_sketches/merge_sketches);
+# no incremental e no push-down, de um GROUP BY na fato + Silver apenas para os
+# grupos afetados (refresh_sketches). Os itens entram no hash como texto, então os
+# dois caminhos produzem os mesmos sketches.
+#
+# SketchStore carrega os sketches em memória (arrays NumPy empilhados por métrica)
+# e responde com limites de erro em milissegundos, enquanto as consultas exatas rodam.
+#
+# Uso:
+#   python crime_sketches.py distinct crime_types --by area_name
+#   python crime_sketches.py top weapons --k 10 --where year=2023
+#   python crime_sketches.py sample --k 20 --where area_name=Central
+#   python crime_sketches.py --verify
+
+import io
+import json
+import os
+import time
+import zlib
+
+import numpy as np
+import pandas as pd
+from sqlalchemy import text
+
+from db_loader import load_table
+from spatial_grid import GRID_MAX_ZOOM, GRID_ZOOMS, cell_key
+
+GOLD_SKETCHES = os.getenv("ETL_GOLD_SKETCHES", "true").lower() == "true"
+HLL_PRECISION = int(os.getenv("ETL_SKETCH_HLL_PRECISION", "11"))  # 2^p registradores
+CMS_DEPTH = int(os.getenv("ETL_SKETCH_CMS_DEPTH", "4"))
+CMS_WIDTH = int(os.getenv("ETL_SKETCH_CMS_WIDTH", "256"))
+TOPK_CANDIDATES = int(os.getenv("ETL_SKETCH_CANDIDATES", "16"))  # itens exatos guardados por grupo
+SAMPLE_SIZE = int(os.getenv("ETL_SKETCH_SAMPLE", "32"))  # fatos amostrados por grupo
+
+# Nível da grade das células dos hotspots (consulta 17). No nível 16 as células têm
+# poucos fatos por área/mês: as listas de candidatos ficam truncadas e o top-K
+# cai dentro do erro do Count-Min; no 14 os candidatos cobrem quase todos os grupos
+HOTSPOT_ZOOM = int(os.getenv("ETL_SKETCH_HOTSPOT_ZOOM", str(GRID_ZOOMS[1])))
+HOTSPOT_SHIFT = 2 * (GRID_MAX_ZOOM - HOTSPOT_ZOOM)
+
+# Parâmetros que determinam o conteúdo dos sketches (entradas do cache de estágios)
+SKETCH_PARAMS = {
+    'hll_precision': HLL_PRECISION, 'cms_depth': CMS_DEPTH, 'cms_width': CMS_WIDTH,
+    'candidates': TOPK_CANDIDATES, 'sample': SAMPLE_SIZE, 'hotspot_zoom': HOTSPOT_ZOOM,
+}
+
+GROUP_KEYS = ['sk_area', 'year', 'month']
+# Métrica → coluna do item
+SKETCH_METRICS = {
+    'crime_types': 'crime_code',
+    'weapons': 'weapon_description',
+    'premises': 'premise_description',
+    'hotspot_cells': 'cell_key',
+}
+# Colunas da Silver lidas pela Gold apenas para os sketches
+SKETCH_SOURCE_COLUMNS = ['weapon_description', 'premise_description']
+SAMPLE_COLUMNS = [
+    'nk_crime_id', 'sk_crime', 'sk_date', 'sk_time', 'sk_crime_type', 'sk_victim',
+    'latitude', 'longitude', 'grid_key', 'is_violent', 'has_weapon', 'case_closed'
+]
+# Atributos dos grupos usados em filtros e agrupamentos das consultas
+GROUP_ATTRIBUTES = ['sk_area', 'area_name', 'region', 'year', 'month']
+
+# Mistura de 32 bits (xor-shift-multiply) da prioridade da amostra, reproduzida em SQL
+MIX_MULTIPLIER = 0x45d9f3b
+MASK32 = 1 << 32
+
+
+## Hashes
+
+def item_hashes(items):
+    # Hash de 64 bits dos itens (texto)
+    return pd.util.hash_array(np.asarray(items, dtype=object))
+
+
+def item_text(values):
+    # Itens como texto: inteiros sem ".0" (coluna com nulos vira float no pandas)
+    values = pd.Series(values)
+    if isinstance(values.dtype, pd.CategoricalDtype):
+        values = values.astype(values.cat.categories.dtype)
+    if values.dtype.kind in 'iuf':
+        return values.astype('int64').astype(str)
+    return values.astype(str)
+
+
+def sample_priority(ids):
+    x = np.asarray(ids, dtype='int64') % MASK32
+    for _ in range(2):
+        x = ((x ^ (x >> 16)) * MIX_MULTIPLIER) % MASK32
+    return x ^ (x >> 16)
+
+
+def sample_priority_sql(column):
+    # Mesma mistura em SQL (# = xor no PostgreSQL); valores < 2^32 não estouram o BIGINT
+    x = f"({column} % {MASK32})"
+    for _ in range(2):
+        x = f"((({x}) # (({x}) >> 16)) * {MIX_MULTIPLIER} % {MASK32})"
+    return f"(({x}) # (({x}) >> 16))"
+
+
+## HyperLogLog e Count-Min
+
+def bit_length(x):
+    # Número de bits significativos de cada uint64 (exato, sem passar por float)
+    n = np.zeros(len(x), dtype='int64')
+    for shift in (32, 16, 8, 4, 2, 1):
+        high = x >= (np.uint64(1) << np.uint64(shift))
+        n += high * shift
+        x = np.where(high, x >> np.uint64(shift), x)
+    return n + (x > 0)
+
+
+def hll_registers(groups, hashes, n_groups, precision=HLL_PRECISION):
+    # groups: índice do grupo de cada item distinto → (n_groups, 2^p) uint8
+    m = 1 << precision
+    bucket = (hashes >> np.uint64(64 - precision)).astype('int64')
+    rest = hashes & np.uint64((1 << (64 - precision)) - 1)
+    rank = (64 - precision) - bit_length(rest) + 1
+    registers = np.zeros(n_groups * m, dtype='uint8')
+    np.maximum.at(registers, groups * m + bucket, rank.astype('uint8'))
+    return registers.reshape(n_groups, m)
+
+
+def hll_estimate(registers):
+    # Estimativa por linha de registradores, com correção para cardinalidades pequenas
+    registers = np.atleast_2d(registers)
+    m = registers.shape[1]
+    alpha = 0.7213 / (1 + 1.079 / m)
+    raw = alpha * m * m / np.exp2(-registers.astype('float64')).sum(axis=1)
+    zeros = (registers == 0).sum(axis=1)
+    linear = m * np.log(m / np.maximum(zeros, 1))
+    return np.where((raw <= 2.5 * m) & (zeros > 0), linear, raw)
+
+
+def hll_error(precision=HLL_PRECISION):
+    return 1.04 / np.sqrt(1 << precision)
+
+
+def cms_columns(hashes, depth=CMS_DEPTH, width=CMS_WIDTH):
+    # d funções de hash a partir de um hash de 64 bits: h1 + i * h2 (mod w)
+    h1 = hashes & np.uint64(MASK32 - 1)
+    h2 = (hashes >> np.uint64(32)) | np.uint64(1)
+    return np.stack([((h1 + np.uint64(i) * h2) % np.uint64(width)).astype('int64') for i in range(depth)])
+
+
+def cms_counters(groups, hashes, counts, n_groups, depth=CMS_DEPTH, width=CMS_WIDTH):
+    columns = cms_columns(hashes, depth, width)
+    table = np.empty((n_groups, depth, width), dtype='int32')
+    for row in range(depth):
+        table[:, row, :] = np.bincount(groups * width + columns[row], weights=counts,
+                                       minlength=n_groups * width).reshape(n_groups, width)
+    return table
+
+
+def cms_estimate(table, hashes):
+    # table: (d, w) já combinado; mínimo das d linhas para cada item
+    columns = cms_columns(hashes, *table.shape)
+    return table[np.arange(table.shape[0])[:, None], columns].min(axis=0)
+
+
+def cms_error(total, width=CMS_WIDTH):
+    return int(np.ceil(np.e / width * total))
+
+
+def pack(array):
+    buffer = io.BytesIO()
+    np.save(buffer, array, allow_pickle=False)
+    return '\\x' + zlib.compress(buffer.getvalue(), 1).hex()  # literal bytea (hex) para o COPY
+
+
+def unpack(blob):
+    return np.load(io.BytesIO(zlib.decompress(bytes(blob))), allow_pickle=False)
+
+
+## Construção a partir das contagens
+
+def sketch_source(batch, fato):
+    # Colunas dos sketches de um lote: chaves da fato + item de cada métrica
+    grid = fato['grid_key']
+    cells = pd.Series(cell_key(grid.fillna(0).to_numpy('int64'), HOTSPOT_ZOOM)).where(grid.notna().to_numpy())
+    source = pd.DataFrame({
+        'sk_area': fato['sk_area'].to_numpy(),
+        'year': fato['year'].to_numpy(),
+        'month': batch['month'].to_numpy(),
+        'crime_code': batch['crime_code'].to_numpy(),
+        'weapon_description': batch['weapon_description'].to_numpy(),
+        'premise_description': batch['premise_description'].to_numpy(),
+        'cell_key': cells.to_numpy(),
+    })
+    for col in SAMPLE_COLUMNS:
+        source[col] = fato[col].to_numpy()
+    return source.dropna(subset=GROUP_KEYS).astype({key: 'int64' for key in GROUP_KEYS})
+
+
+def count_items(source):
+    # (grupo, métrica, item) → contagem
+    frames = []
+    for metric, col in SKETCH_METRICS.items():
+        counts = source[GROUP_KEYS + [col]].dropna().groupby(GROUP_KEYS + [col], observed=True).size()
+        counts = counts.reset_index(name='count').rename(columns={col: 'item'})
+        counts['item'] = item_text(counts['item']).to_numpy()
+        frames.append(counts.assign(metric=metric))
+    return pd.concat(frames, ignore_index=True)
+
+
+def bottom_sample(sample, size=SAMPLE_SIZE):
+    return sample.sort_values(GROUP_KEYS + ['priority', 'nk_crime_id']).groupby(GROUP_KEYS).head(size)
+
+
+def partial_sketches(source):
+    # Parciais de um lote: contagens por item e amostra por grupo (somáveis entre lotes)
+    sample = source[GROUP_KEYS + SAMPLE_COLUMNS].assign(priority=sample_priority(source['nk_crime_id']))
+    return count_items(source), bottom_sample(sample)
+
+
+def build_sketch_rows(counts, sample):
+    # Contagens agregadas → linhas de gold.agg_sketches; amostra → gold.agg_sketch_sample
+    rows = []
+    for metric, items in counts.groupby('metric', sort=False):
+        groups = items[GROUP_KEYS].drop_duplicates().reset_index(drop=True)
+        index = pd.MultiIndex.from_frame(groups).get_indexer(pd.MultiIndex.from_frame(items[GROUP_KEYS]))
+        hashes = item_hashes(items['item'])
+        registers = hll_registers(index, hashes, len(groups))
+        table = cms_counters(index, hashes, items['count'].to_numpy('float64'), len(groups))
+        totals = np.bincount(index, weights=items['count'], minlength=len(groups)).astype('int64')
+        top = (items.assign(index=index).sort_values(['index', 'count', 'item'], ascending=[True, False, True])
+               .groupby('index').head(TOPK_CANDIDATES))
+        # top ordenado por grupo: fatias [bounds[i], bounds[i + 1]) de cada grupo
+        bounds = np.searchsorted(top['index'].to_numpy(), np.arange(len(groups) + 1))
+        names, freqs = top['item'].tolist(), top['count'].astype('int64').tolist()
+        candidates = [json.dumps(list(zip(names[a:b], freqs[a:b]))) for a, b in zip(bounds[:-1], bounds[1:])]
+        rows.append(groups.assign(
+            metric=metric, items=totals,
+            hll=[pack(r) for r in registers], cms=[pack(t) for t in table],
+            candidates=candidates,
+        ))
+    columns = GROUP_KEYS + ['metric', 'items', 'hll', 'cms', 'candidates']
+    sketches = pd.concat(rows, ignore_index=True) if rows else pd.DataFrame(columns=columns)
+    sample = sample[GROUP_KEYS + ['priority'] + SAMPLE_COLUMNS].reset_index(drop=True)
+    return {'agg_sketches': sketches[columns], 'agg_sketch_sample': sample}
+
+
+def merge_sketches(partials):
+    # Soma as contagens dos lotes e corta a amostra; devolve {tabela: DataFrame}
+    if not partials:
+        return build_sketch_rows(pd.DataFrame(columns=GROUP_KEYS + ['item', 'count', 'metric']),
+                                 pd.DataFrame(columns=GROUP_KEYS + ['priority'] + SAMPLE_COLUMNS))
+    counts = pd.concat([c for c, _ in partials], ignore_index=True) \
+        .groupby(GROUP_KEYS + ['metric', 'item'], as_index=False, sort=False)['count'].sum()
+    sample = bottom_sample(pd.concat([s for _, s in partials], ignore_index=True))
+    return build_sketch_rows(counts, sample)
+
+
+## Incremental e push-down: grupos recalculados a partir da fato + Silver
+
+def affected_sketch_groups(source, old_facts, dim_date):
+    # Grupos dos valores novos (source) e das linhas fato removidas
+    keys = source[GROUP_KEYS]
+    if not old_facts.empty:
+        old = old_facts.merge(dim_date[['sk_date', 'month']], on='sk_date')
+        keys = pd.concat([keys, old[GROUP_KEYS]])
+    return keys.dropna().astype('int64').drop_duplicates()
+
+
+def facts_sql(schema, groups_join):
+    return f"""
+        SELECT f.sk_area, f.year, d.month, {', '.join(f'f.{c}' for c in SAMPLE_COLUMNS)},
+               t.crime_code::text AS crime_code, s.weapon_description, s.premise_description,
+               (f.grid_key >> {HOTSPOT_SHIFT})::text AS cell_key
+        FROM {schema}.fato_crimes f
+        JOIN {schema}.dim_date d ON d.sk_date = f.sk_date
+        LEFT JOIN {schema}.dim_crime_type t ON t.sk_crime_type = f.sk_crime_type
+        LEFT JOIN silver.crimes s ON s.crime_id = f.nk_crime_id AND s.year = f.year
+        {groups_join}
+        WHERE f.sk_area IS NOT NULL
+    """
+
+
+def read_group_sketch_inputs(conn, schema='gold', groups=None):
+    # Contagens por item e amostra dos grupos (todos, com groups=None) em SQL
+    params = {'size': SAMPLE_SIZE}
+    groups_join = ""
+    if groups is not None:
+        params.update({'areas': groups['sk_area'].astype(int).tolist(), 'years': groups['year'].astype(int).tolist(),
+                       'months': groups['month'].astype(int).tolist()})
+        groups_join = ("JOIN unnest(CAST(:areas AS BIGINT[]), CAST(:years AS INTEGER[]), CAST(:months AS INTEGER[])) "
+                       "AS k(sk_area, year, month) ON f.sk_area = k.sk_area AND f.year = k.year AND d.month = k.month")
+    facts = facts_sql(schema, groups_join)
+    counts = ' UNION ALL '.join(
+        f"SELECT sk_area, year, month, '{metric}' AS metric, {col} AS item, COUNT(*) AS count "
+        f"FROM facts WHERE {col} IS NOT NULL GROUP BY sk_area, year, month, {col}"
+        for metric, col in SKETCH_METRICS.items()
+    )
+    counts = pd.read_sql(text(f"WITH facts AS ({facts}) {counts}"), conn, params=params)
+    sample = pd.read_sql(text(f"""
+        SELECT {', '.join(GROUP_KEYS)}, priority, {', '.join(SAMPLE_COLUMNS)} FROM (
+            SELECT x.*, ROW_NUMBER() OVER (PARTITION BY sk_area, year, month ORDER BY priority, nk_crime_id) AS rn
+            FROM (SELECT facts.*, {sample_priority_sql('nk_crime_id')} AS priority FROM ({facts}) facts) x
+        ) ranked
+        WHERE rn <= :size
+    """), conn, params=params)
+    return counts, sample
+
+
+def refresh_sketches(engine, groups=None, schema='gold'):
+    # Substitui os sketches dos grupos (todos, com groups=None) na mesma transação
+    if groups is not None and groups.empty:
+        return 0
+    with engine.begin() as conn:
+        tables = build_sketch_rows(*read_group_sketch_inputs(conn, schema, groups))
+        for table in tables:
+            if groups is None:
+                conn.exec_driver_sql(f"DELETE FROM {schema}.{table}")
+            else:
+                conn.execute(text(f"""
+                    DELETE FROM {schema}.{table} a
+                    USING unnest(CAST(:areas AS BIGINT[]), CAST(:years AS INTEGER[]), CAST(:months AS INTEGER[])) AS k(sk_area, year, month)
+                    WHERE a.sk_area = k.sk_area AND a.year = k.year AND a.month = k.month
+                """), {'areas': groups['sk_area'].astype(int).tolist(), 'years': groups['year'].astype(int).tolist(),
+                       'months': groups['month'].astype(int).tolist()})
+        for table, df in tables.items():
+            if len(df):
+                load_table(df, table, conn, schema=schema, if_exists='append', verbose=False)
+    return len(tables['agg_sketches'][GROUP_KEYS].drop_duplicates())
+
+
+## Consultas aproximadas
+
+class SketchStore:
+    # Sketches de todos os grupos em memória: por métrica, registradores HLL
+    # (grupos x 2^p), contadores Count-Min (grupos x d x w), total de itens e candidatos
+    def __init__(self, groups, metrics, sample, version=None):
+        self.groups = groups      # DataFrame com GROUP_ATTRIBUTES, uma linha por grupo
+        self.metrics = metrics    # métrica → {'hll', 'cms', 'items', 'candidates'}
+        self.sample_rows = sample  # amostra por grupo, com a coluna group (linha de groups)
+        self.version = version
+
+    @classmethod
+    def load(cls, engine, schema='gold'):
+        with engine.connect() as conn:
+            version = conn.execute(text(f"SELECT version FROM {schema}.data_version WHERE id = 1")).scalar() or 0
+            rows = pd.read_sql(text(f"SELECT * FROM {schema}.agg_sketches"), conn)
+            sample = pd.read_sql(text(f"SELECT * FROM {schema}.agg_sketch_sample"), conn)
+            areas = pd.read_sql(text(f"SELECT sk_area, area_name, region FROM {schema}.dim_area"), conn)
+
+        groups = pd.concat([rows[GROUP_KEYS], sample[GROUP_KEYS]]).drop_duplicates() \
+            .sort_values(GROUP_KEYS).reset_index(drop=True)
+        groups = groups.merge(areas, on='sk_area', how='left')[GROUP_ATTRIBUTES]
+        position = pd.MultiIndex.from_frame(groups[GROUP_KEYS])
+        metrics = {}
+        for metric, items in rows.groupby('metric'):
+            index = position.get_indexer(pd.MultiIndex.from_frame(items[GROUP_KEYS]))
+            registers, tables = [unpack(b) for b in items['hll']], [unpack(b) for b in items['cms']]
+            if len({r.shape for r in registers}) > 1 or len({t.shape for t in tables}) > 1:
+                raise ValueError(f"Sketches de {metric} com parâmetros diferentes: execute uma carga completa da Gold")
+            hll = np.zeros((len(groups),) + registers[0].shape, dtype='uint8')
+            cms = np.zeros((len(groups),) + tables[0].shape, dtype='int64')
+            hll[index], cms[index] = registers, tables
+            totals = np.zeros(len(groups), dtype='int64')
+            totals[index] = items['items'].to_numpy()
+            candidates = np.full(len(groups), '[]', dtype=object)
+            candidates[index] = items['candidates'].to_numpy()
+            metrics[metric] = {'hll': hll, 'cms': cms, 'items': totals, 'candidates': candidates}
+        sample['group'] = position.get_indexer(pd.MultiIndex.from_frame(sample[GROUP_KEYS]))
+        return cls(groups, metrics, sample, version=version)
+
+    def selected(self, where=None):
+        # Máscara dos grupos: where = {atributo: valor ou lista de valores}
+        mask = np.ones(len(self.groups), dtype=bool)
+        for attribute, values in (where or {}).items():
+            if attribute not in GROUP_ATTRIBUTES:
+                raise KeyError(f"Atributo desconhecido: {attribute} (disponíveis: {', '.join(GROUP_ATTRIBUTES)})")
+            values = values if isinstance(values, (list, tuple, set)) else [values]
+            mask &= self.groups[attribute].isin(values).to_numpy()
+        return mask
+
+    def metric(self, name):
+        if name not in SKETCH_METRICS:
+            raise KeyError(f"Métrica desconhecida: {name} (disponíveis: {', '.join(SKETCH_METRICS)})")
+        if name not in self.metrics:
+            raise ValueError(f"Sem sketches de {name}: execute a carga Silver → Gold com ETL_GOLD_SKETCHES=true")
+        return self.metrics[name]
+
+    def distinct(self, metric, by=(), where=None):
+        # Itens distintos por grupo de `by`: estimativa e intervalo de ~95% (2 erros padrão)
+        sketch, mask = self.metric(metric), self.selected(where)
+        registers = sketch['hll'][mask]
+        by = list(by)
+        if by and not mask.any():
+            return pd.DataFrame(columns=by + ['estimate', 'low', 'high'])
+        if by:
+            # Combina os registradores de cada grupo de `by` (máximo por registrador)
+            labels = self.groups.loc[mask, by].reset_index(drop=True)
+            codes = labels.groupby(by, dropna=False, sort=True).ngroup().to_numpy()
+            order = np.argsort(codes, kind='stable')
+            starts = np.flatnonzero(np.r_[True, np.diff(codes[order]) != 0])
+            merged = np.maximum.reduceat(registers[order], starts, axis=0)
+            result = labels.iloc[order[starts]].reset_index(drop=True)
+        else:
+            merged = registers.max(axis=0, keepdims=True) if mask.any() else np.zeros((1,) + registers.shape[1:], 'uint8')
+            result = pd.DataFrame(index=range(1))
+        estimate = hll_estimate(merged)
+        error = hll_error(int(np.log2(merged.shape[1])))
+        return result.assign(estimate=np.round(estimate).astype('int64'),
+                             low=np.floor(estimate * (1 - 2 * error)).clip(min=0).astype('int64'),
+                             high=np.ceil(estimate * (1 + 2 * error)).astype('int64'))
+
+    def top_k(self, metric, k=10, where=None):
+        # Itens mais frequentes: candidatos dos grupos, com dois limites superiores
+        # combinados (vale o menor): o Count-Min somado (não subestima) e o dos
+        # candidatos, em que um item fora da lista de um grupo tem no máximo a menor
+        # contagem listada (0 quando a lista cobre todo o grupo).
+        # lower: maior entre a soma exata dos candidatos e Count-Min - e/w * N;
+        # estimate: ponto médio do intervalo
+        sketch, mask = self.metric(metric), self.selected(where)
+        table = sketch['cms'][mask].sum(axis=0)
+        total = int(sketch['items'][mask].sum())
+        rows, thresholds = [], 0
+        for blob, items in zip(sketch['candidates'][mask], sketch['items'][mask]):
+            pairs = json.loads(blob)
+            threshold = 0 if sum(c for _, c in pairs) == items else pairs[-1][1]
+            thresholds += threshold
+            rows.extend((item, count, threshold) for item, count in pairs)
+        if not rows:
+            return pd.DataFrame(columns=['item', 'estimate', 'lower', 'upper'])
+        rows = pd.DataFrame(rows, columns=['item', 'count', 'threshold'])
+        known = rows.groupby('item', sort=False)[['count', 'threshold']].sum()
+        estimate = cms_estimate(table, item_hashes(known.index))
+        upper = np.minimum(estimate, known['count'].to_numpy() + thresholds - known['threshold'].to_numpy())
+        lower = np.maximum(known['count'].to_numpy(), estimate - cms_error(total, table.shape[1]))
+        result = pd.DataFrame({'item': known.index, 'estimate': (lower + upper) // 2, 'lower': lower, 'upper': upper})
+        return result.sort_values(['estimate', 'item'], ascending=[False, True]).head(k).reset_index(drop=True)
+
+    def sample(self, k=SAMPLE_SIZE, where=None):
+        # Amostra uniforme de até min(k, SAMPLE_SIZE) fatos dos grupos filtrados
+        rows = self.sample_rows[self.selected(where)[self.sample_rows['group'].to_numpy()]]
+        return rows.sort_values(['priority', 'nk_crime_id']).head(min(k, SAMPLE_SIZE)) \
+            .drop(columns='group').reset_index(drop=True)
+
+
+## Conferência contra as consultas exatas
+
+def exact_distinct_by_area(engine, metric):
+    col = SKETCH_METRICS[metric]
+    with engine.connect() as conn:
+        return pd.read_sql(text(f"SELECT a.area_name, COUNT(DISTINCT f.{col}) AS exact FROM ({facts_sql('gold', '')}) f "
+                                f"LEFT JOIN gold.dim_area a ON a.sk_area = f.sk_area GROUP BY a.area_name"), conn)
+
+
+def exact_counts(engine, metric):
+    col = SKETCH_METRICS[metric]
+    with engine.connect() as conn:
+        return pd.read_sql(text(f"SELECT {col} AS item, COUNT(*) AS exact FROM ({facts_sql('gold', '')}) f "
+                                f"WHERE {col} IS NOT NULL GROUP BY {col}"), conn).set_index('item')['exact']
+
+
+def check_sketch_accuracy(engine, store, k=10):
+    # Distintos por área dentro de 3 erros padrão; top-K com a contagem exata entre
+    # lower e upper. Devolve {verificação: detalhe} das violações
+    problems = {}
+    for metric in SKETCH_METRICS:
+        approx = store.distinct(metric, by=['area_name'])
+        exact = exact_distinct_by_area(engine, metric).merge(approx, on='area_name', how='outer')
+        error = hll_error() * 3
+        bad = exact[(exact['estimate'] - exact['exact']).abs() > np.maximum(error * exact['exact'], 1)]
+        if len(bad):
+            problems[f"distinct {metric}"] = f"{len(bad)} áreas fora de 3 erros padrão"
+
+        top = store.top_k(metric, k=k)
+        counts = exact_counts(engine, metric)
+        top['exact'] = counts.reindex(top['item']).fillna(0).astype('int64').to_numpy()
+        outside = top[(top['exact'] < top['lower']) | (top['exact'] > top['upper'])]
+        if len(outside):
+            problems[f"top {metric}"] = f"{len(outside)} itens fora de [lower, upper]"
+        missed = set(counts.nlargest(k).index) - set(top['item'])
+        if missed:
+            print(f"   {metric}: {len(missed)} do top-{k} exato fora do top-{k} aproximado")
+    return problems
+
+
+if __name__ == '__main__':
+    import argparse
+
+    from olap_cube import parse_where
+    from query_service import create_query_engine
+
+    parser = argparse.ArgumentParser(description="Respostas aproximadas a partir dos sketches da Gold.")
+    parser.add_argument('question', nargs='?', choices=['distinct', 'top', 'sample'], default='distinct')
+    parser.add_argument('metric', nargs='?', default='crime_types', help=f"métricas: {', '.join(SKETCH_METRICS)}")
+    parser.add_argument('--by', nargs='*', default=[], help=f"atributos: {', '.join(GROUP_ATTRIBUTES)}")
+    parser.add_argument('--where', nargs='*', default=[], metavar='ATRIBUTO=V1,V2')
+    parser.add_argument('--k', type=int, default=10)
+    parser.add_argument('--repeat', type=int, default=1, help="repete a consulta para medir a latência")
+    parser.add_argument('--verify', action='store_true', help="confere as respostas contra as consultas exatas")
+    args = parser.parse_args()
+
+    engine = create_query_engine()
+    start = time.perf_counter()
+    store = SketchStore.load(engine)
+    print(f"Sketches: {len(store.groups):,} grupos em {time.perf_counter() - start:.2f}s (versão Gold {store.version})")
+
+    if args.verify:
+        problems = check_sketch_accuracy(engine, store)
+        for check, detail in problems.items():
+            print(f"   - {check}: {detail}")
+        print("Respostas dentro dos limites de erro" if not problems else "Sketches fora dos limites de erro")
+    else:
+        where = parse_where(args.where)
+        for _ in range(args.repeat):
+            start = time.perf_counter()
+            if args.question == 'distinct':
+                result = store.distinct(args.metric, by=args.by, where=where)
+            elif args.question == 'top':
+                result = store.top_k(args.metric, k=args.k, where=where)
+            else:
+                result = store.sample(k=args.k, where=where)
+            elapsed = time.perf_counter() - start
+        print(result.to_string(index=False))
+        print(f"\nResposta em {elapsed * 1000:.3f} ms")
@@ -0,0 +1,102 @@
+# Carga em lote no PostgreSQL
+# COPY ... FROM STDIN (psycopg2 copy_expert) usado como `method` do DataFrame.to_sql:
+# o pandas continua criando a tabela quando necessário e cada bloco de linhas é
+# enviado ao servidor como um único buffer CSV em memória.
+
+import csv
+import io
+import os
+import time
+
+LOAD_METHOD = os.getenv("ETL_LOAD_METHOD", "copy")  # 'copy' ou 'multi'
+COPY_CHUNKSIZE = int(os.getenv("ETL_COPY_CHUNKSIZE", "100000"))
+
+NULL_MARKER = r'\N'
+
+
+def copy_value(v):
+    # None → NULL; floats inteiros (ex.: códigos INTEGER com NaN lidos como float)
+    # são escritos sem ".0" para que o COPY aceite colunas INTEGER/BIGINT
+    if v is None:
+        return NULL_MARKER
+    if isinstance(v, float) and v.is_integer():
+        return int(v)
+    return v
+
+
+def psql_insert_copy(table, conn, keys, data_iter):
+    # Assinatura de `method` do to_sql: (pandas SQLTable, conexão SQLAlchemy, colunas, linhas)
+    buf = io.StringIO()
+    writer = csv.writer(buf)
+    for row in data_iter:
+        writer.writerow([copy_value(v) for v in row])
+    buf.seek(0)
+
+    columns = ', '.join(f'"{k}"' for k in keys)
+    table_name = f'"{table.schema}"."{table.name}"' if table.schema else f'"{table.name}"'
+    sql = f"COPY {table_name} ({columns}) FROM STDIN WITH (FORMAT csv, NULL '{NULL_MARKER}')"
+
+    dbapi_conn = conn.connection
+    with dbapi_conn.cursor() as cur:
+        cur.copy_expert(sql, buf)
+
+
+def load_table(df, name, engine, schema, if_exists='append', method=None, chunksize=None, verbose=True):
+    # Grava o DataFrame via COPY (padrão) ou INSERT multi-linha e mede a vazão
+    method = method or LOAD_METHOD
+    if method == 'copy':
+        to_sql_method = psql_insert_copy
+        chunksize = chunksize or COPY_CHUNKSIZE
+    else:
+        to_sql_method = 'multi'
+        chunksize = chunksize or 5000
+
+    start = time.perf_counter()
+    df.to_sql(
+        name,
+        engine,
+        schema=schema,
+        if_exists=if_exists,
+        index=False,
+        chunksize=chunksize,
+        method=to_sql_method
+    )
+    elapsed = time.perf_counter() - start
+
+    rows = len(df)
+    rows_per_sec = rows / elapsed if elapsed > 0 else float('inf')
+    if verbose:
+        print(f"   {schema}.{name}: {rows:,} registros em {elapsed:.2f}s ({rows_per_sec:,.0f} registros/s, {method})")
+    return {'table': f"{schema}.{name}", 'rows': rows, 'seconds': elapsed, 'rows_per_sec': rows_per_sec, 'method': method}
+
+
+def upsert_table(df, name, engine, schema, key, verbose=True, staging=None):
+    # Carga em tabela de staging (UNLOGGED) + DELETE das chaves já existentes + INSERT,
+    # na mesma transação. Em tabela particionada a restrição única inclui a chave de
+    # partição (ON CONFLICT (key) não se aplica) e a linha pode mudar de partição.
+    # staging: nome próprio da staging para cargas concorrentes na mesma tabela
+    staging = staging or f"{name}_staging"
+    with engine.begin() as conn:
+        conn.exec_driver_sql(f"DROP TABLE IF EXISTS {schema}.{staging}")
+        conn.exec_driver_sql(f"CREATE UNLOGGED TABLE {schema}.{staging} (LIKE {schema}.{name} INCLUDING DEFAULTS)")
+
+    start = time.perf_counter()
+    load_table(df, staging, engine, schema=schema, if_exists='append', verbose=False)
+
+    columns = ', '.join(f'"{c}"' for c in df.columns)
+    with engine.begin() as conn:
+        conn.exec_driver_sql(
+            f"DELETE FROM {schema}.{name} t USING {schema}.{staging} s WHERE t.{key} = s.{key}"
+        )
+        conn.exec_driver_sql(
+            f"INSERT INTO {schema}.{name} ({columns}) "
+            f"SELECT {columns} FROM {schema}.{staging}"
+        )
+        conn.exec_driver_sql(f"DROP TABLE {schema}.{staging}")
+    elapsed = time.perf_counter() - start
+
+    rows = len(df)
+    rows_per_sec = rows / elapsed if elapsed > 0 else float('inf')
+    if verbose:
+        print(f"   {schema}.{name}: {rows:,} registros upsert em {elapsed:.2f}s ({rows_per_sec:,.0f} registros/s)")
+    return {'table': f"{schema}.{name}", 'rows': rows, 'seconds': elapsed, 'rows_per_sec': rows_per_sec, 'method': 'upsert'}
@@ -0,0 +1,280 @@
+# Instrumentação dos ETLs
+# Cada estágio nomeado registra tempo de parede, tempo de CPU, pico de RSS,
+# pico do tracemalloc (opcional) e linhas de entrada/saída. Estágios repetidos
+# (chunks do modo streaming, lotes da Gold) são acumulados sob o mesmo nome.
+# Ao final a execução é gravada em <schema>.etl_runs / <schema>.etl_stage_metrics
+# e em um arquivo JSON (ETL_METRICS=false desliga a gravação);
+# ETL_PROFILE_STAGE=<estágio> grava um dump do cProfile desse estágio.
+
+import atexit
+import cProfile
+import json
+import os
+import threading
+import time
+import tracemalloc
+import uuid
+from contextlib import contextmanager, nullcontext
+from datetime import datetime
+
+import pandas as pd
+from sqlalchemy import text
+
+try:
+    import resource
+except ImportError:  # Windows: sem getrusage
+    resource = None
+
+METRICS_ENABLED = os.getenv("ETL_METRICS", "true").lower() == "true"
+TRACEMALLOC_ENABLED = os.getenv("ETL_TRACEMALLOC", "false").lower() == "true"
+PROFILE_STAGE = os.getenv("ETL_PROFILE_STAGE", "")
+
+
+def peak_rss_mb():
+    # Pico de memória residente do processo até agora (ru_maxrss em KB no Linux)
+    if resource is None:
+        return None
+    return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024
+
+
+def cpu_time():
+    # Em threads do pool usa o tempo de CPU da própria thread
+    if threading.current_thread() is threading.main_thread():
+        return time.process_time()
+    return time.thread_time()
+
+
+def rows_of(result):
+    if isinstance(result, pd.DataFrame):
+        return len(result)
+    if isinstance(result, dict) and 'rows' in result:
+        return result['rows']
+    if isinstance(result, int) and not isinstance(result, bool):
+        return result
+    return None
+
+
+def count_label(value):
+    return '-' if value is None else f"{value:,}"
+
+
+class TracedPeaks:
+    # Pico do tracemalloc por estágio. O pico do tracemalloc é um só no processo:
+    # antes de cada reset_peak() o pico corrente é acumulado em todos os estágios
+    # abertos (aninhados, como clean_1..7 dentro dos chunks, ou em outras threads),
+    # de modo que o reset de um estágio não apaga o pico de quem o contém
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.open = []  # [pico acumulado] de cada estágio em andamento
+
+    def start(self):
+        holder = [0]
+        with self.lock:
+            current = tracemalloc.get_traced_memory()[1]
+            for other in self.open:
+                other[0] = max(other[0], current)
+            tracemalloc.reset_peak()
+            self.open.append(holder)
+        return holder
+
+    def stop(self, holder):
+        # Pico (MB) desde start(holder)
+        with self.lock:
+            self.open.remove(holder)
+            return max(holder[0], tracemalloc.get_traced_memory()[1]) / 1024**2
+
+
+traced_peaks = TracedPeaks()
+
+
+class StageMetrics:
+    def __init__(self, name):
+        self.name = name
+        self.calls = 0
+        self.wall_seconds = 0.0
+        self.cpu_seconds = 0.0
+        self.peak_rss_mb = None
+        self.rss_growth_mb = 0.0
+        self.tracemalloc_peak_mb = None
+        self.rows_in = None
+        self.rows_out = None
+
+    def add_rows(self, attr, value):
+        if value is not None:
+            setattr(self, attr, (getattr(self, attr) or 0) + int(value))
+
+    def as_dict(self):
+        return {k: v for k, v in vars(self).items()}
+
+
+class StageRecorder:
+    # Apenas a coleta por estágio (sem execução, JSON ou tabelas): usado diretamente
+    # nos processos do pool, cujos estágios são devolvidos e somados ao RunRecorder
+    def __init__(self):
+        self.stages = {}
+        self.lock = threading.Lock()
+        self.profiler = None
+
+    @contextmanager
+    def stage(self, name, rows_in=None):
+        # Uso: with recorder.stage('clean_1_duplicates', rows_in=len(df)) as st: ...; st['rows_out'] = n
+        info = {'rows_out': None}
+        profiling = self.profiler is not None and name == PROFILE_STAGE
+        rss_before = peak_rss_mb()
+        traced = traced_peaks.start() if tracemalloc.is_tracing() else None
+        wall, cpu = time.perf_counter(), cpu_time()
+        if profiling:
+            self.profiler.enable()
+        try:
+            yield info
+        finally:
+            if profiling:
+                self.profiler.disable()
+            wall, cpu = time.perf_counter() - wall, cpu_time() - cpu
+            rss_after = peak_rss_mb()
+            traced_peak = traced_peaks.stop(traced) if traced is not None else None
+            with self.lock:
+                metrics = self.stages.setdefault(name, StageMetrics(name))
+                metrics.calls += 1
+                metrics.wall_seconds += wall
+                metrics.cpu_seconds += cpu
+                if rss_after is not None:
+                    metrics.peak_rss_mb = max(metrics.peak_rss_mb or 0.0, rss_after)
+                    metrics.rss_growth_mb += rss_after - rss_before
+                if traced_peak is not None:
+                    metrics.tracemalloc_peak_mb = max(metrics.tracemalloc_peak_mb or 0.0, traced_peak)
+                metrics.add_rows('rows_in', rows_in)
+                metrics.add_rows('rows_out', info['rows_out'])
+
+    def wrap(self, name, fn, rows_in=None):
+        # Versão instrumentada de fn (para estágios submetidos a um pool de threads);
+        # rows_out é inferido do resultado (DataFrame, dict com 'rows' ou int)
+        def run(*args, **kwargs):
+            with self.stage(name, rows_in=rows_in) as st:
+                result = fn(*args, **kwargs)
+                st['rows_out'] = rows_of(result)
+            return result
+        return run
+
+    def iterate(self, name, iterable):
+        # Mede cada next() de um iterador (ex.: leitura de chunks) como o estágio `name`
+        iterator = iter(iterable)
+        done = object()
+        while True:
+            with self.stage(name) as st:
+                item = next(iterator, done)
+                st['rows_out'] = rows_of(item) if item is not done else None
+            if item is done:
+                return
+            yield item
+
+    def stage_dicts(self):
+        return [m.as_dict() for m in self.stages.values()]
+
+    def merge(self, stage_dicts):
+        # Soma estágios medidos em outro processo (StageRecorder.stage_dicts)
+        with self.lock:
+            for s in stage_dicts:
+                metrics = self.stages.setdefault(s['name'], StageMetrics(s['name']))
+                metrics.calls += s['calls']
+                metrics.wall_seconds += s['wall_seconds']
+                metrics.cpu_seconds += s['cpu_seconds']
+                if s['peak_rss_mb'] is not None:
+                    metrics.peak_rss_mb = max(metrics.peak_rss_mb or 0.0, s['peak_rss_mb'])
+                metrics.rss_growth_mb += s['rss_growth_mb']
+                if s['tracemalloc_peak_mb'] is not None:
+                    metrics.tracemalloc_peak_mb = max(metrics.tracemalloc_peak_mb or 0.0, s['tracemalloc_peak_mb'])
+                metrics.add_rows('rows_in', s['rows_in'])
+                metrics.add_rows('rows_out', s['rows_out'])
+
+
+class RunRecorder(StageRecorder):
+    def __init__(self, pipeline, schema, output_dir, engine=None, config=None):
+        super().__init__()
+        self.pipeline = pipeline
+        self.schema = schema
+        self.output_dir = output_dir
+        self.config = config or {}
+        self.run_id = f"{datetime.now():%Y%m%d_%H%M%S}_{uuid.uuid4().hex[:8]}"
+        self.started_at = datetime.now()
+        self.profiler = cProfile.Profile() if PROFILE_STAGE else None
+        self.start_wall = time.perf_counter()
+        self.start_cpu = time.process_time()
+        self.finished = False
+        self.engine = engine
+        if TRACEMALLOC_ENABLED and not tracemalloc.is_tracing():
+            tracemalloc.start()
+        atexit.register(self.finish_on_exit)
+
+    def summary(self, status):
+        return {
+            'run_id': self.run_id,
+            'pipeline': self.pipeline,
+            'status': status,
+            'started_at': self.started_at.isoformat(),
+            'finished_at': datetime.now().isoformat(),
+            'wall_seconds': time.perf_counter() - self.start_wall,
+            'cpu_seconds': time.process_time() - self.start_cpu,
+            'peak_rss_mb': peak_rss_mb(),
+            'config': self.config,
+            'stages': self.stage_dicts(),
+        }
+
+    def write_json(self, run):
+        os.makedirs(self.output_dir, exist_ok=True)
+        path = self.output_dir / f"{self.pipeline}_{self.run_id}.json"
+        path.write_text(json.dumps(run, indent=2, default=str), encoding="utf-8")
+        return path
+
+    def write_tables(self, engine, run):
+        with engine.begin() as conn:
+            conn.execute(text(f"""
+                INSERT INTO {self.schema}.etl_runs
+                    (run_id, pipeline, status, started_at, finished_at, wall_seconds, cpu_seconds, peak_rss_mb, config)
+                VALUES (:run_id, :pipeline, :status, :started_at, :finished_at, :wall_seconds, :cpu_seconds, :peak_rss_mb, :config)
+            """), {**run, 'config': json.dumps(run['config'], default=str)})
+            if run['stages']:
+                conn.execute(text(f"""
+                    INSERT INTO {self.schema}.etl_stage_metrics
+                        (run_id, stage_order, stage, calls, wall_seconds, cpu_seconds, peak_rss_mb, rss_growth_mb,
+                         tracemalloc_peak_mb, rows_in, rows_out)
+                    VALUES (:run_id, :stage_order, :name, :calls, :wall_seconds, :cpu_seconds, :peak_rss_mb, :rss_growth_mb,
+                            :tracemalloc_peak_mb, :rows_in, :rows_out)
+                """), [{**s, 'run_id': self.run_id, 'stage_order': i} for i, s in enumerate(run['stages'], start=1)])
+
+    def finish(self, status='success', verbose=True):
+        self.finished = True
+        run = self.summary(status)
+        json_path = None
+        if METRICS_ENABLED:
+            json_path = self.write_json(run)
+            if self.engine is not None:
+                self.write_tables(self.engine, run)
+        if self.profiler is not None and PROFILE_STAGE in self.stages:
+            os.makedirs(self.output_dir, exist_ok=True)
+            self.profiler.dump_stats(self.output_dir / f"{self.pipeline}_{self.run_id}_{PROFILE_STAGE}.prof")
+
+        if verbose:
+            print(f"\nMétricas da execução {self.run_id} ({run['wall_seconds']:.2f}s de parede, {run['cpu_seconds']:.2f}s de CPU):")
+            for s in sorted(run['stages'], key=lambda s: -s['wall_seconds'])[:15]:
+                rows = f", {count_label(s['rows_in'])} → {count_label(s['rows_out'])} linhas" if s['rows_in'] is not None or s['rows_out'] is not None else ""
+                rss = f", pico RSS {s['peak_rss_mb']:.0f} MB" if s['peak_rss_mb'] is not None else ""
+                print(f"   {s['name']}: {s['wall_seconds']:.3f}s (CPU {s['cpu_seconds']:.3f}s{rss}{rows})")
+            if json_path:
+                print(f"   JSON: {json_path}")
+        return run
+
+    def finish_on_exit(self):
+        # Execução interrompida por exceção: registra o que foi medido como 'failed'
+        if self.finished:
+            return
+        try:
+            self.finish(status='failed', verbose=False)
+        except Exception as e:
+            print(f"Falha ao gravar métricas da execução {self.run_id}: {e}")
+
+
+def stage(recorder, name, rows_in=None):
+    # Estágio opcional: sem recorder não mede nada
+    return recorder.stage(name, rows_in=rows_in) if recorder is not None else nullcontext({'rows_out': None})
+
@@ -16,12 +16,24 @@
 
 # Configuração inicial
 import os
-import pandas as pd
-import numpy as np
+import time
 from pathlib import Path
 from datetime import datetime
 from sqlalchemy import create_engine
 
+from db_loader import load_table, upsert_table
+from silver_transform import read_raw, clean_raw_data, build_silver, iter_raw_chunks, check_classifier_parity, SeenIds
+from etl_metrics import RunRecorder
+from columnar_store import STORAGE_FORMAT, snapshot_raw_csv, export_query_parquet
+from silver_incremental import (
+    file_sha256, read_watermark, write_watermark, read_source_hashes, count_missing_grid_keys, select_new_or_changed
+)
+from table_partitions import PartitionedLoad, detach_legacy_table, migrate_legacy_rows
+from silver_parallel import RAW_WORKERS, SHARD_MB, run_parallel
+from load_pipeline import LOAD_PIPELINE, LOAD_WORKERS, PIPELINE_DEPTH, LoadPipeline
+from stage_cache import STAGE_CACHE_DIR, StageCache, parse_force, source_digest, table_fingerprint, ddl_tables_exist
+import db_loader, silver_incremental, silver_parallel, silver_transform, spatial_grid, table_partitions
+
 def find_project_root(start: Path) -> Path:
     for p in [start, *start.parents]:
         if (p / 'Data Layer').exists():
@@ -32,6 +44,13 @@ def find_project_root(start: Path) -> Path:
 PROJECT_ROOT = find_project_root(Path.cwd())
 RAW_PATH = PROJECT_ROOT / 'Data Layer' / 'raw' / 'data_raw.csv'
 DDL_PATH = PROJECT_ROOT / 'Data Layer' / 'silver' / 'ddl.sql'
+# Cópias colunares (ETL_STORAGE_FORMAT=parquet): snapshot da Raw e cópia de silver.crimes
+RAW_PARQUET_PATH = RAW_PATH.with_suffix('.parquet')
+SILVER_PARQUET_PATH = PROJECT_ROOT / 'Data Layer' / 'silver' / 'data_silver.parquet'
+# Métricas por execução (JSON) e dumps do cProfile
+METRICS_PATH = PROJECT_ROOT / 'Data Layer' / 'metrics'
+# Manifesto do cache de estágios (stage_cache.py)
+STAGE_CACHE_PATH = Path(STAGE_CACHE_DIR) if STAGE_CACHE_DIR else PROJECT_ROOT / 'Data Layer' / '.stage_cache'
 
 # Configuração PostgreSQL
 POSTGRES_DB = os.getenv("POSTGRES_DB", "crime_data")
@@ -58,14 +77,30 @@ print(f"DB: {POSTGRES_HOST}:{POSTGRES_PORT}/{POSTGRES_DB}")
 
 
 # Inicializar conexão e aplicar DDL (PostgreSQL)
-engine = create_engine(DB_URL)
-
-with engine.begin() as conn:
-    ddl_sql = DDL_PATH.read_text(encoding="utf-8")
-    for stmt in ddl_sql.split(";"):
-        stmt = stmt.strip()
-        if stmt:
-            conn.exec_driver_sql(stmt)
+# Pipeline: uma conexão por thread carregadora + a da thread principal
+engine = create_engine(DB_URL, pool_size=max(5, LOAD_WORKERS + 1))
+
+# Estágios com entradas declaradas: pulados quando nada mudou (--force ESTÁGIO recalcula)
+stage_cache = StageCache('raw_to_silver', STAGE_CACHE_PATH, force=parse_force())
+ddl_digest = file_sha256(DDL_PATH)
+
+# Estágio ddl: hash do DDL e do código de particionamento
+if stage_cache.is_fresh('ddl', {'ddl': ddl_digest, 'code': source_digest(table_partitions)},
+                        valid=lambda _: ddl_tables_exist(engine, DDL_PATH)):
+    print("DDL Silver inalterado e já aplicado - estágio ddl reaproveitado")
+else:
+    # silver.crimes anterior ao particionamento: sai do caminho do DDL e é copiada depois
+    detach_legacy_table(engine, 'silver.crimes')
+
+    with engine.begin() as conn:
+        ddl_sql = DDL_PATH.read_text(encoding="utf-8")
+        for stmt in ddl_sql.split(";"):
+            stmt = stmt.strip()
+            if stmt:
+                conn.exec_driver_sql(stmt)
+
+    migrate_legacy_rows(engine, 'silver.crimes')
+    stage_cache.record('ddl')
 
 print("Conexão Postgre pronta e DDL aplicado")
 
@@ -73,57 +108,150 @@ print("Conexão Postgre pronta e DDL aplicado")
 # In[ ]:
 
 
-# Carregar dados Raw
-df = pd.read_csv(RAW_PATH)
-print(f"Dados Raw carregados: {len(df):,} registros")
-print(f"Colunas: {len(df.columns)}")
-df.head(3)
+# Modo de execução
+# LOAD_MODE: 'full' (recarga completa: TRUNCATE das partições dos anos presentes
+# no Raw) ou 'incremental' (apenas DR_NO novos/alterados, mesclados via staging +
+# DELETE/INSERT).
+LOAD_MODE = os.getenv("ETL_LOAD_MODE", "full").lower()
+# WATERMARK_LOOKBACK_DAYS: no modo incremental, ignora registros com Date Rptd
+# anterior a (watermark - N dias) sem comparar hash. Vazio = compara todos.
+WATERMARK_LOOKBACK_DAYS = int(os.getenv("ETL_WATERMARK_LOOKBACK_DAYS")) if os.getenv("ETL_WATERMARK_LOOKBACK_DAYS") else None
+# STREAMING_MODE: lê o CSV Raw em chunks de CHUNK_SIZE linhas, transforma e grava
+# cada chunk em silver.crimes antes de ler o próximo (memória limitada ao chunk).
+STREAMING_MODE = os.getenv("ETL_STREAMING", "false").lower() == "true"
+CHUNK_SIZE = int(os.getenv("ETL_CHUNK_SIZE", "100000"))
+# PARALLEL_MODE (ETL_RAW_WORKERS > 1): o CSV é dividido em shards de ~ETL_SHARD_MB
+# transformados e gravados por RAW_WORKERS processos (silver_parallel.py)
+PARALLEL_MODE = RAW_WORKERS > 1
+# PIPELINE_MODE (ETL_LOAD_PIPELINE=true, com streaming): a gravação de cada chunk
+# vai para LOAD_WORKERS threads carregadoras enquanto o próximo chunk é lido e
+# transformado (load_pipeline.py)
+PIPELINE_MODE = STREAMING_MODE and LOAD_PIPELINE and not PARALLEL_MODE
+# VERIFY_CLASSIFIERS: diagnóstico extra sobre os dados reais; confere o motor
+# vetorizado contra as funções get_* linha a linha (a paridade é coberta por
+# tests/test_silver_transform.py)
+VERIFY_CLASSIFIERS = os.getenv("ETL_VERIFY_CLASSIFIERS", "false").lower() == "true"
+TRUNCATE_BEFORE_LOAD = LOAD_MODE == 'full'
+IN_MEMORY_MODE = not STREAMING_MODE and not PARALLEL_MODE
+
+# Métricas por estágio: silver.etl_runs / silver.etl_stage_metrics + JSON em METRICS_PATH
+recorder = RunRecorder('raw_to_silver', 'silver', METRICS_PATH, engine=engine, config={
+    'load_mode': LOAD_MODE, 'streaming': STREAMING_MODE, 'chunk_size': CHUNK_SIZE, 'storage_format': STORAGE_FORMAT,
+    'raw_workers': RAW_WORKERS, 'shard_mb': SHARD_MB,
+    'load_pipeline': PIPELINE_MODE, 'load_workers': LOAD_WORKERS, 'pipeline_depth': PIPELINE_DEPTH,
+    'forced_stages': sorted(stage_cache.force)
+})
+
+collected_at = datetime.now()
+
+# Watermark: hash do arquivo Raw e maior Date Rptd já carregado
+source_file_hash = file_sha256(RAW_PATH)
+watermark = read_watermark(engine)
+source_changed = True
+existing_hashes = None
+
+# Estágio silver_load (leitura, limpeza, transformação e carga): arquivo Raw, DDL,
+# código das transformações e configuração da execução (modo de carga e de leitura,
+# formato das cópias): trocar a configuração refaz o estágio. A saída registrada é a
+# impressão digital de silver.crimes (linhas, maior collected_at), conferida no banco
+silver_inputs = {
+    'raw': source_file_hash,
+    'ddl': ddl_digest,
+    'code': source_digest(silver_transform, spatial_grid, silver_incremental, silver_parallel, db_loader),
+    'config': {'load_mode': LOAD_MODE, 'streaming': STREAMING_MODE, 'parallel': PARALLEL_MODE,
+               'pipeline': PIPELINE_MODE, 'storage_format': STORAGE_FORMAT},
+}
+if stage_cache.is_fresh('silver_load', silver_inputs,
+                       valid=lambda out: out == table_fingerprint(engine, 'silver.crimes', 'collected_at')):
+    source_changed = False
+    print("Raw, DDL e código inalterados desde a última carga - estágio silver_load reaproveitado "
+          "(--force silver_load para recarregar)")
+
+if LOAD_MODE == 'incremental' and source_changed:
+    if watermark and watermark['source_file_hash'] == source_file_hash and not count_missing_grid_keys(engine):
+        source_changed = False
+        print("Arquivo Raw inalterado desde a última carga (mesmo hash) - nada a processar")
+    else:
+        existing_hashes = read_source_hashes(engine)
+        last_date = watermark['last_date_reported'] if watermark else None
+        print(f"Modo incremental: {len(existing_hashes):,} registros na Silver (watermark Date Rptd: {last_date})")
+
+# Partições por ano de silver.crimes: criadas sob demanda e, na carga completa,
+# esvaziadas na primeira gravação de cada ano (os demais anos ficam intactos). Os
+# crime_id gravados são removidos dos anos não recarregados: crime_id continua único
+silver_partitions = PartitionedLoad(engine, 'silver.crimes', replace=TRUNCATE_BEFORE_LOAD, key='crime_id')
+
+if source_changed:
+    # Registro anterior deixa de valer: uma carga interrompida será refeita
+    stage_cache.invalidate('silver_load')
+
+if PARALLEL_MODE:
+    print(f"Modo: {LOAD_MODE}, paralelo ({RAW_WORKERS} processos)")
+elif PIPELINE_MODE:
+    print(f"Modo: {LOAD_MODE}, streaming em pipeline (chunks de {CHUNK_SIZE:,} registros, "
+          f"{LOAD_WORKERS} threads de carga, até {PIPELINE_DEPTH} chunks pendentes)")
+elif STREAMING_MODE:
+    print(f"Modo: {LOAD_MODE}, streaming (chunks de {CHUNK_SIZE:,} registros)")
+else:
+    print(f"Modo: {LOAD_MODE}, em memória")
+
+def load_silver(frame, verbose=True, staging=None):
+    # Gravação de um chunk (partições já preparadas); roda nas threads carregadoras no modo pipeline
+    with recorder.stage('load_silver', rows_in=len(frame)) as st:
+        # Gravado em ordem de data: mantém os índices BRIN de date_occurred seletivos
+        frame = frame.sort_values(['date_occurred', 'crime_id'], kind='stable')
+        if LOAD_MODE == 'incremental':
+            stats = upsert_table(frame, 'crimes', engine, schema='silver', key='crime_id', verbose=verbose, staging=staging)
+        else:
+            stats = load_table(frame, 'crimes', engine, schema='silver', verbose=verbose)
+        st['rows_out'] = stats['rows']
+    return stats
+
+def prepare_silver_partitions(frame):
+    # Sempre na thread principal, antes de a gravação do chunk ser submetida
+    with recorder.stage('prepare_partitions', rows_in=len(frame)) as st:
+        st['rows_out'] = len(silver_partitions.prepare(frame['year'], frame['crime_id']))
+
+def write_silver(frame, verbose=True):
+    prepare_silver_partitions(frame)
+    return load_silver(frame, verbose=verbose)
 
 
 # In[ ]:
 
 
-## Etapa 1: Limpeza de Dados
+if IN_MEMORY_MODE and source_changed:
+    # Carregar dados Raw (apenas colunas usadas, com schema tipado)
+    with recorder.stage('read_raw') as st:
+        df = read_raw(RAW_PATH)
+        st['rows_out'] = len(df)
+    print(f"Dados Raw carregados: {len(df):,} registros")
+    print(f"Colunas: {len(df.columns)} ({df.memory_usage(deep=True).sum() / 1024**2:.1f} MB em memória)")
+    df.head(3)
 
 
 # In[ ]:
 
 
-# Limpeza de dados
-print("Aplicando limpeza...")
-
-df_clean = df.copy()
-
-# 1. Remover duplicados
-df_clean = df_clean.drop_duplicates(subset=['DR_NO'])
-print(f"   Após remover duplicados: {len(df_clean):,}")
+## Etapa 1: Limpeza de Dados
 
-# 2. Remover nulos críticos
-df_clean = df_clean.dropna(subset=['DR_NO', 'DATE OCC', 'Crm Cd'])
-print(f"   Após remover nulos críticos: {len(df_clean):,}")
 
-# 3. Remover coordenadas inválidas (0,0)
-df_clean = df_clean[(df_clean['LAT'] != 0) & (df_clean['LON'] != 0)]
-print(f"   Após remover coordenadas inválidas: {len(df_clean):,}")
+# In[ ]:
 
-# 4. Remover idades inválidas
-df_clean = df_clean[(df_clean['Vict Age'] >= 0) & (df_clean['Vict Age'] <= 120)]
-print(f"   Após remover idades inválidas: {len(df_clean):,}")
 
-# 5. Remover registros sem dados essenciais
-df_clean = df_clean.dropna(subset=['Crm Cd Desc', 'AREA NAME', 'Status'])
-print(f"   Após remover campos essenciais nulos: {len(df_clean):,}")
+if IN_MEMORY_MODE and source_changed:
+    # Limpeza de dados
+    print("Aplicando limpeza...")
 
-# 6. Filtro de vítima identificada
-df_clean = df_clean[(df_clean['Vict Age'] > 0) | (df_clean['Vict Sex'].isin(['M', 'F']))]
-print(f"   Após filtro de vítima identificada: {len(df_clean):,}")
+    df_clean = clean_raw_data(df, recorder=recorder)
 
-# 7. Remover localizações inválidas
-df_clean = df_clean[~df_clean['LOCATION'].isna()]
-df_clean = df_clean[~df_clean['Premis Desc'].isna()]
-print(f"   Após filtro de localização: {len(df_clean):,}")
+    print(f"\nLimpeza concluída: {len(df):,} → {len(df_clean):,} ({100*len(df_clean)/len(df):.1f}%)")
 
-print(f"\nLimpeza concluída: {len(df):,} → {len(df_clean):,} ({100*len(df_clean)/len(df):.1f}%)")
+    if LOAD_MODE == 'incremental':
+        with recorder.stage('select_changed', rows_in=len(df_clean)) as st:
+            df_clean = select_new_or_changed(df_clean, existing_hashes, watermark, WATERMARK_LOOKBACK_DAYS)
+            st['rows_out'] = len(df_clean)
+        print(f"   Novos ou alterados: {len(df_clean):,}")
 
 
 # In[ ]:
@@ -135,194 +263,137 @@ print(f"\nLimpeza concluída: {len(df):,} → {len(df_clean):,} ({100*len(df_cle
 # In[ ]:
 
 
-# Mapeamentos
-descent_map = {
-    'A': 'Other Asian', 'B': 'Black', 'C': 'Chinese', 'D': 'Cambodian', 
-    'F': 'Filipino', 'G': 'Guamanian', 'H': 'Hispanic/Latino', 'I': 'American Indian', 
-    'J': 'Japanese', 'K': 'Korean', 'L': 'Laotian', 'O': 'Other', 
-    'P': 'Pacific Islander', 'S': 'Samoan', 'U': 'Hawaiian', 'V': 'Vietnamese', 
-    'W': 'White', 'X': 'Unknown', 'Z': 'Asian Indian', '-': 'Unknown'
-}
-
-sex_map = {'M': 'Male', 'F': 'Female', 'X': 'Unknown', 'H': 'Unknown', '-': 'Unknown'}
-
-def get_period(hour):
-    if 5 <= hour < 12: return 'Morning'
-    elif 12 <= hour < 17: return 'Afternoon'
-    elif 17 <= hour < 21: return 'Evening'
-    else: return 'Night'
-
-def get_crime_category(desc):
-    desc = str(desc).upper()
-    if any(x in desc for x in ['HOMICIDE', 'RAPE', 'ROBBERY', 'ASSAULT', 'KIDNAP', 'BATTERY']): 
-        return 'Violent Crime'
-    elif any(x in desc for x in ['THEFT', 'BURGLARY', 'STOLEN', 'VEHICLE', 'SHOPLIFTING']): 
-        return 'Property Crime'
-    elif any(x in desc for x in ['VANDALISM', 'TRESPASS', 'DISTURBING']): 
-        return 'Quality of Life'
-    else: 
-        return 'Other Crime'
-
-def get_age_group(age):
-    try:
-        age = int(age)
-        if age <= 0: return 'Unknown'
-        elif age < 18: return '0-17'
-        elif age < 26: return '18-25'
-        elif age < 36: return '26-35'
-        elif age < 51: return '36-50'
-        elif age < 66: return '51-65'
-        else: return '65+'
-    except: 
-        return 'Unknown'
-
-def get_premise_category(desc):
-    desc = str(desc).upper()
-    if any(x in desc for x in ['DWELLING', 'RESIDENCE', 'HOUSE', 'APARTMENT', 'CONDOMINIUM']): 
-        return 'Residential'
-    elif any(x in desc for x in ['STREET', 'SIDEWALK', 'PARKING', 'ALLEY', 'PARK', 'BEACH']): 
-        return 'Public'
-    elif any(x in desc for x in ['STORE', 'SHOP', 'RESTAURANT', 'COMMERCIAL', 'OFFICE', 'BANK', 'MARKET']): 
-        return 'Commercial'
-    else: 
-        return 'Other'
-
-def get_weapon_category(desc):
-    desc = str(desc).upper() if pd.notna(desc) else ''
-    if 'GUN' in desc or 'FIREARM' in desc or 'RIFLE' in desc or 'REVOLVER' in desc: 
-        return 'Firearm'
-    elif 'KNIFE' in desc or 'BLADE' in desc or 'CUTTING' in desc: 
-        return 'Blade'
-    elif 'BLUNT' in desc or 'CLUB' in desc or 'BAT' in desc: 
-        return 'Blunt Object'
-    elif 'STRONG-ARM' in desc or 'HANDS' in desc or 'FIST' in desc: 
-        return 'Physical Force'
-    elif desc == '' or desc == 'NAN': 
-        return 'No Weapon'
-    else: 
-        return 'Other Weapon'
-
-print("Funções de transformação definidas")
-
-
-# In[ ]:
-
-
-# Aplicar transformações
-print("Aplicando transformações...")
-
-# Converter datas
-df_clean['date_temp'] = pd.to_datetime(df_clean['DATE OCC'], format='%m/%d/%Y %I:%M:%S %p', errors='coerce')
-df_clean['date_reported_temp'] = pd.to_datetime(df_clean['Date Rptd'], format='%m/%d/%Y %I:%M:%S %p', errors='coerce')
+if IN_MEMORY_MODE and source_changed:
+    # Aplicar transformações
+    print("Aplicando transformações...")
 
-# Remover registros com datas inválidas após parsing
-initial_count = len(df_clean)
-df_clean = df_clean[(df_clean['date_temp'].notna()) & (df_clean['date_reported_temp'].notna())].copy()
-print(f"   Após remover datas inválidas: {len(df_clean):,} (removidos {initial_count - len(df_clean):,})")
+    if VERIFY_CLASSIFIERS:
+        mismatches = check_classifier_parity(df_clean)
+        if mismatches:
+            raise ValueError(f"Classificação vetorizada divergente das funções originais: {mismatches}")
+        print("   Classificadores vetorizados idênticos às funções originais")
 
-# Extrair date_reported para uso posterior
-date_reported = df_clean['date_reported_temp']
+    with recorder.stage('build_silver', rows_in=len(df_clean)) as st:
+        silver = build_silver(df_clean, collected_at=collected_at, recorder=recorder)
+        st['rows_out'] = len(silver)
 
-# Normalizar horário
-time_occ = pd.to_numeric(df_clean['TIME OCC'], errors='coerce').fillna(0).astype(int)
-
-# Criar DataFrame Silver
-silver = pd.DataFrame()
-
-# Identificação
-silver['crime_id'] = df_clean['DR_NO'].values
-
-# Datas - use .values to avoid index alignment issues
-silver['date_reported'] = date_reported.values
-silver['date_occurred'] = df_clean['date_temp'].values
-silver['time_occurred'] = time_occ.values
-
-# Temporal
-silver['hour'] = (time_occ // 100).astype(int).values
-silver['day_of_week'] = df_clean['date_temp'].dt.dayofweek.values
-silver['day_name'] = df_clean['date_temp'].dt.day_name().values
-silver['period_of_day'] = silver['hour'].apply(get_period)
-
-# Localização
-silver['area_code'] = df_clean['AREA'].values
-silver['area_name'] = df_clean['AREA NAME'].values
-silver['district_code'] = df_clean['Rpt Dist No'].values
-
-# Crime
-silver['crime_severity'] = df_clean['Part 1-2'].map({1: 'Serious', 2: 'Minor'}).values
-silver['crime_code'] = df_clean['Crm Cd'].values
-silver['crime_description'] = df_clean['Crm Cd Desc'].values
-silver['crime_category'] = df_clean['Crm Cd Desc'].apply(get_crime_category).values
-
-# Vítima
-silver['victim_age'] = df_clean['Vict Age'].values
-silver['victim_age_group'] = df_clean['Vict Age'].apply(get_age_group).values
-silver['victim_sex'] = df_clean['Vict Sex'].fillna('X').values
-silver['victim_sex_desc'] = df_clean['Vict Sex'].map(sex_map).fillna('Unknown').values
-silver['victim_descent'] = df_clean['Vict Descent'].fillna('X').values
-silver['victim_descent_desc'] = df_clean['Vict Descent'].map(descent_map).fillna('Unknown').values
-
-# Premissa
-silver['premise_code'] = df_clean['Premis Cd'].values
-silver['premise_description'] = df_clean['Premis Desc'].values
-silver['premise_category'] = df_clean['Premis Desc'].apply(get_premise_category).values
-
-# Arma
-silver['weapon_code'] = df_clean['Weapon Used Cd'].values
-silver['weapon_description'] = df_clean['Weapon Desc'].values
-silver['weapon_category'] = df_clean['Weapon Desc'].apply(get_weapon_category).values
-
-# Flags
-silver['is_violent'] = (silver['crime_category'] == 'Violent Crime')
-silver['has_weapon'] = (silver['weapon_category'] != 'No Weapon')
-
-# Status
-silver['status_code'] = df_clean['Status'].values
-silver['status_description'] = df_clean['Status Desc'].values
-silver['case_closed'] = df_clean['Status'].isin(['AA', 'JA']).values
-
-# Coordenadas
-silver['latitude'] = df_clean['LAT'].values
-silver['longitude'] = df_clean['LON'].values
-silver['location'] = df_clean['LOCATION'].str.strip().values
-
-# Dimensões temporais
-silver['year'] = df_clean['date_temp'].dt.year.values
-silver['month'] = df_clean['date_temp'].dt.month.values
-silver['quarter'] = df_clean['date_temp'].dt.quarter.values
-
-# Metadados
-silver['collected_at'] = datetime.now()
-
-print(f"Transformações aplicadas: {len(silver.columns)} colunas criadas")
+    print(f"Transformações aplicadas: {len(silver.columns)} colunas criadas")
 
 
 # In[ ]:
 
 
 # Salvar na camada Silver (PostgreSQL)
-TRUNCATE_BEFORE_LOAD = True
-
-with engine.begin() as conn:
-    if TRUNCATE_BEFORE_LOAD:
-        conn.exec_driver_sql("TRUNCATE TABLE silver.crimes")
-
-silver.to_sql(
-    'crimes',
-    engine,
-    schema='silver',
-    if_exists='append',
-    index=False,
-    chunksize=5000,
-    method='multi'
- )
+raw_count = 0
+silver_count = 0
+last_date_reported = None
+
+if IN_MEMORY_MODE and source_changed:
+    raw_count = len(df)
+    silver_count = len(silver)
+
+    if silver_count:
+        write_silver(silver)
+        last_date_reported = silver['date_reported'].max()
+elif PARALLEL_MODE and source_changed:
+    # Paralelo: shards do CSV limpos, transformados e gravados pelos processos do pool
+    totals = run_parallel(RAW_PATH, DB_URL, silver_partitions, recorder, {
+        'load_mode': LOAD_MODE, 'collected_at': collected_at, 'existing_hashes': existing_hashes,
+        'watermark': watermark, 'lookback_days': WATERMARK_LOOKBACK_DAYS,
+    })
+    raw_count, silver_count = totals['raw_rows'], totals['silver_rows']
+    last_date_reported = totals['last_date_reported']
+    rows_per_sec = silver_count / totals['load_seconds'] if totals['load_seconds'] > 0 else float('inf')
+    print(f"   silver.crimes: {silver_count:,} registros em {totals['load_seconds']:.2f}s de carga somada "
+          f"entre processos ({rows_per_sec:,.0f} registros/s por processo)")
+elif source_changed:
+    # Streaming: cada chunk é limpo, transformado e gravado antes do próximo ser lido.
+    # seen_ids (SeenIds, array int64 ordenado) mantém os DR_NO já processados para
+    # deduplicação entre chunks.
+    # No modo pipeline a gravação é submetida às threads carregadoras e a leitura
+    # do próximo chunk começa em seguida (staging própria por chunk no incremental).
+    load_seconds = 0.0
+    seen_ids = SeenIds()
+    pipeline = LoadPipeline(LOAD_WORKERS, PIPELINE_DEPTH, name='silver-load') if PIPELINE_MODE else None
+    pipeline_start = time.perf_counter()
+
+    try:
+        for i, chunk in enumerate(recorder.iterate('read_raw', iter_raw_chunks(RAW_PATH, CHUNK_SIZE)), start=1):
+            raw_count += len(chunk)
+            chunk_clean = clean_raw_data(chunk, seen_ids=seen_ids, verbose=False, recorder=recorder)
+            if LOAD_MODE == 'incremental':
+                with recorder.stage('select_changed', rows_in=len(chunk_clean)) as st:
+                    chunk_clean = select_new_or_changed(chunk_clean, existing_hashes, watermark, WATERMARK_LOOKBACK_DAYS)
+                    st['rows_out'] = len(chunk_clean)
+            with recorder.stage('build_silver', rows_in=len(chunk_clean)) as st:
+                chunk_silver = build_silver(chunk_clean, collected_at=collected_at, verbose=False, recorder=recorder)
+                st['rows_out'] = len(chunk_silver)
+
+            if len(chunk_silver):
+                if pipeline is not None:
+                    prepare_silver_partitions(chunk_silver)
+                    pipeline.submit(load_silver, chunk_silver, verbose=False, staging=f"crimes_staging_{i}")
+                else:
+                    stats = write_silver(chunk_silver, verbose=False)
+                    load_seconds += stats['seconds']
+                silver_count += len(chunk_silver)
+                chunk_max = chunk_silver['date_reported'].max()
+                last_date_reported = chunk_max if last_date_reported is None else max(last_date_reported, chunk_max)
+            print(f"   Chunk {i}: {len(chunk):,} → {len(chunk_silver):,} registros (acumulado Silver: {silver_count:,})")
+
+            del chunk, chunk_clean, chunk_silver
+
+        if pipeline is not None:
+            with recorder.stage('drain_pipeline'):
+                load_seconds = sum(stats['seconds'] for stats in pipeline.drain())
+    finally:
+        if pipeline is not None:
+            pipeline.close(cancel=True)
+
+    rows_per_sec = silver_count / load_seconds if load_seconds > 0 else float('inf')
+    print(f"   silver.crimes: {silver_count:,} registros em {load_seconds:.2f}s de carga ({rows_per_sec:,.0f} registros/s)")
+    if pipeline is not None:
+        print(f"   Pipeline: {time.perf_counter() - pipeline_start:.2f}s de parede, carga somada {load_seconds:.2f}s, "
+              f"produtor aguardando vaga {pipeline.blocked_seconds:.2f}s")
+
+# Atualizar watermark (hash do arquivo + maior Date Rptd carregado)
+if source_changed:
+    write_watermark(
+        engine,
+        last_date_reported=last_date_reported.to_pydatetime() if last_date_reported is not None else None,
+        source_file_hash=source_file_hash,
+        rows_upserted=silver_count
+    )
+    stage_cache.record('silver_load', table_fingerprint(engine, 'silver.crimes', 'collected_at'))
+
+# Cópias em Parquet: snapshot da Raw (refeito só quando o hash do CSV muda) e
+# exportação de silver.crimes ordenada por crime_id (lida pela Gold com projeção)
+if STORAGE_FORMAT == 'parquet':
+    with recorder.stage('parquet_raw_snapshot'):
+        snapshot_written = snapshot_raw_csv(RAW_PATH, RAW_PARQUET_PATH, source_file_hash)
+    if snapshot_written:
+        print(f"Snapshot Raw: {RAW_PARQUET_PATH.name} ({RAW_PARQUET_PATH.stat().st_size / 1024:.1f} KB)")
+    if source_changed or not SILVER_PARQUET_PATH.exists():
+        with recorder.stage('parquet_silver_copy') as st:
+            rows = export_query_parquet(engine, "SELECT * FROM silver.crimes ORDER BY crime_id", SILVER_PARQUET_PATH, CHUNK_SIZE)
+            st['rows_out'] = rows
+        print(f"Cópia Silver: {SILVER_PARQUET_PATH.name} ({rows:,} registros, {SILVER_PARQUET_PATH.stat().st_size / 1024:.1f} KB)")
 
 print("\n" + "="*50)
 print("ETL Raw → Silver concluído (PostgreSQL)!")
 print("="*50)
 print(f"\nResumo:")
-print(f"   Raw: {len(df):,} registros")
-print(f"   Silver: {len(silver):,} registros")
-print(f"   Redução: {(1 - len(silver)/len(df))*100:.1f}%")
+print(f"   Raw: {raw_count:,} registros")
+print(f"   Silver: {silver_count:,} registros")
+if raw_count and LOAD_MODE == 'incremental':
+    print(f"   Novos/alterados: {silver_count/raw_count*100:.1f}%")
+elif raw_count:
+    print(f"   Redução: {(1 - silver_count/raw_count)*100:.1f}%")
+if silver_partitions.truncated:
+    print(f"   Partições substituídas (ano): {', '.join(map(str, sorted(silver_partitions.truncated)))}")
+if stage_cache.skipped:
+    print(f"   Estágios reaproveitados do cache: {', '.join(stage_cache.skipped)}")
 print(f"\nBase carregada: {POSTGRES_HOST}:{POSTGRES_PORT}/{POSTGRES_DB}")
 
+# Métricas da execução (tabelas silver.etl_runs / silver.etl_stage_metrics + JSON)
+recorder.finish()
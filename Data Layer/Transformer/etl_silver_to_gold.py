@@ -2,10 +2,43 @@
 import pandas as pd
 import numpy as np
 from pathlib import Path
-from datetime import datetime
 import os
+import time
 from sqlalchemy import create_engine, text
 
+from db_loader import load_table
+from gold_transform import (
+    GOLD_SOURCE_COLUMNS, apply_silver_dtypes, read_silver, iter_silver_chunks,
+    build_dim_date, build_dim_time, build_dim_area, build_dim_crime_type, build_dim_victim,
+    build_fato, build_agg_area_month, build_agg_crime_year,
+    partial_agg_area_month, partial_agg_crime_year, merge_agg_area_month, merge_agg_crime_year,
+    dashboard_base, partial_dashboard_aggs, merge_dashboard_aggs
+)
+from columnar_store import STORAGE_FORMAT, save_backup, open_backup, query_arrow_schema, read_parquet_table, iter_parquet_chunks
+from etl_metrics import RunRecorder, METRICS_ENABLED
+from gold_parallel import GOLD_WORKERS, create_stage_pool, submit_stage, wait_stages, timed_stage
+from load_pipeline import LOAD_PIPELINE, PIPELINE_DEPTH, LoadPipeline
+from gold_pushdown import run_pushdown_build, check_pushdown_parity
+from gold_incremental import (
+    read_gold_watermark, write_gold_watermark, read_dimension, next_fact_key, delete_changed_facts,
+    assign_fact_keys, affected_area_month, affected_crime_year, refresh_agg_area_month, refresh_agg_crime_year,
+    affected_dashboard_keys, merge_affected_keys, refresh_dashboard_aggs
+)
+from surrogate_keys import KeyResolver
+from spatial_grid import partial_grid_hotspots, merge_grid_hotspots, affected_grid_cells, refresh_grid_hotspots
+from table_partitions import PartitionedLoad, prepare_source_partitions, detach_legacy_table, migrate_legacy_rows
+from query_service import bump_data_version, read_data_version
+from silver_incremental import file_sha256
+from stage_cache import STAGE_CACHE_DIR, StageCache, parse_force, source_digest, table_fingerprint, ddl_tables_exist
+import db_loader, gold_incremental, gold_pushdown, gold_transform, spatial_grid, surrogate_keys, table_partitions
+from silver_quality import QualityStats, collect_stats, sql_quality_stats, evaluate, report_validation, write_report
+from gold_publish import GOLD_PUBLISH, STAGING_SCHEMA, SchemaSwap
+from crime_sketches import (
+    GOLD_SKETCHES, SKETCH_SOURCE_COLUMNS, sketch_source, partial_sketches, merge_sketches,
+    affected_sketch_groups, refresh_sketches
+)
+import crime_sketches
+
 def find_project_root(start: Path) -> Path:
     for p in [start, *start.parents]:
         if (p / 'Data Layer').exists():
@@ -16,6 +49,11 @@ def find_project_root(start: Path) -> Path:
 PROJECT_ROOT = find_project_root(Path.cwd())
 GOLD_PATH = PROJECT_ROOT / 'Data Layer' / 'gold'
 DDL_PATH = GOLD_PATH / 'ddl.sql'
+BUILD_SQL_PATH = GOLD_PATH / 'build_gold.sql'
+SILVER_PARQUET_PATH = PROJECT_ROOT / 'Data Layer' / 'silver' / 'data_silver.parquet'
+METRICS_PATH = PROJECT_ROOT / 'Data Layer' / 'metrics'
+# Manifesto do cache de estágios (stage_cache.py)
+STAGE_CACHE_PATH = Path(STAGE_CACHE_DIR) if STAGE_CACHE_DIR else PROJECT_ROOT / 'Data Layer' / '.stage_cache'
 
 # Configuração PostgreSQL
 POSTGRES_DB = os.getenv("POSTGRES_DB", "crime_data")
@@ -26,308 +64,595 @@ POSTGRES_PORT = os.getenv("POSTGRES_PORT", "5432")
 DB_URL = f"postgresql+psycopg2://{POSTGRES_USER}:{POSTGRES_PASSWORD}@{POSTGRES_HOST}:{POSTGRES_PORT}/{POSTGRES_DB}"
 
 # Opções de configuração
-SAVE_CSV_BACKUP = True  # Salvar CSV como backup
-TRUNCATE_BEFORE_LOAD = True  # Truncar tabelas antes de carregar
+SAVE_BACKUP = True  # Salvar backup de cada tabela (CSV ou Parquet, via ETL_STORAGE_FORMAT)
+BACKUP_LABEL = f"PostgreSQL + {STORAGE_FORMAT.upper()}" if SAVE_BACKUP else "PostgreSQL"
+# Origem da Silver: 'postgres' ou 'parquet' (cópia data_silver.parquet gerada pela
+# etapa Raw → Silver, lida apenas com as colunas usadas pela Gold)
+SILVER_SOURCE = os.getenv("ETL_SILVER_SOURCE", "postgres").lower()
+# 'full': recria o star schema; 'incremental': processa apenas registros Silver com
+# collected_at acima do watermark, preservando as surrogate keys já publicadas
+GOLD_LOAD_MODE = os.getenv("ETL_GOLD_LOAD_MODE", "full").lower()
+# Leitura da Silver em chunks via cursor server-side (fato e agregações por chunk)
+GOLD_STREAMING = os.getenv("ETL_GOLD_STREAMING", "false").lower() == "true"
+CHUNK_SIZE = int(os.getenv("ETL_CHUNK_SIZE", "100000"))
+# Motor do build: 'pandas' ou 'pushdown' (INSERT ... SELECT dentro do PostgreSQL,
+# apenas carga completa). VERIFY_PUSHDOWN confere o resultado contra o pandas sobre
+# a Silver real (diagnóstico; a paridade é coberta por tests/test_gold_pushdown.py).
+GOLD_ENGINE = os.getenv("ETL_GOLD_ENGINE", "pandas").lower()
+VERIFY_PUSHDOWN = os.getenv("ETL_VERIFY_PUSHDOWN", "false").lower() == "true"
+# Estágios independentes (dimensões, fato, agregações) rodam em paralelo em
+# GOLD_WORKERS threads (env ETL_GOLD_WORKERS; 1 = sequencial)
+# Pipeline (ETL_LOAD_PIPELINE=true, streaming na carga completa): a partir do 2º
+# chunk as gravações de dimensões/fato não são aguardadas antes do próximo chunk;
+# até PIPELINE_DEPTH gravações pendentes no pool de estágios (load_pipeline.py).
+# O modo incremental continua aguardando cada chunk (next_fact_key lê a fato)
+# Publicação (ETL_GOLD_PUBLISH): 'inplace' esvazia e recarrega gold; 'swap' monta a
+# carga completa em gold_staging e troca os schemas em uma transação (gold_publish.py)
+# Sketches (ETL_GOLD_SKETCHES): HyperLogLog, Count-Min e amostra por área, ano e mês
+# em gold.agg_sketches / gold.agg_sketch_sample (crime_sketches.py); exigem também
+# as colunas de arma e local da Silver
+SILVER_COLUMNS = GOLD_SOURCE_COLUMNS + SKETCH_SOURCE_COLUMNS if GOLD_SKETCHES else GOLD_SOURCE_COLUMNS
 
 # Criar diretório gold se não existir
 os.makedirs(GOLD_PATH, exist_ok=True)
 
 print(f"Projeto: {PROJECT_ROOT}")
 print(f"Silver: PostgreSQL ({POSTGRES_HOST}:{POSTGRES_PORT}/{POSTGRES_DB})")
-print(f"Gold: PostgreSQL ({POSTGRES_HOST}:{POSTGRES_PORT}/{POSTGRES_DB}) + CSV backups")
+print(f"Gold: PostgreSQL ({POSTGRES_HOST}:{POSTGRES_PORT}/{POSTGRES_DB}) + {STORAGE_FORMAT.upper()} backups")
 print(f"DDL: {DDL_PATH}")
 
 # Carregar dados Silver do PostgreSQL
-engine = create_engine(DB_URL)
-
-# Aplicar DDL da camada Gold
-print("Aplicando DDL da camada Gold...")
-with engine.begin() as conn:
-    ddl_sql = DDL_PATH.read_text(encoding="utf-8")
-    for stmt in ddl_sql.split(";"):
-        stmt = stmt.strip()
-        if stmt:
-            conn.exec_driver_sql(stmt)
+# Pool com uma conexão por estágio paralelo + a da thread principal
+engine = create_engine(DB_URL, pool_size=GOLD_WORKERS + 1, max_overflow=GOLD_WORKERS)
+
+# Métricas por estágio: gold.etl_runs / gold.etl_stage_metrics + JSON em METRICS_PATH
+recorder = RunRecorder('silver_to_gold', 'gold', METRICS_PATH, engine=engine, config={
+    'load_mode': GOLD_LOAD_MODE, 'engine': GOLD_ENGINE, 'streaming': GOLD_STREAMING, 'chunk_size': CHUNK_SIZE,
+    'workers': GOLD_WORKERS, 'silver_source': SILVER_SOURCE, 'storage_format': STORAGE_FORMAT,
+    'pipeline_depth': PIPELINE_DEPTH, 'publish': GOLD_PUBLISH, 'sketches': GOLD_SKETCHES
+})
+
+# Estágios com entradas declaradas: pulados quando nada mudou (--force ESTÁGIO recalcula)
+stage_cache = StageCache('silver_to_gold', STAGE_CACHE_PATH, force=parse_force())
+recorder.config['forced_stages'] = sorted(stage_cache.force)
+ddl_digest = file_sha256(DDL_PATH)
+
+# Aplicar DDL da camada Gold (estágio ddl: hash do DDL e do código de particionamento)
+if stage_cache.is_fresh('ddl', {'ddl': ddl_digest, 'code': source_digest(table_partitions)},
+                        valid=lambda _: ddl_tables_exist(engine, DDL_PATH)):
+    print("DDL Gold inalterado e já aplicado - estágio ddl reaproveitado")
+else:
+    print("Aplicando DDL da camada Gold...")
+    # Fato criada pelo pandas (sem partições) em versões anteriores: migrada para a
+    # tabela particionada do DDL, com o ano vindo da dim_date
+    detach_legacy_table(engine, 'gold.fato_crimes')
+    with engine.begin() as conn:
+        ddl_sql = DDL_PATH.read_text(encoding="utf-8")
+        for stmt in ddl_sql.split(";"):
+            stmt = stmt.strip()
+            if stmt:
+                conn.exec_driver_sql(stmt)
+    migrate_legacy_rows(engine, 'gold.fato_crimes', year_sql="(SELECT d.year FROM gold.dim_date d WHERE d.sk_date = l.sk_date)")
+    stage_cache.record('ddl')
 print("Schema Gold criado/atualizado")
 
+# Modo incremental requer uma carga Gold anterior (watermark registrado)
+gold_watermark = read_gold_watermark(engine)
+if GOLD_LOAD_MODE == 'incremental' and gold_watermark is None:
+    print("Nenhuma carga Gold anterior encontrada - executando carga completa")
+    GOLD_LOAD_MODE = 'full'
+
+# Estágio gold_build (carga completa): impressão digital da Silver (linhas, maior
+# collected_at), DDL, SQL do push-down, código das transformações e configuração
+# da execução (motor, leitura, backups, publicação). Se nada mudou
+# desde a última carga completa e a fato registrada confere com o banco, a
+# execução segue como incremental sem registros novos: nenhuma tabela é alterada
+gold_inputs = {
+    'silver': table_fingerprint(engine, 'silver.crimes', 'collected_at'),
+    'ddl': ddl_digest,
+    'build_sql': file_sha256(BUILD_SQL_PATH),
+    'code': source_digest(gold_transform, gold_incremental, gold_pushdown, surrogate_keys, spatial_grid, db_loader, crime_sketches),
+    'sketches': GOLD_SKETCHES and crime_sketches.SKETCH_PARAMS,
+    'config': {'engine': GOLD_ENGINE, 'streaming': GOLD_STREAMING, 'silver_source': SILVER_SOURCE,
+               'pipeline': LOAD_PIPELINE, 'backup': SAVE_BACKUP and STORAGE_FORMAT, 'publish': GOLD_PUBLISH},
+}
+GOLD_CACHED = (GOLD_LOAD_MODE == 'full' and gold_watermark is not None and
+               stage_cache.is_fresh('gold_build', gold_inputs,
+                                    valid=lambda out: out == table_fingerprint(engine, 'gold.fato_crimes', 'sk_crime')))
+if GOLD_CACHED:
+    print("Silver, DDL e código inalterados desde a última carga completa - estágio gold_build reaproveitado "
+          "(--force gold_build para reconstruir)")
+    GOLD_LOAD_MODE = 'incremental'
+INCREMENTAL = GOLD_LOAD_MODE == 'incremental'
+TRUNCATE_BEFORE_LOAD = not INCREMENTAL  # Truncar tabelas antes de carregar
+if GOLD_ENGINE == 'pushdown' and INCREMENTAL and not GOLD_CACHED:
+    print("Push-down disponível apenas na carga completa - usando pandas no modo incremental")
+PUSHDOWN = GOLD_ENGINE == 'pushdown' and not INCREMENTAL
+print(f"Modo de carga Gold: {GOLD_LOAD_MODE} ({'push-down SQL' if PUSHDOWN else 'pandas'})")
+GOLD_PIPELINE = LOAD_PIPELINE and GOLD_STREAMING and not INCREMENTAL and not PUSHDOWN
+recorder.config['load_pipeline'] = GOLD_PIPELINE
+# Troca de schema apenas na carga completa: o incremental altera poucas linhas em gold
+if GOLD_PUBLISH == 'swap' and INCREMENTAL and not GOLD_CACHED:
+    print("Publicação por troca de schema disponível apenas na carga completa - atualizando gold diretamente")
+SWAP_PUBLISH = GOLD_PUBLISH == 'swap' and not INCREMENTAL
+# Schema de destino das gravações da carga
+GOLD_SCHEMA = STAGING_SCHEMA if SWAP_PUBLISH else 'gold'
+
+# Registros Silver a processar: todos (carga completa) ou collected_at acima do watermark
+silver_filter = "collected_at > :watermark" if INCREMENTAL else None
+silver_params = {'watermark': gold_watermark['last_collected_at']} if INCREMENTAL else None
+silver_after = gold_watermark['last_collected_at'] if INCREMENTAL else None
+
+# Validações padronizadas de schema e qualidade (Silver), em silver_quality.py.
+# Com a Silver no PostgreSQL (e sempre no push-down) todas as verificações saem de
+# uma única consulta agregada em silver.crimes, com o mesmo filtro da leitura,
+# antes de qualquer tabela Gold ser alterada. Com a cópia Parquet, de contadores
+# calculados em uma passada por DataFrame/chunk e somados. Relatório em METRICS_PATH.
+print("Validando schema e qualidade...")
+SQL_VALIDATION = SILVER_SOURCE != 'parquet' or PUSHDOWN
+quality_report_path = METRICS_PATH / f"silver_quality_{recorder.run_id}.json"
+
+def finish_validation(stats, label=""):
+    report = evaluate(stats)
+    if METRICS_ENABLED:
+        write_report(report, quality_report_path, run_id=recorder.run_id, source=SILVER_SOURCE, mode=GOLD_LOAD_MODE)
+    report_validation(report, label=label)
+    return report
+
+if SQL_VALIDATION:
+    with recorder.stage('validate') as st:
+        quality_stats = sql_quality_stats(engine, where=silver_filter, params=silver_params)
+        st['rows_out'] = quality_stats.rows
+    if INCREMENTAL and quality_stats.rows == 0:
+        print("Validação dispensada: nenhum registro Silver novo ou alterado.")
+    else:
+        finish_validation(quality_stats)
+        print("Validações concluídas com sucesso.")
+
+# Estágio dim_time (estática): código de build_dim_time. Na carga completa em
+# pandas a tabela existente é mantida quando o código não mudou
+DIM_TIME_CACHED = (not INCREMENTAL and not PUSHDOWN and
+                   stage_cache.is_fresh('dim_time', {'code': source_digest(build_dim_time)},
+                                        valid=lambda out: out == table_fingerprint(engine, 'gold.dim_time', 'sk_time')))
+
 # Limpar tabelas antes de carregar (se configurado)
 if TRUNCATE_BEFORE_LOAD:
-    print("Limpando tabelas Gold...")
+    # Registros anteriores deixam de valer: uma carga interrompida será refeita
+    stage_cache.invalidate('gold_build')
+    if not DIM_TIME_CACHED:
+        stage_cache.invalidate('dim_time')
+    if SWAP_PUBLISH:
+        # Tabelas do DDL recriadas UNLOGGED no staging; gold segue publicado
+        print(f"Montando a nova Gold em {GOLD_SCHEMA} (gold continua publicado)...")
+        schema_swap = SchemaSwap(engine, DDL_PATH, staging=GOLD_SCHEMA)
+        with recorder.stage('prepare_staging'):
+            schema_swap.prepare()
+    else:
+        print("Limpando tabelas Gold...")
     with engine.begin() as conn:
         # Drop e recreate é mais simples com pandas - drop todas as tabelas
-        conn.exec_driver_sql("DROP TABLE IF EXISTS gold.fato_crimes CASCADE")
-        conn.exec_driver_sql("DROP TABLE IF EXISTS gold.dim_date CASCADE")
-        conn.exec_driver_sql("DROP TABLE IF EXISTS gold.dim_time CASCADE")
-        conn.exec_driver_sql("DROP TABLE IF EXISTS gold.dim_area CASCADE")
-        conn.exec_driver_sql("DROP TABLE IF EXISTS gold.dim_crime_type CASCADE")
-        conn.exec_driver_sql("DROP TABLE IF EXISTS gold.dim_victim CASCADE")
-        conn.exec_driver_sql("DROP TABLE IF EXISTS gold.agg_area_month CASCADE")
-        conn.exec_driver_sql("DROP TABLE IF EXISTS gold.agg_crime_year CASCADE")
-    print("Tabelas antigas removidas")
-
-# Carregar dados Silver
+        # A fato (particionada, do DDL) é apenas esvaziada: a carga completa renumera
+        # as surrogate keys, então todas as partições são afetadas
+        conn.exec_driver_sql(f"TRUNCATE {GOLD_SCHEMA}.fato_crimes")
+        conn.exec_driver_sql(f"DROP TABLE IF EXISTS {GOLD_SCHEMA}.dim_date CASCADE")
+        if not DIM_TIME_CACHED or SWAP_PUBLISH:
+            conn.exec_driver_sql(f"DROP TABLE IF EXISTS {GOLD_SCHEMA}.dim_time CASCADE")
+        conn.exec_driver_sql(f"DROP TABLE IF EXISTS {GOLD_SCHEMA}.dim_area CASCADE")
+        conn.exec_driver_sql(f"DROP TABLE IF EXISTS {GOLD_SCHEMA}.dim_crime_type CASCADE")
+        conn.exec_driver_sql(f"DROP TABLE IF EXISTS {GOLD_SCHEMA}.dim_victim CASCADE")
+        conn.exec_driver_sql(f"DROP TABLE IF EXISTS {GOLD_SCHEMA}.agg_area_month CASCADE")
+        conn.exec_driver_sql(f"DROP TABLE IF EXISTS {GOLD_SCHEMA}.agg_crime_year CASCADE")
+        # Agregações dos dashboards: tabelas do DDL (com chave primária), apenas esvaziadas
+        conn.exec_driver_sql(f"TRUNCATE {GOLD_SCHEMA}.agg_crimes_area_period, {GOLD_SCHEMA}.agg_crimes_type_year, "
+                             f"{GOLD_SCHEMA}.agg_crime_hotspots, {GOLD_SCHEMA}.agg_grid_hotspots, "
+                             f"{GOLD_SCHEMA}.agg_sketches, {GOLD_SCHEMA}.agg_sketch_sample")
+        if DIM_TIME_CACHED and SWAP_PUBLISH:
+            # Estágio dim_time reaproveitado: a tabela publicada é copiada para o staging
+            conn.exec_driver_sql(f"CREATE UNLOGGED TABLE {GOLD_SCHEMA}.dim_time AS TABLE gold.dim_time")
+    if SWAP_PUBLISH:
+        # Chaves primárias/únicas e índices só depois da carga em lote
+        deferred = schema_swap.defer_constraints()
+        print(f"Staging pronto: {deferred} chaves e {len(schema_swap.indexes)} índices criados após a carga")
+    else:
+        print("Tabelas antigas removidas")
+
+# Watermark da carga (maior collected_at, registros): gravado ao fim, depois da
+# troca de schema quando a publicação é por swap
+watermark_update = None
+
+# Build push-down: dimensões, fato e agregações via INSERT ... SELECT no PostgreSQL
+if PUSHDOWN:
+    print("\nConstruindo Gold no PostgreSQL (push-down)...")
+    with recorder.stage('prepare_partitions'):
+        prepare_source_partitions(engine, f'{GOLD_SCHEMA}.fato_crimes', "SELECT DISTINCT year FROM silver.crimes", unlogged=SWAP_PUBLISH)
+    with recorder.stage('pushdown_build'):
+        elapsed = run_pushdown_build(engine, BUILD_SQL_PATH, schema=GOLD_SCHEMA, unlogged=SWAP_PUBLISH)
+    print(f"   Build SQL concluído em {elapsed:.2f}s")
+    if GOLD_SKETCHES:
+        # Sketches a partir de contagens em SQL (fato + Silver), todos os grupos
+        with recorder.stage('sketches') as st:
+            st['rows_out'] = refresh_sketches(engine, schema=GOLD_SCHEMA)
+        print(f"   agg_sketches: {st['rows_out']:,} grupos (área, ano, mês)")
+
+    if VERIFY_PUSHDOWN:
+        print("Conferindo paridade push-down x pandas...")
+        with recorder.stage('pushdown_parity'):
+            mismatches = check_pushdown_parity(engine, GOLD_SCHEMA)
+        if mismatches:
+            for table, detail in mismatches.items():
+                print(f"   - {table}: {detail}")
+            raise ValueError("Build push-down divergente do build em pandas.")
+        print("   Tabelas idênticas ao build em pandas")
+
+    with engine.connect() as conn:
+        last_collected_at, silver_rows = conn.execute(text("SELECT MAX(collected_at), COUNT(*) FROM silver.crimes")).one()
+    if silver_rows:
+        watermark_update = (last_collected_at, silver_rows)
+    if SAVE_BACKUP:
+        print("   Backups não são gerados no modo push-down (os dados não saem do banco)")
+
+# Carregar dados Silver (apenas as colunas usadas pela Gold)
 print("\nCarregando dados da camada Silver...")
-df_silver = pd.read_sql("SELECT * FROM silver.crimes", engine)
-
-# Datas já estão no formato correto do PostgreSQL
 
-print(f"Dados Silver carregados: {len(df_silver):,} registros")
-print(f"Colunas: {len(df_silver.columns)}")
-df_silver.head(3)
+def iter_silver_batches():
+    if SILVER_SOURCE == 'parquet':
+        return (apply_silver_dtypes(chunk) for chunk in iter_parquet_chunks(SILVER_PARQUET_PATH, CHUNK_SIZE, columns=SILVER_COLUMNS, after=silver_after))
+    return iter_silver_chunks(engine, CHUNK_SIZE, where=silver_filter, params=silver_params, columns=SILVER_COLUMNS)
 
-# Validações padronizadas de schema e qualidade (Silver)
-print("Validando schema e qualidade...")
-
-required_cols = [
-    'crime_id', 'date_occurred', 'date_reported', 'hour',
-    'area_code', 'area_name',
-    'crime_code', 'crime_description', 'crime_category', 'crime_severity',
-    'victim_age_group', 'victim_sex_desc', 'victim_descent_desc',
-    'victim_age',
-    'latitude', 'longitude',
-    'is_violent', 'has_weapon', 'case_closed',
-    'year', 'month'
- ]
-
-null_thresholds = {
-    'crime_id': 0.00,
-    'date_occurred': 0.01,
-    'hour': 0.01,
-    'area_code': 0.01,
-    'crime_code': 0.01
-}
+if SILVER_SOURCE == 'parquet' and not PUSHDOWN:
+    print(f"Origem: {SILVER_PARQUET_PATH} ({len(SILVER_COLUMNS)} colunas projetadas)")
 
-def validate_silver_schema(df):
-    errors = []
-    warnings = []
-
-    if df.empty:
-        errors.append("Dataset vazio.")
-
-    missing = [c for c in required_cols if c not in df.columns]
-    if missing:
-        errors.append(f"Colunas ausentes: {missing}")
-
-    for col in ['date_occurred', 'date_reported']:
-        if col in df.columns and not pd.api.types.is_datetime64_any_dtype(df[col]):
-            warnings.append(f"{col} não está em datetime64; verifique conversão.")
-
-    for col, max_null in null_thresholds.items():
-        if col in df.columns:
-            pct = df[col].isna().mean()
-            if pct > max_null:
-                errors.append(f"{col} com {pct:.1%} nulos (limite {max_null:.1%}).")
-
-    if 'hour' in df.columns:
-        invalid = ~df['hour'].between(0, 23)
-        if invalid.any():
-            errors.append(f"hour fora de 0-23: {invalid.sum():,} registros.")
-
-    if 'latitude' in df.columns and 'longitude' in df.columns:
-        coords = df[['latitude', 'longitude']].dropna()
-        if not coords.empty:
-            la_bounds = coords['latitude'].between(33.7, 34.4) & coords['longitude'].between(-118.7, -118.1)
-            outside = (~la_bounds).sum()
-            if outside / len(coords) > 0.05:
-                warnings.append(f"{outside:,} coordenadas fora do limite LA (>5%).")
-
-    if 'crime_severity' in df.columns:
-        allowed = {'Serious', 'Minor'}
-        invalid = ~df['crime_severity'].dropna().isin(allowed)
-        if invalid.any():
-            warnings.append(f"crime_severity fora do domínio esperado: {invalid.sum():,} registros.")
-
-    if 'crime_id' in df.columns:
-        dup = df['crime_id'].duplicated().sum()
-        if dup > 0:
-            warnings.append(f"crime_id duplicado: {dup:,}")
-
-    return errors, warnings
-
-errors, warnings = validate_silver_schema(df_silver)
-if warnings:
-    print("Avisos:")
-    for w in warnings:
-        print(f"   - {w}")
-
-if errors:
-    print("Erros:")
-    for e in errors:
-        print(f"   - {e}")
-    raise ValueError("Falha nas validações de schema/qualidade. Corrija antes de gerar a Gold.")
+if PUSHDOWN:
+    print("Leitura da Silver dispensada no modo push-down")
+elif GOLD_STREAMING:
+    print(f"Modo streaming: chunks de {CHUNK_SIZE:,} registros")
 else:
-    print("Validações concluídas com sucesso.")
-
-## Criação das Dimensões
-
-# Dimensão: Data (dim_date)
-print("Criando dim_date...")
-
-dim_date = df_silver[['date_occurred']].drop_duplicates().copy()
-dim_date = dim_date.dropna()
-dim_date['sk_date'] = range(1, len(dim_date) + 1)
-dim_date['full_date'] = dim_date['date_occurred']
-dim_date['year'] = dim_date['date_occurred'].dt.year
-dim_date['quarter'] = dim_date['date_occurred'].dt.quarter
-dim_date['month'] = dim_date['date_occurred'].dt.month
-dim_date['month_name'] = dim_date['date_occurred'].dt.month_name()
-dim_date['week_of_year'] = dim_date['date_occurred'].dt.isocalendar().week
-dim_date['day_of_month'] = dim_date['date_occurred'].dt.day
-dim_date['day_of_week'] = dim_date['date_occurred'].dt.dayofweek
-dim_date['day_name'] = dim_date['date_occurred'].dt.day_name()
-dim_date['is_weekend'] = dim_date['day_of_week'].isin([5, 6])
-dim_date = dim_date.drop(columns=['date_occurred'])
-
-# Salvar no PostgreSQL (fail se já existir significa que não foi truncado)
-dim_date.to_sql('dim_date', engine, schema='gold', if_exists='fail', index=False, method='multi')
-if SAVE_CSV_BACKUP:
-    dim_date.to_csv(GOLD_PATH / 'dim_date.csv', index=False)
-print(f"   dim_date: {len(dim_date):,} registros (PostgreSQL + CSV)")
-
-# Dimensão: Tempo (dim_time)
+    with recorder.stage('read_silver') as st:
+        if SILVER_SOURCE == 'parquet':
+            df_silver = apply_silver_dtypes(read_parquet_table(SILVER_PARQUET_PATH, columns=SILVER_COLUMNS, after=silver_after))
+        else:
+            df_silver = read_silver(engine, where=silver_filter, params=silver_params, columns=SILVER_COLUMNS)
+        st['rows_out'] = len(df_silver)
+    if INCREMENTAL:
+        print(f"Registros Silver alterados desde {gold_watermark['last_collected_at']}: {len(df_silver):,}")
+
+    # Datas já estão no formato correto do PostgreSQL
+
+    print(f"Dados Silver carregados: {len(df_silver):,} registros")
+    print(f"Colunas: {len(df_silver.columns)}")
+    df_silver.head(3)
+
+# Validação da cópia Parquet (a Silver no PostgreSQL já foi validada antes da carga)
+if not SQL_VALIDATION and GOLD_STREAMING:
+    # Streaming: cada chunk é validado ao ser lido e os contadores são somados
+    quality_stats = QualityStats()
+    print("Validação executada por chunk durante o processamento.")
+elif not SQL_VALIDATION:
+    with recorder.stage('validate', rows_in=len(df_silver)):
+        quality_stats = collect_stats(df_silver)
+    if INCREMENTAL and df_silver.empty:
+        print("Validação dispensada: nenhum registro Silver novo ou alterado.")
+    else:
+        finish_validation(quality_stats)
+        print("Validações concluídas com sucesso.")
+
+## Criação das Dimensões e da Tabela Fato
+
+# Estado acumulado entre lotes: dimensões completas (existentes + novas),
+# próxima sk_crime, agregações parciais e grupos afetados (modo incremental)
+dims = {
+    'dim_date': read_dimension(engine, 'dim_date') if INCREMENTAL else None,
+    'dim_area': read_dimension(engine, 'dim_area') if INCREMENTAL else None,
+    'dim_crime_type': read_dimension(engine, 'dim_crime_type') if INCREMENTAL else None,
+    'dim_victim': read_dimension(engine, 'dim_victim') if INCREMENTAL else None,
+}
+dim_builders = {
+    'dim_date': build_dim_date,
+    'dim_area': build_dim_area,
+    'dim_crime_type': build_dim_crime_type,
+    'dim_victim': build_dim_victim,
+}
+new_members_count = {table: 0 for table in dims}
+next_sk_crime = 1
+facts_inserted = 0
+facts_updated = 0
+silver_rows = 0
+last_collected_at = None
+agg_partials = {'agg_area_month': [], 'agg_crime_year': []}
+affected_keys = {'agg_area_month': [], 'agg_crime_year': []}
+# Agregações dos dashboards: parciais por lote (carga completa) ou grupos afetados (incremental)
+dashboard_partials = []
+dashboard_keys = []
+# Hotspots da grade espacial: contagens por lote ou células afetadas (incremental)
+grid_partials = []
+grid_cells = []
+# Sketches: contagens e amostras por lote ou grupos (área, ano, mês) afetados
+sketch_partials = []
+sketch_groups = []
+# Partições por ano da fato, criadas antes da gravação de cada lote
+fact_partitions = PartitionedLoad(engine, f'{GOLD_SCHEMA}.fato_crimes', unlogged=SWAP_PUBLISH)
+# Lookups das surrogate keys em cache entre lotes (reconstruídas quando a dimensão cresce)
+key_resolver = KeyResolver()
+
+# Pool de estágios: cada future devolve (estágio, resultado, segundos)
+stage_pool = create_stage_pool(GOLD_WORKERS)
+stage_times = {}
+pending_stages = []
+# Pipeline: gravações dos chunks seguintes ao 1º, limitadas a PIPELINE_DEPTH pendentes
+load_pipeline = LoadPipeline(max_pending=PIPELINE_DEPTH, executor=stage_pool) if GOLD_PIPELINE else None
+pipelined_stages = []
+build_start = time.perf_counter()
+
+def write_gold_table(df, table, if_exists, verbose=True):
+    # Gravação no PostgreSQL. Na publicação por troca de schema as tabelas criadas
+    # pelo pandas (dimensões, agg_area_month/agg_crime_year) nascem UNLOGGED no staging
+    if SWAP_PUBLISH and schema_swap.create_table(df, table, replace=if_exists == 'replace'):
+        if_exists = 'append'
+    return load_table(df, table, engine, schema=GOLD_SCHEMA, if_exists=if_exists, verbose=verbose)
+
+def load_gold_table(df, table, if_exists, verbose=True):
+    # Estágio de gravação: PostgreSQL + backup (CSV ou Parquet)
+    write_gold_table(df, table, if_exists, verbose=verbose)
+    if SAVE_BACKUP:
+        save_backup(df, GOLD_PATH, table)
+    return len(df)
+
+def build_and_load_agg(table, build, source, if_exists):
+    return load_gold_table(build(source), table, if_exists)
+
+# Dimensão: Tempo (dim_time) - estática, criada apenas na carga completa
 print("Criando dim_time...")
-
-dim_time = pd.DataFrame({'hour': range(24)})
-dim_time['sk_time'] = dim_time['hour'] + 1
-dim_time['period_of_day'] = dim_time['hour'].apply(
-    lambda h: 'Madrugada' if h < 6 else 'Manhã' if h < 12 else 'Tarde' if h < 18 else 'Noite'
-)
-dim_time['is_rush_hour'] = dim_time['hour'].isin([7, 8, 9, 17, 18, 19])
-
-# Salvar no PostgreSQL
-dim_time.to_sql('dim_time', engine, schema='gold', if_exists='fail', index=False, method='multi')
-if SAVE_CSV_BACKUP:
-    dim_time.to_csv(GOLD_PATH / 'dim_time.csv', index=False)
-print(f"   dim_time: {len(dim_time):,} registros (PostgreSQL + CSV)")
-
-# Dimensão: Área (dim_area)
-print("Criando dim_area...")
-
-dim_area = df_silver[['area_code', 'area_name']].drop_duplicates().copy()
-dim_area['sk_area'] = range(1, len(dim_area) + 1)
-
-# Classificar regiões
-def get_region(area_name):
-    north = ['DEVONSHIRE', 'FOOTHILL', 'MISSION', 'NORTH HOLLYWOOD', 'VAN NUYS', 'WEST VALLEY']
-    south = ['77TH STREET', 'HARBOR', 'SOUTHEAST', 'SOUTHWEST']
-    central = ['CENTRAL', 'HOLLENBECK', 'RAMPART']
-    west = ['HOLLYWOOD', 'OLYMPIC', 'PACIFIC', 'WEST LA', 'WILSHIRE']
-    
-    if area_name in north: return 'North'
-    elif area_name in south: return 'South'
-    elif area_name in central: return 'Central'
-    elif area_name in west: return 'West'
-    else: return 'Other'
-
-dim_area['region'] = dim_area['area_name'].apply(get_region)
-
-# Salvar no PostgreSQL
-dim_area.to_sql('dim_area', engine, schema='gold', if_exists='fail', index=False, method='multi')
-if SAVE_CSV_BACKUP:
-    dim_area.to_csv(GOLD_PATH / 'dim_area.csv', index=False)
-print(f"   dim_area: {len(dim_area):,} registros (PostgreSQL + CSV)")
-
-# Dimensão: Tipo de Crime (dim_crime_type)
-print("Criando dim_crime_type...")
-
-dim_crime_type = df_silver[['crime_code', 'crime_description', 'crime_category', 'crime_severity']].drop_duplicates().copy()
-dim_crime_type['sk_crime_type'] = range(1, len(dim_crime_type) + 1)
-dim_crime_type['is_violent'] = dim_crime_type['crime_category'] == 'Violent Crime'
-dim_crime_type['severity_level'] = dim_crime_type['crime_severity'].map({'Serious': 3, 'Minor': 1})
-
-# Salvar no PostgreSQL
-dim_crime_type.to_sql('dim_crime_type', engine, schema='gold', if_exists='fail', index=False, method='multi')
-if SAVE_CSV_BACKUP:
-    dim_crime_type.to_csv(GOLD_PATH / 'dim_crime_type.csv', index=False)
-print(f"   dim_crime_type: {len(dim_crime_type):,} registros (PostgreSQL + CSV)")
-
-# Dimensão: Vítima (dim_victim)
-print("Criando dim_victim...")
-
-dim_victim = df_silver[['victim_age_group', 'victim_sex_desc', 'victim_descent_desc']].drop_duplicates().copy()
-dim_victim['sk_victim'] = range(1, len(dim_victim) + 1)
-dim_victim = dim_victim.rename(columns={
-    'victim_age_group': 'age_group',
-    'victim_sex_desc': 'sex',
-    'victim_descent_desc': 'descent'
-})
-
-# Salvar no PostgreSQL
-dim_victim.to_sql('dim_victim', engine, schema='gold', if_exists='fail', index=False, method='multi')
-if SAVE_CSV_BACKUP:
-    dim_victim.to_csv(GOLD_PATH / 'dim_victim.csv', index=False)
-print(f"   dim_victim: {len(dim_victim):,} registros (PostgreSQL + CSV)")
-
-## Criação da Tabela Fato
-
-# Tabela Fato: fato_crimes
-print("Criando fato_crimes...")
-
-# Criar mapeamentos de surrogate keys
-date_map = dim_date.set_index('full_date')['sk_date'].to_dict()
-time_map = dim_time.set_index('hour')['sk_time'].to_dict()
-area_map = dim_area.set_index('area_code')['sk_area'].to_dict()
-crime_type_map = dim_crime_type.set_index('crime_code')['sk_crime_type'].to_dict()
-
-# Criar chave composta para victim
-dim_victim['victim_key'] = dim_victim['age_group'] + '|' + dim_victim['sex'] + '|' + dim_victim['descent']
-victim_map = dim_victim.set_index('victim_key')['sk_victim'].to_dict()
-
-# Construir fato
-fato = pd.DataFrame()
-fato['sk_crime'] = range(1, len(df_silver) + 1)
-fato['nk_crime_id'] = df_silver['crime_id'].values
-fato['sk_date'] = df_silver['date_occurred'].map(date_map).values
-fato['sk_time'] = df_silver['hour'].map(time_map).values
-fato['sk_area'] = df_silver['area_code'].map(area_map).values
-fato['sk_crime_type'] = df_silver['crime_code'].map(crime_type_map).values
-
-# Mapear vítima
-df_silver['victim_key'] = df_silver['victim_age_group'] + '|' + df_silver['victim_sex_desc'] + '|' + df_silver['victim_descent_desc']
-fato['sk_victim'] = df_silver['victim_key'].map(victim_map).values
-
-# Métricas
-fato['latitude'] = df_silver['latitude'].values
-fato['longitude'] = df_silver['longitude'].values
-fato['is_violent'] = df_silver['is_violent'].values
-fato['has_weapon'] = df_silver['has_weapon'].values
-fato['case_closed'] = df_silver['case_closed'].values
-
-# Salvar no PostgreSQL
-fato.to_sql('fato_crimes', engine, schema='gold', if_exists='fail', index=False, chunksize=5000, method='multi')
-if SAVE_CSV_BACKUP:
-    fato.to_csv(GOLD_PATH / 'fato_crimes.csv', index=False)
-print(f"   fato_crimes: {len(fato):,} registros (PostgreSQL + CSV)")
+if INCREMENTAL or PUSHDOWN or DIM_TIME_CACHED:
+    dim_time = read_dimension(engine, 'dim_time', GOLD_SCHEMA)
+    print(f"   dim_time: {len(dim_time):,} registros (inalterada)")
+else:
+    # O DataFrame já basta para o mapeamento da fato; a gravação segue em paralelo
+    dim_time = build_dim_time()
+    pending_stages.append(submit_stage(stage_pool, 'dim_time', recorder.wrap('load_dim_time', load_gold_table), dim_time, 'dim_time', 'fail'))
+    print(f"   dim_time: {len(dim_time):,} registros ({BACKUP_LABEL})")
+
+# Agregações da carga completa em memória dependem só da Silver: começam junto com as dimensões
+if not PUSHDOWN and not INCREMENTAL and not GOLD_STREAMING and len(df_silver):
+    pending_stages.append(submit_stage(stage_pool, 'agg_area_month', recorder.wrap('agg_area_month', build_and_load_agg, len(df_silver)), 'agg_area_month', build_agg_area_month, df_silver, 'fail'))
+    pending_stages.append(submit_stage(stage_pool, 'agg_crime_year', recorder.wrap('agg_crime_year', build_and_load_agg, len(df_silver)), 'agg_crime_year', build_agg_crime_year, df_silver, 'replace'))
+
+# Backup da fato gravado lote a lote (apenas na carga completa), no Parquet com o
+# schema da tabela: colunas só com nulos em um lote não fixam o tipo do arquivo
+fato_backup = None
+if SAVE_BACKUP and not INCREMENTAL and not PUSHDOWN:
+    fato_schema = query_arrow_schema(engine, f"SELECT * FROM {GOLD_SCHEMA}.fato_crimes") if STORAGE_FORMAT == 'parquet' else None
+    fato_backup = open_backup(GOLD_PATH, 'fato_crimes', schema=fato_schema)
+
+def submit_batch_stage(name, fn, *args, **kwargs):
+    # Depois do 1º chunk (tabelas já criadas) as gravações seguem pelo pipeline
+    if load_pipeline is not None and facts_inserted:
+        return load_pipeline.submit(timed_stage, name, fn, *args, **kwargs)
+    return submit_stage(stage_pool, name, fn, *args, **kwargs)
+
+def process_silver_batch(batch, verbose=True):
+    # Dimensões: apenas membros novos recebem surrogate keys e são gravados;
+    # as chaves já publicadas (no banco ou em lotes anteriores) não mudam
+    # A fato espera apenas os DataFrames das dimensões (mapeamento de chaves);
+    # as gravações das dimensões e da fato correm em paralelo no pool
+    global next_sk_crime, facts_inserted, facts_updated, silver_rows, last_collected_at
+    batch_stages = []
+    for table, build in dim_builders.items():
+        with recorder.stage(f'build_{table}', rows_in=len(batch)) as st:
+            new_rows = build(batch, dims[table])
+            st['rows_out'] = len(new_rows)
+        if len(new_rows):
+            batch_stages.append(submit_batch_stage(table, recorder.wrap(f'load_{table}', write_gold_table), new_rows, table, 'append', verbose=verbose))
+        dims[table] = pd.concat([dims[table], new_rows], ignore_index=True) if dims[table] is not None else new_rows
+        new_members_count[table] += len(new_rows)
+
+    # Tabela Fato: fato_crimes
+    if INCREMENTAL:
+        # Substitui apenas as linhas dos registros alterados, reaproveitando sk_crime
+        start_key = next_fact_key(engine)
+        with recorder.stage('delete_changed_facts', rows_in=len(batch)) as st:
+            old_facts = delete_changed_facts(engine, batch['crime_id'])
+            st['rows_out'] = len(old_facts)
+        sk_crime = assign_fact_keys(batch['crime_id'], old_facts, start_key)
+        facts_updated += len(old_facts)
+        affected_keys['agg_area_month'].append(affected_area_month(batch, old_facts, dims['dim_area'], dims['dim_date']))
+        affected_keys['agg_crime_year'].append(affected_crime_year(batch, old_facts, dims['dim_crime_type']))
+    else:
+        sk_crime = range(next_sk_crime, next_sk_crime + len(batch))
+        next_sk_crime += len(batch)
+        if GOLD_STREAMING:
+            with recorder.stage('partial_aggregates', rows_in=len(batch)):
+                agg_partials['agg_area_month'].append(partial_agg_area_month(batch))
+                agg_partials['agg_crime_year'].append(partial_agg_crime_year(batch))
+
+    with recorder.stage('build_fato_crimes', rows_in=len(batch)) as st:
+        fato = build_fato(batch, dims['dim_date'], dim_time, dims['dim_area'], dims['dim_crime_type'], dims['dim_victim'], sk_crime=sk_crime, resolver=key_resolver)
+        st['rows_out'] = len(fato)
+
+    # Agregações dos dashboards na mesma passada, com as chaves da fato já resolvidas
+    with recorder.stage('dashboard_partials', rows_in=len(batch)):
+        base = dashboard_base(batch, fato, dim_time)
+        if INCREMENTAL:
+            dashboard_keys.append(affected_dashboard_keys(base, old_facts, dims['dim_date'], dim_time))
+        else:
+            dashboard_partials.append(partial_dashboard_aggs(base))
+    with recorder.stage('grid_partials', rows_in=len(batch)):
+        if INCREMENTAL:
+            # Células dos valores novos e dos antigos
+            grid_cells.append(affected_grid_cells(pd.concat([batch['grid_key'], old_facts['grid_key']], ignore_index=True),
+                                                  pd.concat([batch['year'], old_facts['year']], ignore_index=True)))
+        else:
+            grid_partials.append(partial_grid_hotspots(batch['grid_key'], batch['year'], batch['is_violent']))
+    if GOLD_SKETCHES:
+        with recorder.stage('sketch_partials', rows_in=len(batch)):
+            source = sketch_source(batch, fato)
+            if INCREMENTAL:
+                sketch_groups.append(affected_sketch_groups(source, old_facts, dims['dim_date']))
+            else:
+                sketch_partials.append(partial_sketches(source))
+    with recorder.stage('prepare_partitions', rows_in=len(fato)):
+        fact_partitions.prepare(fato['year'])
+    batch_stages.append(submit_batch_stage('fato_crimes', recorder.wrap('load_fato_crimes', load_table), fato, 'fato_crimes', engine, schema=GOLD_SCHEMA, if_exists='append', verbose=verbose))
+    if fato_backup is not None:
+        with recorder.stage('backup_fato_crimes', rows_in=len(fato)):
+            fato_backup.write(fato)
+    # Tabelas criadas pelo primeiro lote precisam existir antes do próximo
+    if load_pipeline is not None and facts_inserted:
+        pipelined_stages.extend(batch_stages)
+    else:
+        wait_stages(batch_stages, stage_times)
+    facts_inserted += len(fato)
+
+    silver_rows += len(batch)
+    batch_max = batch['collected_at'].max()
+    last_collected_at = batch_max if last_collected_at is None else max(last_collected_at, batch_max)
+
+try:
+    if PUSHDOWN:
+        pass
+    elif GOLD_STREAMING:
+        for i, batch in enumerate(recorder.iterate('read_silver', iter_silver_batches()), start=1):
+            if not SQL_VALIDATION:
+                with recorder.stage('validate', rows_in=len(batch)):
+                    # No chunk só colunas, tipos e faixa de hour; taxas sobre a Silver inteira ao fim
+                    chunk_stats = collect_stats(batch)
+                    report_validation(evaluate(chunk_stats, chunk=True), label=f" (chunk {i})")
+                    quality_stats.merge(chunk_stats)
+            process_silver_batch(batch, verbose=False)
+            print(f"   Chunk {i}: {len(batch):,} registros Silver (acumulado: {silver_rows:,})")
+    elif len(df_silver):
+        process_silver_batch(df_silver)
+
+    if pipelined_stages:
+        with recorder.stage('drain_pipeline'):
+            wait_stages(pipelined_stages, stage_times)
+        print(f"Pipeline de carga: produtor aguardou vaga por {load_pipeline.blocked_seconds:.2f}s")
+except BaseException:
+    # Carga interrompida: o backup parcial da fato é descartado (writer fechado, sem .tmp)
+    if fato_backup is not None:
+        fato_backup.abort()
+    raise
+
+if not SQL_VALIDATION and GOLD_STREAMING and quality_stats.rows:
+    # Relatório da Silver inteira (inclui crime_id duplicado entre chunks)
+    finish_validation(quality_stats)
+
+if fato_backup is not None:
+    fato_backup.close()
+
+NOTHING_TO_DO = PUSHDOWN or silver_rows == 0
+if silver_rows:
+    # Linhas da fato sem membro correspondente na dimensão (sk nula)
+    recorder.config['unmatched_keys'] = key_resolver.unmatched
+    unmatched = {table: count for table, count in key_resolver.unmatched.items() if count}
+    if unmatched:
+        print(f"Aviso: chaves sem correspondência na fato: {unmatched}")
+    else:
+        print(f"Surrogate keys resolvidas para {silver_rows:,} registros ({key_resolver.builds} lookups construídas)")
+if silver_rows == 0 and INCREMENTAL:
+    print("Nenhum registro Silver novo ou alterado - Gold já está atualizada")
+
+for table, dim in ({} if PUSHDOWN else dims).items():
+    if dim is not None and SAVE_BACKUP:
+        save_backup(dim, GOLD_PATH, table)
+    total = len(dim) if dim is not None else 0
+    print(f"   {table}: {new_members_count[table]:,} novos registros, {total:,} no total ({BACKUP_LABEL})")
+dim_date, dim_area, dim_crime_type, dim_victim = dims['dim_date'], dims['dim_area'], dims['dim_crime_type'], dims['dim_victim']
+
+if PUSHDOWN:
+    pass
+elif INCREMENTAL:
+    print(f"   fato_crimes: {facts_updated:,} atualizados, {facts_inserted - facts_updated:,} novos (PostgreSQL)")
+else:
+    print(f"   fato_crimes: {facts_inserted:,} registros ({BACKUP_LABEL})")
 
 ## Criação das Agregações
 
-# Agregação: Crimes por Área e Mês
-print("Criando agregações...")
-
-agg_area_month = df_silver.groupby(['area_name', 'year', 'month']).agg(
-    total_crimes=('crime_id', 'count'),
-    violent_crimes=('is_violent', 'sum'),
-    crimes_with_weapon=('has_weapon', 'sum'),
-    cases_closed=('case_closed', 'sum')
-).reset_index()
-
-# Salvar no PostgreSQL
-agg_area_month.to_sql('agg_area_month', engine, schema='gold', if_exists='fail', index=False, method='multi')
-if SAVE_CSV_BACKUP:
-    agg_area_month.to_csv(GOLD_PATH / 'agg_area_month.csv', index=False)
-print(f"   agg_area_month: {len(agg_area_month):,} registros (PostgreSQL + CSV)")
-
-# Agregação: Crimes por Tipo e Ano
-agg_crime_year = df_silver.groupby(['crime_description', 'crime_category', 'year']).agg(
-    total_crimes=('crime_id', 'count'),
-    avg_victim_age=('victim_age', 'mean')
-).reset_index()
-
-# Salvar no PostgreSQL
-agg_crime_year.to_sql('agg_crime_year', engine, schema='gold', if_exists='replace', index=False, method='multi')
-if SAVE_CSV_BACKUP:
-    agg_crime_year.to_csv(GOLD_PATH / 'agg_crime_year.csv', index=False)
-print(f"   agg_crime_year: {len(agg_crime_year):,} registros (PostgreSQL + CSV)")
+if not NOTHING_TO_DO:
+    print("Criando agregações...")
+
+    if INCREMENTAL:
+        # Recalcula somente os grupos tocados pelos registros alterados (valores novos e antigos)
+        area_month_keys = pd.concat(affected_keys['agg_area_month']).drop_duplicates()
+        crime_year_keys = pd.concat(affected_keys['agg_crime_year']).drop_duplicates()
+        pending_stages.append(submit_stage(stage_pool, 'agg_area_month', recorder.wrap('agg_area_month', refresh_agg_area_month), engine, area_month_keys))
+        pending_stages.append(submit_stage(stage_pool, 'agg_crime_year', recorder.wrap('agg_crime_year', refresh_agg_crime_year), engine, crime_year_keys))
+        pending_stages.append(submit_stage(stage_pool, 'dashboard_aggs', recorder.wrap('refresh_dashboard_aggs', refresh_dashboard_aggs), engine, merge_affected_keys(dashboard_keys)))
+        pending_stages.append(submit_stage(stage_pool, 'agg_grid_hotspots', recorder.wrap('refresh_grid_hotspots', refresh_grid_hotspots), engine, pd.concat(grid_cells).drop_duplicates()))
+        if GOLD_SKETCHES:
+            pending_stages.append(submit_stage(stage_pool, 'agg_sketches', recorder.wrap('refresh_sketches', refresh_sketches), engine, pd.concat(sketch_groups).drop_duplicates()))
+        results = wait_stages(pending_stages, stage_times)
+        pending_stages.clear()
+        print(f"   agg_area_month: {results['agg_area_month']:,} grupos recalculados")
+        print(f"   agg_crime_year: {results['agg_crime_year']:,} grupos recalculados")
+        print(f"   agg_crimes_area_period / agg_crimes_type_year / agg_crime_hotspots: {results['dashboard_aggs']:,} grupos recalculados")
+        print(f"   agg_grid_hotspots: {results['agg_grid_hotspots']:,} células recalculadas")
+        if GOLD_SKETCHES:
+            print(f"   agg_sketches / agg_sketch_sample: {results['agg_sketches']:,} grupos recalculados")
+    else:
+        # Agregação: Crimes por Área e Mês / Crimes por Tipo e Ano
+        # (em memória já foram submetidas junto com as dimensões; em streaming
+        # combina os parciais por chunk)
+        if GOLD_STREAMING:
+            pending_stages.append(submit_stage(stage_pool, 'agg_area_month', recorder.wrap('agg_area_month', build_and_load_agg), 'agg_area_month', merge_agg_area_month, agg_partials['agg_area_month'], 'fail'))
+            pending_stages.append(submit_stage(stage_pool, 'agg_crime_year', recorder.wrap('agg_crime_year', build_and_load_agg), 'agg_crime_year', merge_agg_crime_year, agg_partials['agg_crime_year'], 'replace'))
+        # Agregações dos dashboards: combina os parciais e grava nas tabelas do DDL
+        with recorder.stage('merge_dashboard_aggs') as st:
+            dashboard_aggs = merge_dashboard_aggs(dashboard_partials)
+            st['rows_out'] = sum(len(df) for df in dashboard_aggs.values())
+        with recorder.stage('merge_grid_hotspots') as st:
+            dashboard_aggs['agg_grid_hotspots'] = merge_grid_hotspots(grid_partials)
+            st['rows_out'] = len(dashboard_aggs['agg_grid_hotspots'])
+        if GOLD_SKETCHES:
+            with recorder.stage('merge_sketches') as st:
+                dashboard_aggs.update(merge_sketches(sketch_partials))
+                st['rows_out'] = len(dashboard_aggs['agg_sketches'])
+        for table, df in dashboard_aggs.items():
+            pending_stages.append(submit_stage(stage_pool, table, recorder.wrap(f'load_{table}', load_gold_table), df, table, 'append'))
+        results = wait_stages(pending_stages, stage_times)
+        pending_stages.clear()
+        for table in ['agg_area_month', 'agg_crime_year', *dashboard_aggs]:
+            print(f"   {table}: {results[table]:,} registros ({BACKUP_LABEL})")
+
+    watermark_update = (last_collected_at.to_pydatetime(), silver_rows)
+
+# Estágios restantes (ex.: dim_time quando não houve registros a processar)
+wait_stages(pending_stages, stage_times)
+stage_pool.shutdown()
+if stage_times:
+    wall = time.perf_counter() - build_start
+    print(f"\nEstágios ({GOLD_WORKERS} threads): {wall:.2f}s de parede x {sum(stage_times.values()):.2f}s somados")
+    for stage, seconds in sorted(stage_times.items(), key=lambda kv: -kv[1]):
+        print(f"   {stage}: {seconds:.2f}s")
+
+# Publicação por troca de schema: tabelas LOGGED, chaves, índices, ANALYZE e troca atômica
+if SWAP_PUBLISH:
+    print(f"\nPublicando {GOLD_SCHEMA} como gold...")
+    with recorder.stage('finalize_staging') as st:
+        st['rows_out'] = schema_swap.finalize()
+    with recorder.stage('swap_schema'):
+        schema_swap.swap()
+    timings = schema_swap.timings
+    print(f"   SET LOGGED {timings['set_logged']:.2f}s, chaves/índices {timings['indexes']:.2f}s, "
+          f"ANALYZE {timings['analyze']:.2f}s, {schema_swap.grants} privilégios de gold copiados, "
+          f"troca {timings['swap'] * 1000:.0f}ms")
+
+# Atualizar watermark Gold (maior collected_at processado)
+if watermark_update is not None:
+    write_gold_watermark(engine, *watermark_update)
+
+# Saídas dos estágios da carga completa registradas no manifesto
+if not INCREMENTAL:
+    if not PUSHDOWN and not DIM_TIME_CACHED:
+        stage_cache.record('dim_time', table_fingerprint(engine, 'gold.dim_time', 'sk_time'))
+    stage_cache.record('gold_build', table_fingerprint(engine, 'gold.fato_crimes', 'sk_crime'))
+
+# Nova versão dos dados Gold: invalida os resultados em cache do serviço de consultas
+# (estágio reaproveitado: os dados não mudaram, a versão também não)
+if GOLD_CACHED:
+    with engine.connect() as conn:
+        data_version = read_data_version(conn)
+else:
+    data_version = bump_data_version(engine)
 
 # Resumo final
 print("\n" + "="*50)
@@ -339,18 +664,27 @@ print("\nResumo do carregamento (PostgreSQL):")
 with engine.connect() as conn:
     tables_to_check = [
         'dim_date', 'dim_time', 'dim_area', 'dim_crime_type', 'dim_victim',
-        'fato_crimes', 'agg_area_month', 'agg_crime_year'
+        'fato_crimes', 'agg_area_month', 'agg_crime_year',
+        'agg_crimes_area_period', 'agg_crimes_type_year', 'agg_crime_hotspots', 'agg_grid_hotspots',
+        'agg_sketches', 'agg_sketch_sample'
     ]
     for table in tables_to_check:
         result = conn.execute(text(f"SELECT COUNT(*) FROM gold.{table}"))
         count = result.scalar()
         print(f"   gold.{table}: {count:,} registros")
 
-if SAVE_CSV_BACKUP:
-    print("\nArquivos CSV de backup:")
-    for f in sorted(GOLD_PATH.glob('*.csv')):
+if SAVE_BACKUP:
+    suffix = 'parquet' if STORAGE_FORMAT == 'parquet' else 'csv'
+    print(f"\nArquivos {suffix.upper()} de backup:")
+    for f in sorted(GOLD_PATH.glob(f'*.{suffix}')):
         size_kb = f.stat().st_size / 1024
         print(f"   {f.name}: {size_kb:.1f} KB")
-    print(f"\nDiretório CSV: {GOLD_PATH}")
+    print(f"\nDiretório de backup: {GOLD_PATH}")
 
+print(f"\nVersão dos dados Gold: {data_version}")
+if stage_cache.skipped:
+    print(f"Estágios reaproveitados do cache: {', '.join(stage_cache.skipped)}")
 print(f"\nBase de dados Gold: {POSTGRES_HOST}:{POSTGRES_PORT}/{POSTGRES_DB}")
+
+# Métricas da execução (tabelas gold.etl_runs / gold.etl_stage_metrics + JSON)
+recorder.finish()
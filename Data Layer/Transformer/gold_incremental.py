@@ -0,0 +1,289 @@
+# Carga incremental Silver → Gold
+# Watermark sobre silver.crimes.collected_at em gold.etl_watermark, troca apenas
+# das linhas fato dos registros Silver alterados (preservando sk_crime) e
+# recálculo somente dos grupos de agregação afetados.
+
+import pandas as pd
+from sqlalchemy import text
+
+from gold_transform import (
+    AREA_PERIOD_KEYS, TYPE_YEAR_KEYS, HOTSPOT_KEYS, HOTSPOT_DECIMALS, HOTSPOT_LEVELS, HOTSPOT_DEFAULT_LEVEL, grid_cell
+)
+
+PIPELINE_NAME = 'silver_to_gold'
+# Colunas devolvidas pelas linhas fato removidas (chaves das agregações afetadas)
+FACT_KEY_COLUMNS = ['nk_crime_id', 'sk_crime', 'sk_date', 'sk_time', 'sk_area', 'sk_crime_type', 'latitude', 'longitude', 'grid_key', 'year']
+
+
+def read_gold_watermark(engine, pipeline=PIPELINE_NAME):
+    with engine.connect() as conn:
+        row = conn.execute(
+            text("SELECT last_collected_at, rows_processed, updated_at "
+                 "FROM gold.etl_watermark WHERE pipeline = :pipeline"),
+            {'pipeline': pipeline}
+        ).mappings().first()
+    return dict(row) if row else None
+
+
+def write_gold_watermark(engine, last_collected_at, rows_processed, pipeline=PIPELINE_NAME):
+    with engine.begin() as conn:
+        conn.execute(
+            text("""
+                INSERT INTO gold.etl_watermark (pipeline, last_collected_at, rows_processed, updated_at)
+                VALUES (:pipeline, :last_collected_at, :rows_processed, CURRENT_TIMESTAMP)
+                ON CONFLICT (pipeline) DO UPDATE SET
+                    last_collected_at = EXCLUDED.last_collected_at,
+                    rows_processed = EXCLUDED.rows_processed,
+                    updated_at = EXCLUDED.updated_at
+            """),
+            {'pipeline': pipeline, 'last_collected_at': last_collected_at, 'rows_processed': int(rows_processed)}
+        )
+
+
+def read_dimension(engine, table, schema='gold'):
+    return pd.read_sql(f"SELECT * FROM {schema}.{table}", engine)
+
+
+def next_fact_key(engine):
+    with engine.connect() as conn:
+        return int(conn.execute(text("SELECT COALESCE(MAX(sk_crime), 0) + 1 FROM gold.fato_crimes")).scalar())
+
+
+def delete_changed_facts(engine, crime_ids):
+    # Remove as linhas fato dos crime_id alterados e devolve as chaves antigas
+    # (sk_crime para reaproveitar e sk_* para identificar agregações afetadas)
+    ids = [int(i) for i in crime_ids]
+    if not ids:
+        return pd.DataFrame(columns=FACT_KEY_COLUMNS)
+    with engine.begin() as conn:
+        rows = conn.execute(
+            text("""
+                DELETE FROM gold.fato_crimes
+                WHERE nk_crime_id = ANY(CAST(:ids AS BIGINT[]))
+                RETURNING nk_crime_id, sk_crime, sk_date, sk_time, sk_area, sk_crime_type, latitude, longitude, grid_key, year
+            """),
+            {'ids': ids}
+        ).all()
+    return pd.DataFrame(rows, columns=FACT_KEY_COLUMNS)
+
+
+def assign_fact_keys(crime_ids, old_facts, start):
+    # Reaproveita sk_crime dos registros já publicados; novos recebem start, start+1, ...
+    old_keys = dict(zip(old_facts['nk_crime_id'], old_facts['sk_crime']))
+    keys = []
+    next_sk = start
+    for crime_id in crime_ids:
+        sk = old_keys.get(crime_id)
+        if sk is None:
+            sk = next_sk
+            next_sk += 1
+        keys.append(int(sk))
+    return keys
+
+
+def affected_area_month(df_changed, old_facts, dim_area, dim_date):
+    keys = df_changed[['area_name', 'year', 'month']]
+    if not old_facts.empty:
+        old = old_facts.merge(dim_area[['sk_area', 'area_name']], on='sk_area') \
+                       .merge(dim_date[['sk_date', 'month']], on='sk_date')
+        keys = pd.concat([keys, old[['area_name', 'year', 'month']]])
+    return keys.dropna().drop_duplicates()
+
+
+def affected_crime_year(df_changed, old_facts, dim_crime_type):
+    keys = df_changed[['crime_description', 'crime_category', 'year']]
+    if not old_facts.empty:
+        old = old_facts.merge(dim_crime_type[['sk_crime_type', 'crime_description', 'crime_category']], on='sk_crime_type')
+        keys = pd.concat([keys, old[['crime_description', 'crime_category', 'year']]])
+    return keys.dropna().drop_duplicates()
+
+
+def refresh_agg_area_month(engine, keys):
+    if keys.empty:
+        return 0
+    params = {
+        'areas': keys['area_name'].astype(str).tolist(),
+        'years': keys['year'].astype(int).tolist(),
+        'months': keys['month'].astype(int).tolist(),
+    }
+    groups = "unnest(CAST(:areas AS TEXT[]), CAST(:years AS INTEGER[]), CAST(:months AS INTEGER[])) AS k(area_name, year, month)"
+    with engine.begin() as conn:
+        conn.execute(text(f"""
+            DELETE FROM gold.agg_area_month a USING {groups}
+            WHERE a.area_name = k.area_name AND a.year = k.year AND a.month = k.month
+        """), params)
+        conn.execute(text(f"""
+            INSERT INTO gold.agg_area_month (area_name, year, month, total_crimes, violent_crimes, crimes_with_weapon, cases_closed)
+            SELECT c.area_name, c.year, c.month,
+                   COUNT(c.crime_id),
+                   COALESCE(SUM(c.is_violent::int), 0),
+                   COALESCE(SUM(c.has_weapon::int), 0),
+                   COALESCE(SUM(c.case_closed::int), 0)
+            FROM silver.crimes c
+            JOIN {groups} ON c.area_name = k.area_name AND c.year = k.year AND c.month = k.month
+            GROUP BY c.area_name, c.year, c.month
+        """), params)
+    return len(keys)
+
+
+def refresh_agg_crime_year(engine, keys):
+    if keys.empty:
+        return 0
+    params = {
+        'descriptions': keys['crime_description'].astype(str).tolist(),
+        'categories': keys['crime_category'].astype(str).tolist(),
+        'years': keys['year'].astype(int).tolist(),
+    }
+    groups = "unnest(CAST(:descriptions AS TEXT[]), CAST(:categories AS TEXT[]), CAST(:years AS INTEGER[])) AS k(crime_description, crime_category, year)"
+    with engine.begin() as conn:
+        conn.execute(text(f"""
+            DELETE FROM gold.agg_crime_year a USING {groups}
+            WHERE a.crime_description = k.crime_description AND a.crime_category = k.crime_category AND a.year = k.year
+        """), params)
+        conn.execute(text(f"""
+            INSERT INTO gold.agg_crime_year (crime_description, crime_category, year, total_crimes, avg_victim_age)
+            SELECT c.crime_description, c.crime_category, c.year,
+                   COUNT(c.crime_id),
+                   AVG(c.victim_age)::double precision
+            FROM silver.crimes c
+            JOIN {groups} ON c.crime_description = k.crime_description AND c.crime_category = k.crime_category AND c.year = k.year
+            GROUP BY c.crime_description, c.crime_category, c.year
+        """), params)
+    return len(keys)
+
+
+## Agregações dos dashboards
+
+def affected_dashboard_keys(base, old_facts, dim_date, dim_time):
+    # Grupos tocados pelos valores novos (base) e antigos (linhas fato removidas)
+    keys = {
+        'agg_crimes_area_period': [base[AREA_PERIOD_KEYS]],
+        'agg_crimes_type_year': [base[TYPE_YEAR_KEYS]],
+        'agg_crime_hotspots': [base[HOTSPOT_KEYS]],
+    }
+    if not old_facts.empty:
+        old = old_facts.merge(dim_date[['sk_date', 'month']], on='sk_date') \
+                       .merge(dim_time[['sk_time', 'period_of_day']], on='sk_time')
+        old['grid_lat'] = grid_cell(old['latitude'])
+        old['grid_lon'] = grid_cell(old['longitude'])
+        keys['agg_crimes_area_period'].append(old[AREA_PERIOD_KEYS])
+        keys['agg_crimes_type_year'].append(old[TYPE_YEAR_KEYS])
+        keys['agg_crime_hotspots'].append(old[HOTSPOT_KEYS])
+    return {table: pd.concat(frames).dropna().drop_duplicates() for table, frames in keys.items()}
+
+
+def merge_affected_keys(batches):
+    return {table: pd.concat([b[table] for b in batches]).drop_duplicates() for table in batches[0]} if batches else {}
+
+
+def hotspot_level_sql(years_filter=""):
+    # UPDATE de hotspot_level pelos percentis do ano (mesma regra de hotspot_levels)
+    cases = ' '.join(f"WHEN h.total_crimes >= p.p{int(q * 100)} THEN '{level}'" for q, level in HOTSPOT_LEVELS)
+    percentiles = ', '.join(f"PERCENTILE_CONT({q}) WITHIN GROUP (ORDER BY total_crimes) AS p{int(q * 100)}" for q, _ in HOTSPOT_LEVELS)
+    return f"""
+        UPDATE gold.agg_crime_hotspots h
+        SET hotspot_level = CASE {cases} ELSE '{HOTSPOT_DEFAULT_LEVEL}' END
+        FROM (SELECT year, {percentiles} FROM gold.agg_crime_hotspots {years_filter} GROUP BY year) p
+        WHERE h.year = p.year
+    """
+
+
+def refresh_dashboard_aggs(engine, keys):
+    # Recalcula apenas os grupos afetados das três agregações com UMA leitura da
+    # fato: as linhas de qualquer grupo afetado são agrupadas por GROUPING SETS
+    # e cada tabela recebe só os seus grupos; hotspot_level é reclassificado nos anos tocados
+    area_period = keys.get('agg_crimes_area_period', pd.DataFrame(columns=AREA_PERIOD_KEYS))
+    type_year = keys.get('agg_crimes_type_year', pd.DataFrame(columns=TYPE_YEAR_KEYS))
+    hotspots = keys.get('agg_crime_hotspots', pd.DataFrame(columns=HOTSPOT_KEYS))
+    if area_period.empty and type_year.empty and hotspots.empty:
+        return 0
+    params = {
+        'ap_areas': area_period['sk_area'].astype(int).tolist(),
+        'ap_years': area_period['year'].astype(int).tolist(),
+        'ap_months': area_period['month'].astype(int).tolist(),
+        'ap_periods': area_period['period_of_day'].astype(str).tolist(),
+        'ty_types': type_year['sk_crime_type'].astype(int).tolist(),
+        'ty_years': type_year['year'].astype(int).tolist(),
+        'hs_lats': hotspots['grid_lat'].astype(float).tolist(),
+        'hs_lons': hotspots['grid_lon'].astype(float).tolist(),
+        'hs_years': hotspots['year'].astype(int).tolist(),
+    }
+    grid_lat = f"ROUND(f.latitude::numeric, {HOTSPOT_DECIMALS})"
+    grid_lon = f"ROUND(f.longitude::numeric, {HOTSPOT_DECIMALS})"
+    with engine.begin() as conn:
+        conn.execute(text("""
+            CREATE TEMP TABLE k_area_period ON COMMIT DROP AS
+            SELECT * FROM unnest(CAST(:ap_areas AS INTEGER[]), CAST(:ap_years AS INTEGER[]),
+                                 CAST(:ap_months AS INTEGER[]), CAST(:ap_periods AS TEXT[])) AS k(sk_area, year, month, period_of_day)
+        """), params)
+        conn.execute(text("""
+            CREATE TEMP TABLE k_type_year ON COMMIT DROP AS
+            SELECT * FROM unnest(CAST(:ty_types AS INTEGER[]), CAST(:ty_years AS INTEGER[])) AS k(sk_crime_type, year)
+        """), params)
+        conn.execute(text("""
+            CREATE TEMP TABLE k_hotspots ON COMMIT DROP AS
+            SELECT * FROM unnest(CAST(:hs_lats AS NUMERIC[]), CAST(:hs_lons AS NUMERIC[]), CAST(:hs_years AS INTEGER[])) AS k(grid_lat, grid_lon, year)
+        """), params)
+
+        # Passada única sobre as linhas fato de qualquer grupo afetado
+        conn.execute(text(f"""
+            CREATE TEMP TABLE dashboard_groups ON COMMIT DROP AS
+            SELECT GROUPING(f.sk_area, f.sk_crime_type) AS grouping_set,
+                   f.sk_area, f.sk_crime_type, s.year, s.month, dt.period_of_day,
+                   {grid_lat} AS grid_lat, {grid_lon} AS grid_lon,
+                   COUNT(*) AS total_crimes,
+                   COALESCE(SUM(f.is_violent::int), 0) AS violent_crimes,
+                   COALESCE(SUM((s.crime_category = 'Property Crime')::int), 0) AS property_crimes,
+                   ROUND(AVG(s.victim_age), 2) AS avg_victim_age,
+                   COALESCE(SUM((EXTRACT(ISODOW FROM s.date_occurred) < 6)::int), 0) AS weekday_crimes,
+                   COALESCE(SUM((EXTRACT(ISODOW FROM s.date_occurred) >= 6)::int), 0) AS weekend_crimes
+            FROM gold.fato_crimes f
+            JOIN silver.crimes s ON s.crime_id = f.nk_crime_id AND s.year = f.year
+            JOIN gold.dim_time dt ON dt.sk_time = f.sk_time
+            WHERE EXISTS (SELECT 1 FROM k_area_period k WHERE k.sk_area = f.sk_area AND k.year = s.year
+                                                           AND k.month = s.month AND k.period_of_day = dt.period_of_day)
+               OR EXISTS (SELECT 1 FROM k_type_year k WHERE k.sk_crime_type = f.sk_crime_type AND k.year = s.year)
+               OR EXISTS (SELECT 1 FROM k_hotspots k WHERE k.grid_lat = {grid_lat} AND k.grid_lon = {grid_lon} AND k.year = s.year)
+            GROUP BY GROUPING SETS (
+                (f.sk_area, s.year, s.month, dt.period_of_day),
+                (f.sk_crime_type, s.year),
+                ({grid_lat}, {grid_lon}, s.year)
+            )
+        """))
+
+        conn.execute(text("""
+            DELETE FROM gold.agg_crimes_area_period a USING k_area_period k
+            WHERE a.sk_area = k.sk_area AND a.year = k.year AND a.month = k.month AND a.period_of_day = k.period_of_day
+        """))
+        conn.execute(text("""
+            INSERT INTO gold.agg_crimes_area_period (sk_area, year, month, period_of_day, total_crimes, violent_crimes, property_crimes, avg_victim_age)
+            SELECT g.sk_area, g.year, g.month, g.period_of_day, g.total_crimes, g.violent_crimes, g.property_crimes, g.avg_victim_age
+            FROM dashboard_groups g
+            JOIN k_area_period k ON k.sk_area = g.sk_area AND k.year = g.year AND k.month = g.month AND k.period_of_day = g.period_of_day
+            WHERE g.grouping_set = 1
+        """))
+        conn.execute(text("""
+            DELETE FROM gold.agg_crimes_type_year a USING k_type_year k
+            WHERE a.sk_crime_type = k.sk_crime_type AND a.year = k.year
+        """))
+        conn.execute(text("""
+            INSERT INTO gold.agg_crimes_type_year (sk_crime_type, year, total_crimes, weekday_crimes, weekend_crimes)
+            SELECT g.sk_crime_type, g.year, g.total_crimes, g.weekday_crimes, g.weekend_crimes
+            FROM dashboard_groups g
+            JOIN k_type_year k ON k.sk_crime_type = g.sk_crime_type AND k.year = g.year
+            WHERE g.grouping_set = 2
+        """))
+        conn.execute(text("""
+            DELETE FROM gold.agg_crime_hotspots a USING k_hotspots k
+            WHERE a.grid_lat = k.grid_lat AND a.grid_lon = k.grid_lon AND a.year = k.year
+        """))
+        conn.execute(text("""
+            INSERT INTO gold.agg_crime_hotspots (grid_lat, grid_lon, year, total_crimes, violent_crimes)
+            SELECT g.grid_lat, g.grid_lon, g.year, g.total_crimes, g.violent_crimes
+            FROM dashboard_groups g
+            JOIN k_hotspots k ON k.grid_lat = g.grid_lat AND k.grid_lon = g.grid_lon AND k.year = g.year
+            WHERE g.grouping_set = 3
+        """))
+        conn.execute(text(hotspot_level_sql("WHERE year = ANY(CAST(:years AS INTEGER[]))")),
+                     {'years': sorted(set(params['hs_years']))})
+    return len(area_period) + len(type_year) + len(hotspots)
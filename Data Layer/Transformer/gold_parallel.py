@@ -0,0 +1,36 @@
+# Execução paralela dos estágios da Gold
+# Dimensões, fato e agregações são estágios independentes submetidos a um pool de
+# threads. Cada estágio faz checkout da sua própria conexão no pool do SQLAlchemy;
+# como o tempo é quase todo de espera no PostgreSQL (COPY / INSERT ... SELECT), o
+# GIL não impede a sobreposição.
+
+import os
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+GOLD_WORKERS = int(os.getenv("ETL_GOLD_WORKERS", "4"))
+
+
+def create_stage_pool(max_workers=GOLD_WORKERS):
+    return ThreadPoolExecutor(max_workers=max(1, max_workers), thread_name_prefix='gold-stage')
+
+
+def timed_stage(name, fn, *args, **kwargs):
+    start = time.perf_counter()
+    result = fn(*args, **kwargs)
+    return name, result, time.perf_counter() - start
+
+
+def submit_stage(pool, name, fn, *args, **kwargs):
+    return pool.submit(timed_stage, name, fn, *args, **kwargs)
+
+
+def wait_stages(futures, stage_times=None):
+    # Aguarda os estágios (propaga a primeira exceção) e acumula o tempo de cada um
+    results = {}
+    for future in futures:
+        name, result, seconds = future.result()
+        results[name] = result
+        if stage_times is not None:
+            stage_times[name] = stage_times.get(name, 0.0) + seconds
+    return results
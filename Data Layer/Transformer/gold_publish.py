@@ -0,0 +1,197 @@
+# Publicação da Gold por troca de schema (ETL_GOLD_PUBLISH=swap, carga completa)
+# A carga completa é montada em um schema de staging (gold_staging) enquanto
+# gold continua publicado e intacto:
+# - as tabelas do DDL são criadas UNLOGGED (sem WAL durante a carga em lote);
+#   a fato é particionada e a tabela pai não aceita UNLOGGED, apenas as partições;
+# - chaves primárias/únicas e os índices do DDL só são criados depois da carga;
+# - tabelas criadas pelo pandas (dimensões e agg_area_month/agg_crime_year) não
+#   passam pelo DDL: a definição sai do DataFrame (mesmos tipos do to_sql) e também
+#   são criadas UNLOGGED no staging, sem chaves nem índices;
+# - ao fim da carga as tabelas passam a LOGGED, recebem chaves e índices e são
+#   analisadas (ANALYZE); os privilégios de gold (GRANTs do schema e de cada
+#   tabela, ex.: powerbi_reader do POWERBI_GUIDE.md) são repetidos no staging;
+# - a troca é uma única transação: gold → gold_previous, gold_staging → gold e as
+#   tabelas operacionais (watermark, versão dos dados, métricas) voltam para gold.
+# Leitores veem a Gold anterior completa até o COMMIT e a nova depois dele. Se a
+# carga falhar, gold não é alterado e o staging é recriado na próxima execução.
+
+import os
+import re
+import threading
+import time
+
+import pandas as pd
+from sqlalchemy import text
+
+# 'inplace': esvazia e recarrega as tabelas de gold; 'swap': staging + troca de schema
+GOLD_PUBLISH = os.getenv("ETL_GOLD_PUBLISH", "inplace").lower()
+
+PUBLISHED_SCHEMA = 'gold'
+STAGING_SCHEMA = 'gold_staging'
+PREVIOUS_SCHEMA = 'gold_previous'
+# Tabelas de controle que acumulam histórico entre cargas: não são reconstruídas
+OPERATIONAL_TABLES = ['etl_watermark', 'data_version', 'etl_runs', 'etl_stage_metrics']
+
+DDL_TABLE = re.compile(r'CREATE\s+TABLE\s+IF\s+NOT\s+EXISTS\s+gold\.(\w+)', re.IGNORECASE)
+CREATE_TABLE = re.compile(r'\bCREATE\s+TABLE\b', re.IGNORECASE)
+CREATE_INDEX = re.compile(r'^\s*CREATE\s+(UNIQUE\s+)?INDEX\b', re.IGNORECASE)
+CREATE_SCHEMA = re.compile(r'^\s*CREATE\s+SCHEMA\b', re.IGNORECASE)
+
+
+def retarget_sql(sql, schema):
+    # gold.<tabela> → <schema>.<tabela>
+    return sql if schema == PUBLISHED_SCHEMA else re.sub(r'\bgold\.', f'{schema}.', sql)
+
+
+def unlogged_sql(stmt):
+    # CREATE TABLE → CREATE UNLOGGED TABLE (exceto tabelas particionadas)
+    if re.search(r'\bPARTITION\s+BY\b', stmt, re.IGNORECASE):
+        return stmt
+    return CREATE_TABLE.sub('CREATE UNLOGGED TABLE', stmt, count=1)
+
+
+def strip_comments(stmt):
+    return '\n'.join(line for line in stmt.splitlines() if not line.strip().startswith('--')).strip()
+
+
+def sql_statements(sql):
+    return [stmt for stmt in (strip_comments(s) for s in sql.split(';')) if stmt]
+
+
+class SchemaSwap:
+    def __init__(self, engine, ddl_path, staging=STAGING_SCHEMA):
+        self.engine = engine
+        self.ddl_path = ddl_path
+        self.staging = staging
+        self.indexes = []      # CREATE INDEX do DDL, executados depois da carga
+        self.constraints = []  # chaves primárias/únicas retiradas até o fim da carga
+        self.created = set()   # tabelas do pandas já criadas no staging
+        self.lock = threading.Lock()
+        self.timings = {}
+
+    def qualified(self, table):
+        return f"{self.staging}.{table}"
+
+    def prepare(self):
+        # Recria o staging com as tabelas do DDL (sem as operacionais e sem índices)
+        statements = sql_statements(self.ddl_path.read_text(encoding='utf-8'))
+        with self.engine.begin() as conn:
+            conn.exec_driver_sql(f"DROP SCHEMA IF EXISTS {self.staging} CASCADE")
+            conn.exec_driver_sql(f"CREATE SCHEMA {self.staging}")
+            for stmt in statements:
+                table = DDL_TABLE.search(stmt)
+                if CREATE_SCHEMA.match(stmt) or (table and table.group(1) in OPERATIONAL_TABLES):
+                    continue
+                stmt = retarget_sql(stmt, self.staging)
+                if CREATE_INDEX.match(stmt):
+                    self.indexes.append(stmt)
+                else:
+                    conn.exec_driver_sql(unlogged_sql(stmt))
+
+    def defer_constraints(self):
+        # Retira as chaves primárias/únicas das tabelas do staging (guardando a
+        # definição); na tabela particionada a chave do pai vale para as partições
+        with self.engine.begin() as conn:
+            rows = conn.execute(text("""
+                SELECT c.relname, k.conname, pg_get_constraintdef(k.oid)
+                FROM pg_constraint k
+                JOIN pg_class c ON c.oid = k.conrelid
+                JOIN pg_namespace n ON n.oid = c.relnamespace
+                WHERE n.nspname = :schema AND k.contype IN ('p', 'u') AND NOT c.relispartition
+                ORDER BY c.relname, k.conname
+            """), {'schema': self.staging}).all()
+            for table, name, definition in rows:
+                conn.exec_driver_sql(f'ALTER TABLE {self.qualified(table)} DROP CONSTRAINT "{name}"')
+                self.constraints.append(f'ALTER TABLE {self.qualified(table)} ADD CONSTRAINT "{name}" {definition}')
+        return len(self.constraints)
+
+    def create_table(self, df, table, replace=False):
+        # Tabela do pandas ainda inexistente no staging: CREATE UNLOGGED TABLE com a
+        # definição que o to_sql daria ao DataFrame. True quando a tabela foi criada
+        # aqui (a gravação segue com if_exists='append')
+        with self.lock:
+            if table in self.created and not replace:
+                return False
+            with self.engine.begin() as conn:
+                if replace:
+                    conn.exec_driver_sql(f"DROP TABLE IF EXISTS {self.qualified(table)}")
+                elif conn.execute(text("SELECT to_regclass(:table)"), {'table': self.qualified(table)}).scalar() is not None:
+                    self.created.add(table)
+                    return False
+                conn.exec_driver_sql(unlogged_sql(pd.io.sql.get_schema(df, table, con=conn, schema=self.staging)))
+            self.created.add(table)
+            return True
+
+    def copy_privileges(self, conn):
+        # GRANTs do schema publicado e das suas tabelas repetidos nos objetos de mesmo
+        # nome do staging (o dono já tem todos os privilégios; grantee 0 = PUBLIC)
+        grants = conn.execute(text("""
+            SELECT 'SCHEMA', quote_ident(:staging), a.privilege_type, a.grantee, a.is_grantable
+            FROM pg_namespace n, aclexplode(n.nspacl) a
+            WHERE n.nspname = :published AND a.grantee <> n.nspowner
+            UNION ALL
+            SELECT 'TABLE', quote_ident(:staging) || '.' || quote_ident(c.relname), a.privilege_type, a.grantee, a.is_grantable
+            FROM pg_class c
+            JOIN pg_namespace n ON n.oid = c.relnamespace
+            CROSS JOIN aclexplode(c.relacl) a
+            WHERE n.nspname = :published AND c.relkind IN ('r', 'p', 'v', 'm') AND NOT c.relispartition
+              AND a.grantee <> c.relowner
+              AND to_regclass(quote_ident(:staging) || '.' || quote_ident(c.relname)) IS NOT NULL
+        """), {'published': PUBLISHED_SCHEMA, 'staging': self.staging}).all()
+        for kind, target, privilege, grantee, grantable in grants:
+            role = 'PUBLIC' if grantee == 0 else conn.execute(
+                text("SELECT quote_ident(pg_get_userbyid(:oid))"), {'oid': grantee}).scalar()
+            option = " WITH GRANT OPTION" if grantable else ""
+            conn.exec_driver_sql(f"GRANT {privilege} ON {kind} {target} TO {role}{option}")
+        return len(grants)
+
+    def finalize(self):
+        # Depois da carga: LOGGED, chaves, índices, estatísticas e privilégios de gold
+        with self.engine.begin() as conn:
+            start = time.perf_counter()
+            unlogged = conn.execute(text("""
+                SELECT c.relname FROM pg_class c JOIN pg_namespace n ON n.oid = c.relnamespace
+                WHERE n.nspname = :schema AND c.relkind = 'r' AND c.relpersistence = 'u'
+                ORDER BY c.relname
+            """), {'schema': self.staging}).scalars().all()
+            for table in unlogged:
+                conn.exec_driver_sql(f"ALTER TABLE {self.qualified(table)} SET LOGGED")
+            self.timings['set_logged'] = time.perf_counter() - start
+
+            start = time.perf_counter()
+            for stmt in self.constraints + self.indexes:
+                conn.exec_driver_sql(stmt)
+            self.timings['indexes'] = time.perf_counter() - start
+
+            # Tabelas pai e comuns (ANALYZE na particionada inclui as partições)
+            start = time.perf_counter()
+            tables = conn.execute(text("""
+                SELECT c.relname FROM pg_class c JOIN pg_namespace n ON n.oid = c.relnamespace
+                WHERE n.nspname = :schema AND c.relkind IN ('r', 'p') AND NOT c.relispartition
+                ORDER BY c.relname
+            """), {'schema': self.staging}).scalars().all()
+            for table in tables:
+                conn.exec_driver_sql(f"ANALYZE {self.qualified(table)}")
+            self.timings['analyze'] = time.perf_counter() - start
+
+            # Leitores de gold (ex.: Power BI) mantêm o acesso depois da troca
+            start = time.perf_counter()
+            self.grants = self.copy_privileges(conn)
+            self.timings['grants'] = time.perf_counter() - start
+        return len(tables)
+
+    def swap(self):
+        # Troca atômica: uma transação com renomeações de schema e a mudança das
+        # tabelas operacionais; a Gold anterior é removida depois do COMMIT
+        start = time.perf_counter()
+        with self.engine.begin() as conn:
+            conn.exec_driver_sql(f"DROP SCHEMA IF EXISTS {PREVIOUS_SCHEMA} CASCADE")
+            conn.exec_driver_sql(f"ALTER SCHEMA {PUBLISHED_SCHEMA} RENAME TO {PREVIOUS_SCHEMA}")
+            conn.exec_driver_sql(f"ALTER SCHEMA {self.staging} RENAME TO {PUBLISHED_SCHEMA}")
+            for table in OPERATIONAL_TABLES:
+                if conn.execute(text("SELECT to_regclass(:table)"), {'table': f"{PREVIOUS_SCHEMA}.{table}"}).scalar() is not None:
+                    conn.exec_driver_sql(f"ALTER TABLE {PREVIOUS_SCHEMA}.{table} SET SCHEMA {PUBLISHED_SCHEMA}")
+        self.timings['swap'] = time.perf_counter() - start
+        with self.engine.begin() as conn:
+            conn.exec_driver_sql(f"DROP SCHEMA {PREVIOUS_SCHEMA} CASCADE")
+        return self.timings['swap']
@@ -0,0 +1,334 @@
+# Transformações Silver → Gold
+# Construção das dimensões, da tabela fato e das agregações do star schema.
+# As dimensões recebem opcionalmente os membros já existentes no banco: apenas
+# chaves naturais novas ganham surrogate keys (a partir de max(sk) + 1), de modo
+# que as chaves já publicadas nunca mudam entre execuções.
+
+import numpy as np
+import pandas as pd
+from sqlalchemy import text
+
+from surrogate_keys import KeyResolver
+
+# Colunas da Silver usadas pela Gold (validação, dimensões, fato, agregações e watermark)
+GOLD_SOURCE_COLUMNS = [
+    'crime_id', 'date_occurred', 'date_reported', 'hour',
+    'area_code', 'area_name',
+    'crime_code', 'crime_description', 'crime_category', 'crime_severity',
+    'victim_age_group', 'victim_sex_desc', 'victim_descent_desc',
+    'victim_age',
+    'latitude', 'longitude', 'grid_key',
+    'is_violent', 'has_weapon', 'case_closed',
+    'year', 'month', 'collected_at'
+]
+
+# Colunas de baixa cardinalidade lidas como category: drop_duplicates das
+# dimensões e groupby das agregações operam sobre os códigos inteiros
+GOLD_CATEGORY_COLUMNS = [
+    'area_name', 'crime_description', 'crime_category', 'crime_severity',
+    'victim_age_group', 'victim_sex_desc', 'victim_descent_desc',
+    'weapon_description', 'premise_description'
+]
+
+
+def apply_silver_dtypes(df):
+    for col in GOLD_CATEGORY_COLUMNS:
+        if col in df.columns:
+            df[col] = df[col].astype('category')
+    return df
+
+
+def decategorize(df):
+    # Tabelas Gold gravadas/comparadas com os tipos originais (texto), não category
+    for col in df.columns:
+        if isinstance(df[col].dtype, pd.CategoricalDtype):
+            df[col] = df[col].astype(df[col].cat.categories.dtype)
+    return df
+
+
+## Leitura da Silver
+
+def silver_query(where=None, columns=GOLD_SOURCE_COLUMNS):
+    # Projeção apenas das colunas usadas, ordenada por crime_id para que a
+    # numeração das surrogate keys seja determinística entre execuções e modos
+    sql = f"SELECT {', '.join(columns)} FROM silver.crimes"
+    if where:
+        sql += f" WHERE {where}"
+    return sql + " ORDER BY crime_id"
+
+
+def read_silver(engine, where=None, params=None, columns=GOLD_SOURCE_COLUMNS):
+    return apply_silver_dtypes(pd.read_sql(text(silver_query(where, columns)), engine, params=params))
+
+
+def iter_silver_chunks(engine, chunk_size, where=None, params=None, columns=GOLD_SOURCE_COLUMNS):
+    # stream_results faz o psycopg2 usar um cursor nomeado (server-side): o
+    # servidor envia chunk_size linhas por vez em vez do resultado inteiro
+    with engine.connect().execution_options(stream_results=True, max_row_buffer=chunk_size) as conn:
+        for chunk in pd.read_sql(text(silver_query(where, columns)), conn, params=params, chunksize=chunk_size):
+            # Resultado vazio (ex.: incremental sem alterações) vem como um chunk
+            # vazio sem tipos: não há o que processar
+            if len(chunk):
+                yield apply_silver_dtypes(chunk)
+
+
+# Classificar regiões
+def get_region(area_name):
+    north = ['DEVONSHIRE', 'FOOTHILL', 'MISSION', 'NORTH HOLLYWOOD', 'VAN NUYS', 'WEST VALLEY']
+    south = ['77TH STREET', 'HARBOR', 'SOUTHEAST', 'SOUTHWEST']
+    central = ['CENTRAL', 'HOLLENBECK', 'RAMPART']
+    west = ['HOLLYWOOD', 'OLYMPIC', 'PACIFIC', 'WEST LA', 'WILSHIRE']
+
+    if area_name in north: return 'North'
+    elif area_name in south: return 'South'
+    elif area_name in central: return 'Central'
+    elif area_name in west: return 'West'
+    else: return 'Other'
+
+
+def new_members(candidates, existing, key_cols):
+    # Membros distintos (ordem de 1ª ocorrência) cuja chave natural ainda não existe
+    candidates = decategorize(candidates[key_cols].drop_duplicates())
+    if existing is None or existing.empty:
+        return candidates.copy()
+    merged = candidates.merge(existing[key_cols].drop_duplicates(), on=key_cols, how='left', indicator=True)
+    merged.index = candidates.index
+    return candidates[merged['_merge'] == 'left_only'].copy()
+
+
+def next_key(existing, sk_col):
+    if existing is None or existing.empty:
+        return 1
+    return int(existing[sk_col].max()) + 1
+
+
+## Dimensões
+
+def build_dim_date(df_silver, existing=None):
+    dim_date = df_silver[['date_occurred']].drop_duplicates().dropna().rename(columns={'date_occurred': 'full_date'})
+    dim_date = new_members(dim_date, existing, ['full_date'])
+    start = next_key(existing, 'sk_date')
+
+    dim_date.insert(0, 'sk_date', range(start, start + len(dim_date)))
+    dim_date['year'] = dim_date['full_date'].dt.year
+    dim_date['quarter'] = dim_date['full_date'].dt.quarter
+    dim_date['month'] = dim_date['full_date'].dt.month
+    dim_date['month_name'] = dim_date['full_date'].dt.month_name()
+    dim_date['week_of_year'] = dim_date['full_date'].dt.isocalendar().week
+    dim_date['day_of_month'] = dim_date['full_date'].dt.day
+    dim_date['day_of_week'] = dim_date['full_date'].dt.dayofweek
+    dim_date['day_name'] = dim_date['full_date'].dt.day_name()
+    dim_date['is_weekend'] = dim_date['day_of_week'].isin([5, 6])
+    return dim_date
+
+
+def build_dim_time():
+    dim_time = pd.DataFrame({'hour': range(24)})
+    dim_time['sk_time'] = dim_time['hour'] + 1
+    dim_time['period_of_day'] = dim_time['hour'].apply(
+        lambda h: 'Madrugada' if h < 6 else 'Manhã' if h < 12 else 'Tarde' if h < 18 else 'Noite'
+    )
+    dim_time['is_rush_hour'] = dim_time['hour'].isin([7, 8, 9, 17, 18, 19])
+    return dim_time
+
+
+def build_dim_area(df_silver, existing=None):
+    dim_area = new_members(df_silver, existing, ['area_code', 'area_name'])
+    start = next_key(existing, 'sk_area')
+    dim_area['sk_area'] = range(start, start + len(dim_area))
+    dim_area['region'] = dim_area['area_name'].apply(get_region)
+    return dim_area
+
+
+def build_dim_crime_type(df_silver, existing=None):
+    key_cols = ['crime_code', 'crime_description', 'crime_category', 'crime_severity']
+    dim_crime_type = new_members(df_silver, existing, key_cols)
+    start = next_key(existing, 'sk_crime_type')
+    dim_crime_type['sk_crime_type'] = range(start, start + len(dim_crime_type))
+    dim_crime_type['is_violent'] = dim_crime_type['crime_category'] == 'Violent Crime'
+    dim_crime_type['severity_level'] = dim_crime_type['crime_severity'].map({'Serious': 3, 'Minor': 1})
+    return dim_crime_type
+
+
+def build_dim_victim(df_silver, existing=None):
+    candidates = df_silver[['victim_age_group', 'victim_sex_desc', 'victim_descent_desc']].rename(columns={
+        'victim_age_group': 'age_group',
+        'victim_sex_desc': 'sex',
+        'victim_descent_desc': 'descent'
+    })
+    dim_victim = new_members(candidates, existing, ['age_group', 'sex', 'descent'])
+    start = next_key(existing, 'sk_victim')
+    dim_victim['sk_victim'] = range(start, start + len(dim_victim))
+    return dim_victim
+
+
+## Fato
+
+def build_fato(df_silver, dim_date, dim_time, dim_area, dim_crime_type, dim_victim, sk_crime=None, resolver=None):
+    # sk_crime: surrogate keys já definidas para cada linha (modo incremental);
+    # por padrão numera de 1 a N na ordem da Silver.
+    # resolver: KeyResolver reaproveitado entre lotes (lookups em cache e
+    # contagem de chaves sem correspondência por dimensão)
+    resolver = resolver if resolver is not None else KeyResolver()
+    keys = resolver.resolve(df_silver, {
+        'dim_date': dim_date,
+        'dim_time': dim_time,
+        'dim_area': dim_area,
+        'dim_crime_type': dim_crime_type,
+        'dim_victim': dim_victim,
+    })
+
+    # Construir fato
+    fato = pd.DataFrame({
+        'sk_crime': range(1, len(df_silver) + 1) if sk_crime is None else sk_crime,
+        'nk_crime_id': df_silver['crime_id'].values,
+        **keys,
+    })
+
+    # Métricas
+    fato['latitude'] = df_silver['latitude'].values
+    fato['longitude'] = df_silver['longitude'].values
+    # read_sql traz BIGINT com nulos como float: volta para inteiro anulável
+    fato['grid_key'] = df_silver['grid_key'].astype('Int64').values
+    fato['is_violent'] = df_silver['is_violent'].values
+    fato['has_weapon'] = df_silver['has_weapon'].values
+    fato['case_closed'] = df_silver['case_closed'].values
+    fato['year'] = df_silver['year'].values  # chave de partição
+    return fato
+
+
+## Agregações
+
+# observed=True: com chaves category, apenas as combinações presentes nos dados
+
+def build_agg_area_month(df_silver):
+    return decategorize(df_silver.groupby(['area_name', 'year', 'month'], observed=True).agg(
+        total_crimes=('crime_id', 'count'),
+        violent_crimes=('is_violent', 'sum'),
+        crimes_with_weapon=('has_weapon', 'sum'),
+        cases_closed=('case_closed', 'sum')
+    ).reset_index())
+
+
+def build_agg_crime_year(df_silver):
+    return decategorize(df_silver.groupby(['crime_description', 'crime_category', 'year'], observed=True).agg(
+        total_crimes=('crime_id', 'count'),
+        avg_victim_age=('victim_age', 'mean')
+    ).reset_index())
+
+
+# Agregações parciais (modo streaming): somas e contagens por chunk que são
+# combinadas ao final, já que média não é associativa
+def partial_agg_area_month(df_silver):
+    return build_agg_area_month(df_silver)
+
+
+def partial_agg_crime_year(df_silver):
+    return decategorize(df_silver.groupby(['crime_description', 'crime_category', 'year'], observed=True).agg(
+        total_crimes=('crime_id', 'count'),
+        victim_age_sum=('victim_age', 'sum'),
+        victim_age_count=('victim_age', 'count')
+    ).reset_index())
+
+
+def merge_agg_area_month(partials):
+    keys = ['area_name', 'year', 'month']
+    return pd.concat(partials, ignore_index=True).groupby(keys).sum().reset_index()
+
+
+def merge_agg_crime_year(partials):
+    keys = ['crime_description', 'crime_category', 'year']
+    merged = pd.concat(partials, ignore_index=True).groupby(keys).sum().reset_index()
+    merged['avg_victim_age'] = merged['victim_age_sum'] / merged['victim_age_count'].where(merged['victim_age_count'] > 0)
+    return merged[keys + ['total_crimes', 'avg_victim_age']]
+
+
+## Agregações dos dashboards
+# agg_crimes_area_period, agg_crimes_type_year e agg_crime_hotspots saem da mesma
+# passada que monta a fato (chaves sk_* já resolvidas): cada lote gera parciais
+# somáveis (contagens, soma e contagem de idades) que são combinadas ao final.
+
+AREA_PERIOD_KEYS = ['sk_area', 'year', 'month', 'period_of_day']
+TYPE_YEAR_KEYS = ['sk_crime_type', 'year']
+HOTSPOT_KEYS = ['grid_lat', 'grid_lon', 'year']
+HOTSPOT_DECIMALS = 2  # grade de 0,01° (a mesma das consultas de mapa de calor)
+
+# (percentil mínimo de total_crimes no ano, nível) - do mais alto para o mais baixo
+HOTSPOT_LEVELS = [(0.90, 'Hotspot Crítico'), (0.75, 'Hotspot Alto'), (0.50, 'Hotspot Médio')]
+HOTSPOT_DEFAULT_LEVEL = 'Área Normal'
+
+
+def grid_cell(values, decimals=HOTSPOT_DECIMALS):
+    # Arredonda "half away from zero" sobre micrograus inteiros, como o
+    # ROUND(x::numeric, 2) do PostgreSQL (np.round levaria 34.045 a 34.04)
+    micro = np.round(np.asarray(values, dtype=float) * 1e6)
+    step = 10 ** (6 - decimals)
+    return np.sign(micro) * np.floor((np.abs(micro) + step // 2) / step) / 10 ** decimals
+
+
+def dashboard_base(df_silver, fato, dim_time):
+    # Uma linha por crime com as chaves das três agregações
+    period = dict(zip(dim_time['hour'], dim_time['period_of_day']))
+    return pd.DataFrame({
+        'sk_area': fato['sk_area'].values,
+        'sk_crime_type': fato['sk_crime_type'].values,
+        'year': df_silver['year'].values,
+        'month': df_silver['month'].values,
+        'period_of_day': df_silver['hour'].map(period).values,
+        'grid_lat': grid_cell(df_silver['latitude']),
+        'grid_lon': grid_cell(df_silver['longitude']),
+        'is_violent': df_silver['is_violent'].values,
+        'is_property': (df_silver['crime_category'] == 'Property Crime').values,
+        'is_weekend': df_silver['date_occurred'].dt.dayofweek.isin([5, 6]).values,
+        'victim_age': df_silver['victim_age'].values,
+    })
+
+
+def partial_dashboard_aggs(base):
+    weekday = ~base['is_weekend']
+    return {
+        'agg_crimes_area_period': base.groupby(AREA_PERIOD_KEYS).agg(
+            total_crimes=('year', 'size'),
+            violent_crimes=('is_violent', 'sum'),
+            property_crimes=('is_property', 'sum'),
+            victim_age_sum=('victim_age', 'sum'),
+            victim_age_count=('victim_age', 'count')
+        ).reset_index(),
+        'agg_crimes_type_year': base.assign(is_weekday=weekday).groupby(TYPE_YEAR_KEYS).agg(
+            total_crimes=('year', 'size'),
+            weekday_crimes=('is_weekday', 'sum'),
+            weekend_crimes=('is_weekend', 'sum')
+        ).reset_index(),
+        'agg_crime_hotspots': base.groupby(HOTSPOT_KEYS).agg(
+            total_crimes=('year', 'size'),
+            violent_crimes=('is_violent', 'sum')
+        ).reset_index(),
+    }
+
+
+def hotspot_levels(hotspots):
+    # Nível de cada célula pelos percentis (interpolação linear, como PERCENTILE_CONT)
+    # do total de crimes das células do mesmo ano
+    levels = pd.Series(HOTSPOT_DEFAULT_LEVEL, index=hotspots.index, dtype=object)
+    by_year = hotspots.groupby('year')['total_crimes']
+    for q, level in reversed(HOTSPOT_LEVELS):
+        levels[hotspots['total_crimes'] >= by_year.transform(lambda s: s.quantile(q))] = level
+    return levels
+
+
+def merge_dashboard_aggs(partials):
+    merged = {}
+    for table, keys in [('agg_crimes_area_period', AREA_PERIOD_KEYS),
+                        ('agg_crimes_type_year', TYPE_YEAR_KEYS),
+                        ('agg_crime_hotspots', HOTSPOT_KEYS)]:
+        merged[table] = pd.concat([p[table] for p in partials], ignore_index=True).groupby(keys).sum().reset_index()
+
+    # Média arredondada em aritmética inteira (half-up, como ROUND(AVG(...), 2) no PostgreSQL)
+    area_period = merged['agg_crimes_area_period']
+    count = area_period.pop('victim_age_count').astype('int64')
+    age_sum = area_period.pop('victim_age_sum').astype('int64')
+    rounded = (200 * age_sum + count) // (2 * count.where(count > 0, 1))
+    area_period['avg_victim_age'] = (rounded / 100).where(count > 0)
+
+    merged['agg_crime_hotspots']['hotspot_level'] = hotspot_levels(merged['agg_crime_hotspots'])
+    return merged
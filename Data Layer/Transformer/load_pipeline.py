@@ -0,0 +1,68 @@
+# Pipeline produtor/consumidor para as cargas no PostgreSQL
+# A thread principal (produtor) lê e transforma o próximo chunk enquanto threads
+# carregadoras gravam os anteriores, cada uma com a sua conexão do pool do
+# SQLAlchemy. O psycopg2 libera o GIL durante o COPY, então CPU e I/O do banco se
+# sobrepõem e o tempo total tende a max(transformação, carga) em vez da soma.
+# Backpressure: no máximo max_pending gravações pendentes (na fila ou em execução);
+# submit() bloqueia o produtor até uma vaga ser liberada, limitando a memória a
+# max_pending chunks. A primeira falha de uma carga é propagada no próximo submit()
+# ou em drain().
+
+import os
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+LOAD_PIPELINE = os.getenv("ETL_LOAD_PIPELINE", "false").lower() == "true"
+LOAD_WORKERS = int(os.getenv("ETL_LOAD_WORKERS", "2"))
+# Gravações pendentes (fila + em execução) antes de o produtor esperar
+PIPELINE_DEPTH = int(os.getenv("ETL_PIPELINE_DEPTH", "4"))
+
+
+class LoadPipeline:
+    # executor: pool já existente (ex.: pool de estágios da Gold); por padrão cria
+    # um próprio com `workers` threads
+    def __init__(self, workers=LOAD_WORKERS, max_pending=PIPELINE_DEPTH, executor=None, name='loader'):
+        self.own_executor = executor is None
+        self.executor = executor or ThreadPoolExecutor(max_workers=max(1, workers), thread_name_prefix=name)
+        self.slots = threading.BoundedSemaphore(max(1, max_pending))
+        self.futures = []
+        self.blocked_seconds = 0.0  # tempo do produtor parado esperando vaga
+
+    def raise_failures(self):
+        for future in self.futures:
+            if future.done() and future.exception() is not None:
+                raise future.exception()
+
+    def submit(self, fn, *args, **kwargs):
+        self.raise_failures()
+        start = time.perf_counter()
+        self.slots.acquire()
+        self.blocked_seconds += time.perf_counter() - start
+        try:
+            future = self.executor.submit(fn, *args, **kwargs)
+        except BaseException:
+            self.slots.release()
+            raise
+        future.add_done_callback(lambda _: self.slots.release())
+        self.futures.append(future)
+        return future
+
+    def drain(self):
+        # Aguarda as gravações pendentes e devolve os resultados na ordem de submissão
+        futures, self.futures = self.futures, []
+        return [future.result() for future in futures]
+
+    def close(self, cancel=False):
+        if cancel:
+            for future in self.futures:
+                future.cancel()
+        if self.own_executor:
+            self.executor.shutdown(wait=True)
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        self.close(cancel=exc_type is not None)
+        return False
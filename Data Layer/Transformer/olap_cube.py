@@ -0,0 +1,371 @@
+# Cubo OLAP em memória sobre o esquema estrela da Gold
+# gold.fato_crimes é lida uma única vez (em blocos) e pré-agregada em NumPy pelas
+# cinco surrogate keys (sk_date, sk_time, sk_area, sk_crime_type, sk_victim): cada
+# célula não vazia do cubo esparso guarda total, violent, with_weapon e closed.
+# Os atributos das dimensões (year, month, region, crime_category, age_group...)
+# viram tabelas de lookup indexadas pela surrogate key, de modo que slice, dice e
+# roll-up são operações vetorizadas sobre as células (máscara + bincount), sem
+# voltar ao PostgreSQL. Uma visão densa por (year, month, region, crime_category,
+# age_group) atende os drill-downs desses atributos somando eixos de um array.
+# O cubo pode ser salvo em disco junto com a versão dos dados Gold
+# (gold.data_version) para ser reaproveitado pelos dashboards.
+#
+# Uso:
+#   python olap_cube.py --by year region --where crime_category="Violent Crime"
+#   python olap_cube.py --by month --where year=2023 --repeat 100
+#   python olap_cube.py --verify
+
+import os
+import pickle
+import time
+from pathlib import Path
+
+import numpy as np
+import pandas as pd
+from sqlalchemy import text
+
+from query_service import create_query_engine, read_data_version
+
+CUBE_CHUNK_SIZE = int(os.getenv("ETL_CUBE_CHUNK_SIZE", "500000"))
+
+# Chave da fato → dimensão
+DIMENSIONS = {
+    'sk_date': 'dim_date',
+    'sk_time': 'dim_time',
+    'sk_area': 'dim_area',
+    'sk_crime_type': 'dim_crime_type',
+    'sk_victim': 'dim_victim',
+}
+KEYS = list(DIMENSIONS)
+
+# Atributo → (chave da fato, coluna da dimensão)
+ATTRIBUTES = {
+    'year': ('sk_date', 'year'),
+    'quarter': ('sk_date', 'quarter'),
+    'month': ('sk_date', 'month'),
+    'day_name': ('sk_date', 'day_name'),
+    'is_weekend': ('sk_date', 'is_weekend'),
+    'hour': ('sk_time', 'hour'),
+    'period_of_day': ('sk_time', 'period_of_day'),
+    'is_rush_hour': ('sk_time', 'is_rush_hour'),
+    'area_name': ('sk_area', 'area_name'),
+    'region': ('sk_area', 'region'),
+    'crime_description': ('sk_crime_type', 'crime_description'),
+    'crime_category': ('sk_crime_type', 'crime_category'),
+    'crime_severity': ('sk_crime_type', 'crime_severity'),
+    'age_group': ('sk_victim', 'age_group'),
+    'sex': ('sk_victim', 'sex'),
+    'descent': ('sk_victim', 'descent'),
+}
+
+# Medida → expressão sobre a fato
+MEASURES = {
+    'total': '1',
+    'violent': 'CASE WHEN f.is_violent THEN 1 ELSE 0 END',
+    'with_weapon': 'CASE WHEN f.has_weapon THEN 1 ELSE 0 END',
+    'closed': 'CASE WHEN f.case_closed THEN 1 ELSE 0 END',
+}
+
+# Acima deste número de grupos o roll-up usa np.unique em vez de bincount denso
+DENSE_GROUP_LIMIT = 1 << 20
+# Visão densa materializada na construção (drill-downs mais comuns dos dashboards)
+DEFAULT_VIEW = ('year', 'month', 'region', 'crime_category', 'age_group')
+
+
+## Construção
+
+def aggregate_cells(codes, measures):
+    # Soma as medidas por código de célula: (códigos distintos, matriz de medidas)
+    cells, inverse = np.unique(codes, return_inverse=True)
+    sums = np.column_stack([np.bincount(inverse, weights=measures[:, i], minlength=len(cells))
+                            for i in range(measures.shape[1])])
+    return cells, sums
+
+
+def read_dimensions(conn):
+    return {key: pd.read_sql(text(f"SELECT * FROM gold.{dim}"), conn) for key, dim in DIMENSIONS.items()}
+
+
+def build_cube(engine, chunk_size=CUBE_CHUNK_SIZE):
+    # Chaves nulas na fato (membro sem correspondência) ocupam a posição 0 do eixo.
+    # A fato não tem chaves estrangeiras: cada eixo vai até a maior surrogate key da
+    # dimensão ou da fato (eixos ampliados durante a leitura recodificam as células
+    # já agregadas). Leitura por cursor server-side: só um bloco no cliente por vez
+    with engine.connect().execution_options(stream_results=True, max_row_buffer=chunk_size) as conn:
+        dims = read_dimensions(conn)
+        version = read_data_version(conn)
+        shape = tuple(int(dims[key][key].max() if len(dims[key]) else 0) + 1 for key in KEYS)
+
+        columns = ', '.join([*(f"COALESCE(f.{k}, 0) AS {k}" for k in KEYS),
+                             *(f"{expr} AS {name}" for name, expr in MEASURES.items())])
+        partials = []
+        for chunk in pd.read_sql(text(f"SELECT {columns} FROM gold.fato_crimes f"), conn, chunksize=chunk_size):
+            keys = tuple(chunk[k].to_numpy('int64') for k in KEYS)
+            grown = tuple(max(size, int(k.max()) + 1 if len(k) else 0) for size, k in zip(shape, keys))
+            if grown != shape:
+                partials = [(np.ravel_multi_index(np.unravel_index(c, shape), grown), s) for c, s in partials]
+                shape = grown
+            codes = np.ravel_multi_index(keys, shape)
+            partials.append(aggregate_cells(codes, chunk[list(MEASURES)].to_numpy('float64')))
+
+    if partials:
+        cells, sums = aggregate_cells(np.concatenate([c for c, _ in partials]), np.vstack([s for _, s in partials]))
+    else:
+        cells, sums = np.empty(0, dtype='int64'), np.empty((0, len(MEASURES)))
+    keys = dict(zip(KEYS, (k.astype('int32') for k in np.unravel_index(cells, shape))))
+    return CrimeCube(keys, sums.astype('int64'), dims, version=version).materialize(*DEFAULT_VIEW)
+
+
+## Cubo
+
+class CrimeCube:
+    # slice/dice não copiam células: devolvem um cubo com filtros acumulados, aplicados
+    # no roll-up (pela visão densa, quando ela cobre os atributos usados)
+    def __init__(self, keys, measures, dims, version=None, filters=None, shared=None):
+        self.keys = keys            # chave da fato → array de surrogate keys por célula
+        self.measures = measures    # células x MEASURES (int64)
+        self.dims = dims            # chave da fato → DataFrame da dimensão
+        self.version = version      # gold.data_version na construção
+        self.filters = filters or {}  # atributo → conjunto de valores permitidos
+        # Estruturas derivadas, compartilhadas entre o cubo e seus slices/dices
+        self.shared = shared if shared is not None else {'lookups': {}, 'cell_codes': {}, 'views': {}}
+
+    def __len__(self):
+        return len(self.measures)
+
+    def lookup(self, attribute):
+        # Rótulos distintos do atributo e, para cada surrogate key, o código do rótulo
+        # (posição 0 e chaves sem membro → rótulo nulo, último código)
+        lookups = self.shared['lookups']
+        if attribute not in lookups:
+            if attribute not in ATTRIBUTES:
+                raise KeyError(f"Atributo desconhecido: {attribute} (disponíveis: {', '.join(ATTRIBUTES)})")
+            key, column = ATTRIBUTES[attribute]
+            dim = self.dims[key]
+            codes, labels = pd.factorize(dim[column], sort=True)
+            size = max(int(dim[key].max()) + 1 if len(dim) else 1, int(self.keys[key].max()) + 1 if len(self) else 1)
+            by_key = np.full(size, len(labels), dtype='int32')
+            by_key[dim[key].to_numpy()] = np.where(codes >= 0, codes, len(labels))
+            lookups[attribute] = (np.append(np.asarray(labels, dtype=object), None), by_key)
+        return lookups[attribute]
+
+    def codes(self, attribute):
+        # Código do atributo em cada célula (calculado uma vez por cubo)
+        cell_codes = self.shared['cell_codes']
+        if attribute not in cell_codes:
+            _, by_key = self.lookup(attribute)
+            cell_codes[attribute] = by_key[self.keys[ATTRIBUTES[attribute][0]]]
+        return cell_codes[attribute]
+
+    def allowed(self, attribute, values):
+        # Máscara sobre os rótulos do atributo
+        labels, _ = self.lookup(attribute)
+        return np.array([label in values for label in labels], dtype=bool)
+
+    def merged_filters(self, where):
+        filters = dict(self.filters)
+        for attribute, values in (where or {}).items():
+            values = set(values) if isinstance(values, (list, tuple, set, np.ndarray)) else {values}
+            filters[attribute] = filters[attribute] & values if attribute in filters else values
+        return filters
+
+    def slice(self, attribute, value):
+        # Fixa um atributo em um único valor
+        return self.dice(**{attribute: [value]})
+
+    def dice(self, **where):
+        # Restringe vários atributos a conjuntos de valores
+        return CrimeCube(self.keys, self.measures, self.dims, version=self.version,
+                         filters=self.merged_filters(where), shared=self.shared)
+
+    def materialize(self, *attributes):
+        # Visão densa (rótulos de cada atributo x medidas) pré-agregada a partir das células
+        sizes = tuple(len(self.lookup(a)[0]) for a in attributes)
+        size = int(np.prod(sizes))
+        if size > DENSE_GROUP_LIMIT:
+            raise ValueError(f"Visão {attributes} teria {size:,} posições (limite {DENSE_GROUP_LIMIT:,})")
+        group = np.ravel_multi_index(tuple(self.codes(a) for a in attributes), sizes) if len(self) else np.empty(0, dtype='int64')
+        data = np.column_stack([np.bincount(group, weights=self.measures[:, i], minlength=size)
+                                for i in range(len(MEASURES))])
+        self.shared['views'][tuple(attributes)] = data.astype('int64').reshape(sizes + (len(MEASURES),))
+        return self
+
+    def covering_view(self, attributes):
+        candidates = [v for v in self.shared['views'] if set(attributes) <= set(v)]
+        return min(candidates, key=lambda v: self.shared['views'][v].size) if candidates else None
+
+    def rollup(self, *by, where=None):
+        # Soma das medidas agrupada pelos atributos em `by` (nenhum = total geral)
+        filters = self.merged_filters(where)
+        view = self.covering_view([*by, *filters])
+        if view is not None:
+            codes, sums = self.rollup_view(view, by, filters)
+        else:
+            codes, sums = self.rollup_cells(by, filters)
+        columns = {a: self.lookup(a)[0][c] for a, c in zip(by, codes)}
+        columns.update({name: sums[:, i].astype('int64') for i, name in enumerate(MEASURES)})
+        return pd.DataFrame(columns)
+
+    def rollup_view(self, attributes, by, filters):
+        # Seleção dos rótulos filtrados em cada eixo e soma dos eixos fora de `by`
+        data = self.shared['views'][attributes]
+        axis_codes = []
+        for axis, attribute in enumerate(attributes):
+            codes = np.arange(data.shape[axis])
+            if attribute in filters:
+                codes = np.flatnonzero(self.allowed(attribute, filters[attribute]))
+                data = np.take(data, codes, axis=axis)
+            axis_codes.append(codes)
+        if not by:
+            return [], data.reshape(-1, len(MEASURES)).sum(axis=0, keepdims=True)
+        kept = sorted(attributes.index(a) for a in by)
+        data = data.sum(axis=tuple(i for i in range(len(attributes)) if i not in kept))
+        data = data.transpose([kept.index(attributes.index(a)) for a in by] + [len(by)])
+        flat = data.reshape(-1, len(MEASURES))
+        groups = np.flatnonzero(flat[:, 0])
+        positions = np.unravel_index(groups, data.shape[:-1])
+        return [axis_codes[attributes.index(a)][p] for a, p in zip(by, positions)], flat[groups]
+
+    def rollup_cells(self, by, filters):
+        # Caminho geral: máscara sobre as células e bincount pelos códigos combinados
+        measures = self.measures
+        mask = None
+        if filters:
+            mask = np.ones(len(self), dtype=bool)
+            for attribute, values in filters.items():
+                mask &= self.allowed(attribute, values)[self.codes(attribute)]
+            measures = measures[mask]
+        if not by:
+            return [], measures.sum(axis=0, keepdims=True)
+
+        codes = [self.codes(a) if mask is None else self.codes(a)[mask] for a in by]
+        sizes = tuple(len(self.lookup(a)[0]) for a in by)
+        group = np.ravel_multi_index(tuple(codes), sizes) if len(measures) else np.empty(0, dtype='int64')
+        if np.prod(sizes, dtype='float64') <= DENSE_GROUP_LIMIT:
+            sums = np.column_stack([np.bincount(group, weights=measures[:, i], minlength=int(np.prod(sizes)))
+                                    for i in range(measures.shape[1])])
+            groups = np.flatnonzero(sums[:, 0])
+            sums = sums[groups]
+        else:
+            groups, sums = aggregate_cells(group, measures)
+        return list(np.unravel_index(groups, sizes)), sums
+
+    def drill_down(self, by, attribute, where=None):
+        return self.rollup(*by, attribute, where=where)
+
+    def save(self, path):
+        path = Path(path)
+        path.parent.mkdir(parents=True, exist_ok=True)
+        tmp = path.with_suffix(f".{os.getpid()}.tmp")
+        tmp.write_bytes(pickle.dumps({'keys': self.keys, 'measures': self.measures, 'dims': self.dims,
+                                      'version': self.version, 'views': list(self.shared['views'])},
+                                     protocol=pickle.HIGHEST_PROTOCOL))
+        os.replace(tmp, path)
+
+    @classmethod
+    def load(cls, path):
+        state = pickle.loads(Path(path).read_bytes())
+        cube = cls(state['keys'], state['measures'], state['dims'], version=state['version'])
+        for view in state['views']:
+            cube.materialize(*view)
+        return cube
+
+
+def load_or_build_cube(engine, path):
+    # Reaproveita o cubo salvo enquanto a versão dos dados Gold não mudar
+    path = Path(path)
+    if path.exists():
+        cube = CrimeCube.load(path)
+        with engine.connect() as conn:
+            if cube.version == read_data_version(conn):
+                return cube
+    cube = build_cube(engine)
+    cube.save(path)
+    return cube
+
+
+## Conferência contra o PostgreSQL
+
+PARITY_CHECKS = [
+    (('year',), {}), (('month',), {}), (('region',), {}), (('crime_category',), {}), (('age_group',), {}),
+    (('year', 'region', 'crime_category'), {}), (('period_of_day', 'sex'), {}),
+    (('month', 'region'), {'crime_category': ['Violent Crime']}),
+    (('hour',), {'is_weekend': [True], 'region': ['Central', 'Valley']}),
+]
+
+
+def sql_rollup(engine, by):
+    measures = ', '.join(f"SUM({expr}) AS {name}" for name, expr in MEASURES.items())
+    joins = [f"LEFT JOIN gold.{DIMENSIONS[key]} {key} ON {key}.{key} = f.{key}"
+             for key in dict.fromkeys(ATTRIBUTES[a][0] for a in by)]
+    columns = [f"{ATTRIBUTES[a][0]}.{ATTRIBUTES[a][1]} AS {a}" for a in by]
+    sql = (f"SELECT {', '.join(columns)}, {measures} FROM gold.fato_crimes f {' '.join(joins)} "
+           f"GROUP BY {', '.join(str(i) for i in range(1, len(by) + 1))}")
+    return pd.read_sql(text(sql), engine).astype({a: object for a in by}).astype({m: 'int64' for m in MEASURES})
+
+
+def check_cube_parity(engine, cube, checks=PARITY_CHECKS):
+    # Roll-ups do cubo (pela visão densa e pelas células) contra GROUP BY na Gold;
+    # os filtros são aplicados ao GROUP BY pelos atributos de `by` + filtros.
+    # Devolve {verificação: detalhe} das divergências
+    cells_only = CrimeCube(cube.keys, cube.measures, cube.dims)
+    mismatches = {}
+    for by, where in checks:
+        expected = sql_rollup(engine, list(dict.fromkeys([*by, *where])))
+        for attribute, values in where.items():
+            expected = expected[expected[attribute].isin(values)]
+        expected = expected.groupby(list(by), dropna=False)[list(MEASURES)].sum().reset_index()
+        expected = expected[expected['total'] > 0].sort_values(list(by)).reset_index(drop=True)
+        for label, source in [('visão', cube), ('células', cells_only)]:
+            actual = source.rollup(*by, where=where).astype({a: object for a in by})
+            actual = actual.sort_values(list(by)).reset_index(drop=True)
+            try:
+                pd.testing.assert_frame_equal(actual, expected, check_dtype=False)
+            except AssertionError as e:
+                mismatches[f"{' x '.join(by)} {where or ''} ({label})"] = str(e).splitlines()[0]
+    return mismatches
+
+
+def parse_where(items):
+    # ["year=2023", "region=Central,West"] → {'year': [2023], 'region': ['Central', 'West']}
+    where = {}
+    for item in items:
+        attribute, values = item.split('=', 1)
+        parsed = []
+        for value in values.split(','):
+            value = value.strip().strip('"')
+            parsed.append(int(value) if value.lstrip('-').isdigit() else
+                          {'true': True, 'false': False}.get(value.lower(), value))
+        where[attribute] = parsed
+    return where
+
+
+if __name__ == '__main__':
+    import argparse
+
+    parser = argparse.ArgumentParser(description="Cubo OLAP em memória sobre a Gold (slice/dice/roll-up).")
+    parser.add_argument('--by', nargs='*', default=[], help=f"atributos: {', '.join(ATTRIBUTES)}")
+    parser.add_argument('--where', nargs='*', default=[], metavar='ATRIBUTO=V1,V2')
+    parser.add_argument('--repeat', type=int, default=1, help="repete o roll-up para medir a latência")
+    parser.add_argument('--cache', type=Path, help="arquivo do cubo (reaproveitado enquanto gold.data_version não mudar)")
+    parser.add_argument('--verify', action='store_true', help="confere roll-ups do cubo contra GROUP BY no PostgreSQL")
+    args = parser.parse_args()
+
+    engine = create_query_engine()
+    start = time.perf_counter()
+    cube = load_or_build_cube(engine, args.cache) if args.cache else build_cube(engine)
+    print(f"Cubo: {len(cube):,} células não vazias em {time.perf_counter() - start:.2f}s (versão Gold {cube.version})")
+
+    if args.verify:
+        mismatches = check_cube_parity(engine, cube)
+        for grouping, detail in mismatches.items():
+            print(f"   - {grouping}: {detail}")
+        print("Roll-ups idênticos ao PostgreSQL" if not mismatches else "Cubo divergente do PostgreSQL")
+    else:
+        where = parse_where(args.where)
+        for _ in range(args.repeat):
+            start = time.perf_counter()
+            result = cube.rollup(*args.by, where=where)
+            elapsed = time.perf_counter() - start
+        print(result.to_string(index=False))
+        print(f"\nRoll-up em {elapsed * 1000:.3f} ms")
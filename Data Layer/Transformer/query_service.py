@@ -0,0 +1,278 @@
+# Serviço de consultas analíticas da Gold com cache
+# Carrega as consultas nomeadas de gold/consultas.sql (blocos "-- N. Título"),
+# executa com parâmetros opcionais (binds :nome) em um pool de conexões e guarda
+# os resultados em memória (LRU + TTL) e, opcionalmente, em disco (pickle).
+# A chave do cache é (consulta, parâmetros, versão dos dados Gold): o ETL
+# Silver → Gold incrementa gold.data_version ao fim de cada carga, então refreshes
+# repetidos dos dashboards não tocam o banco até chegarem dados novos (a versão é
+# relida no máximo a cada ETL_QUERY_VERSION_CHECK segundos).
+#
+# Uso:
+#   python query_service.py --list
+#   python query_service.py 1 total_de_crimes_por_area --repeat 3
+#   python query_service.py 18 --show --param nome=valor   (binds :nome, quando a consulta os usa)
+
+import hashlib
+import json
+import os
+import pickle
+import re
+import threading
+import time
+import unicodedata
+from collections import OrderedDict
+from dataclasses import dataclass, field
+from pathlib import Path
+
+import pandas as pd
+from sqlalchemy import create_engine, text
+
+CONSULTAS_PATH = Path(__file__).resolve().parent.parent / 'gold' / 'consultas.sql'
+CACHE_SIZE = int(os.getenv("ETL_QUERY_CACHE_SIZE", "128"))  # resultados em memória (LRU)
+CACHE_TTL = float(os.getenv("ETL_QUERY_CACHE_TTL", "3600"))  # segundos; 0 = sem expiração
+CACHE_DIR = os.getenv("ETL_QUERY_CACHE_DIR", "")  # vazio = sem cache em disco
+VERSION_CHECK = float(os.getenv("ETL_QUERY_VERSION_CHECK", "5"))  # segundos entre leituras da versão
+POOL_SIZE = int(os.getenv("ETL_QUERY_POOL_SIZE", "5"))
+
+QUERY_HEADER = re.compile(r'^--\s*(\d+)\.\s*(.+?)\s*$')
+
+
+## Versão dos dados Gold
+
+def read_data_version(conn):
+    return conn.execute(text("SELECT version FROM gold.data_version WHERE id = 1")).scalar() or 0
+
+
+def bump_data_version(engine):
+    # Chamado pelo ETL depois de publicar uma carga
+    with engine.begin() as conn:
+        return conn.execute(text("""
+            INSERT INTO gold.data_version (id, version, updated_at) VALUES (1, 1, CURRENT_TIMESTAMP)
+            ON CONFLICT (id) DO UPDATE SET version = gold.data_version.version + 1, updated_at = EXCLUDED.updated_at
+            RETURNING version
+        """)).scalar()
+
+
+## Consultas nomeadas
+
+@dataclass
+class Query:
+    number: int
+    title: str
+    name: str
+    sql: str
+    notes: list = field(default_factory=list)
+
+
+def slugify(title):
+    # "Total de crimes por área" → total_de_crimes_por_area (parênteses ignorados)
+    title = re.sub(r'\(.*?\)', '', title)
+    ascii_title = unicodedata.normalize('NFKD', title).encode('ascii', 'ignore').decode()
+    return re.sub(r'[^a-z0-9]+', '_', ascii_title.lower()).strip('_')
+
+
+def load_queries(path=CONSULTAS_PATH):
+    # Cada consulta começa em um comentário "-- N. Título" (comentários seguintes
+    # viram notas) e termina no primeiro ';' no fim de uma linha
+    queries = OrderedDict()
+    current, lines = None, []
+    for line in Path(path).read_text(encoding='utf-8').splitlines():
+        stripped = line.strip()
+        header = QUERY_HEADER.match(stripped)
+        if header:
+            number, title = int(header.group(1)), header.group(2)
+            current, lines = Query(number, title, slugify(title), ''), []
+            continue
+        if current is None:
+            continue
+        if stripped.startswith('--'):
+            note = stripped.lstrip('-').strip()
+            if note and not lines:
+                current.notes.append(note)
+            continue
+        if stripped:
+            lines.append(line)
+        if stripped.endswith(';'):
+            current.sql = '\n'.join(lines).rstrip().rstrip(';')
+            queries[current.name] = current
+            current, lines = None, []
+    return queries
+
+
+## Cache
+
+class ResultCache:
+    # LRU em memória com expiração por TTL; com directory, cada resultado também
+    # é gravado em <directory>/<sha256 da chave>.pkl e sobrevive entre processos
+    def __init__(self, max_entries=CACHE_SIZE, ttl=CACHE_TTL, directory=CACHE_DIR or None):
+        self.max_entries = max_entries
+        self.ttl = ttl
+        self.directory = Path(directory) if directory else None
+        self.entries = OrderedDict()
+        self.lock = threading.Lock()
+        self.stats = {'hits': 0, 'disk_hits': 0, 'misses': 0}
+        if self.directory is not None:
+            self.directory.mkdir(parents=True, exist_ok=True)
+
+    def expired(self, stored_at):
+        return self.ttl > 0 and time.time() - stored_at > self.ttl
+
+    def disk_path(self, key):
+        digest = hashlib.sha256(json.dumps(key, default=str).encode('utf-8')).hexdigest()
+        return self.directory / f"{digest}.pkl"
+
+    def get(self, key):
+        with self.lock:
+            entry = self.entries.get(key)
+            if entry is not None and not self.expired(entry[0]):
+                self.entries.move_to_end(key)
+                self.stats['hits'] += 1
+                return entry[1]
+            self.entries.pop(key, None)
+        if self.directory is not None:
+            path = self.disk_path(key)
+            if path.exists():
+                stored_at, result = pickle.loads(path.read_bytes())
+                if not self.expired(stored_at):
+                    self.remember(key, result, stored_at)
+                    with self.lock:
+                        self.stats['disk_hits'] += 1
+                    return result
+                path.unlink(missing_ok=True)
+        with self.lock:
+            self.stats['misses'] += 1
+        return None
+
+    def remember(self, key, result, stored_at):
+        with self.lock:
+            self.entries[key] = (stored_at, result)
+            self.entries.move_to_end(key)
+            while len(self.entries) > self.max_entries:
+                self.entries.popitem(last=False)
+
+    def put(self, key, result):
+        stored_at = time.time()
+        self.remember(key, result, stored_at)
+        if self.directory is not None:
+            # Grava em arquivo temporário e renomeia: leitores nunca veem pickle parcial
+            path = self.disk_path(key)
+            tmp = path.with_suffix(f".{os.getpid()}.tmp")
+            tmp.write_bytes(pickle.dumps((stored_at, result), protocol=pickle.HIGHEST_PROTOCOL))
+            os.replace(tmp, path)
+
+    def evict(self, predicate):
+        # Remove da memória as entradas cuja chave satisfaz predicate
+        with self.lock:
+            for key in [k for k in self.entries if predicate(k)]:
+                del self.entries[key]
+
+    def prune_disk(self):
+        # Arquivos com mais de ttl segundos (versões antigas nunca mais são lidas)
+        if self.directory is None or self.ttl <= 0:
+            return
+        cutoff = time.time() - self.ttl
+        for path in self.directory.glob('*.pkl'):
+            if path.stat().st_mtime < cutoff:
+                path.unlink(missing_ok=True)
+
+    def clear(self):
+        with self.lock:
+            self.entries.clear()
+        if self.directory is not None:
+            for path in self.directory.glob('*.pkl'):
+                path.unlink(missing_ok=True)
+
+
+## Serviço
+
+class QueryService:
+    def __init__(self, engine, queries=None, cache=None, version_check=VERSION_CHECK):
+        self.engine = engine
+        self.queries = queries if queries is not None else load_queries()
+        self.cache = cache if cache is not None else ResultCache()
+        self.version_check = version_check
+        self.version = None
+        self.version_read_at = 0.0
+        self.lock = threading.Lock()
+
+    def resolve(self, query):
+        # Aceita o número (17, "17", "q17") ou o nome (total_de_crimes_por_area)
+        key = str(query).lower().lstrip('q')
+        if key.isdigit():
+            for q in self.queries.values():
+                if q.number == int(key):
+                    return q
+        if str(query) in self.queries:
+            return self.queries[str(query)]
+        raise KeyError(f"Consulta desconhecida: {query}")
+
+    def data_version(self, refresh=False):
+        with self.lock:
+            if refresh or self.version is None or time.monotonic() - self.version_read_at >= self.version_check:
+                with self.engine.connect() as conn:
+                    version = read_data_version(conn)
+                self.version_read_at = time.monotonic()
+                if self.version is not None and version != self.version:
+                    # Nova carga publicada: resultados de versões anteriores não serão mais lidos
+                    self.cache.evict(lambda key: key[-1] != version)
+                    self.cache.prune_disk()
+                self.version = version
+            return self.version
+
+    def run(self, query, params=None, use_cache=True):
+        # Devolve uma cópia do resultado (o DataFrame em cache não é exposto)
+        q = self.resolve(query)
+        params = dict(params or {})
+        key = (q.name, tuple(sorted(params.items())), self.data_version())
+        result = self.cache.get(key) if use_cache else None
+        if result is None:
+            with self.engine.connect() as conn:
+                result = pd.read_sql(text(q.sql), conn, params=params)
+            if use_cache:
+                self.cache.put(key, result)
+        return result.copy()
+
+    def run_all(self, params=None):
+        return {name: self.run(name, params) for name in self.queries}
+
+
+def create_query_engine(pool_size=POOL_SIZE):
+    url = (
+        f"postgresql+psycopg2://{os.getenv('POSTGRES_USER', 'postgres')}:{os.getenv('POSTGRES_PASSWORD', 'postgres')}"
+        f"@{os.getenv('POSTGRES_HOST', 'localhost')}:{os.getenv('POSTGRES_PORT', '5432')}/{os.getenv('POSTGRES_DB', 'crime_data')}"
+    )
+    return create_engine(url, pool_size=pool_size, pool_pre_ping=True)
+
+
+if __name__ == '__main__':
+    import argparse
+
+    parser = argparse.ArgumentParser(description="Consultas analíticas da Gold (consultas.sql) com cache.")
+    parser.add_argument('queries', nargs='*', help="número ou nome das consultas (padrão: todas)")
+    parser.add_argument('--param', action='append', default=[], metavar='NOME=VALOR', help="bind :NOME da consulta")
+    parser.add_argument('--repeat', type=int, default=1, help="execuções de cada consulta (mostra o efeito do cache)")
+    parser.add_argument('--list', action='store_true', help="lista as consultas disponíveis")
+    parser.add_argument('--show', action='store_true', help="imprime os resultados")
+    args = parser.parse_args()
+
+    service = QueryService(create_query_engine())
+    if args.list:
+        for q in service.queries.values():
+            print(f"{q.number:>3}. {q.name}")
+    else:
+        params = dict(p.split('=', 1) for p in args.param)
+        selected = [service.resolve(q) for q in args.queries] or list(service.queries.values())
+        print(f"Versão dos dados Gold: {service.data_version()}")
+        for q in selected:
+            for i in range(args.repeat):
+                start = time.perf_counter()
+                try:
+                    result = service.run(q.name, params)
+                except Exception as e:
+                    print(f"{q.number:>3}. {q.name}: falhou ({str(e).splitlines()[0]})")
+                    result = None
+                    break
+                print(f"{q.number:>3}. {q.name}: {len(result):,} linhas em {(time.perf_counter() - start) * 1000:.1f} ms")
+            if args.show and result is not None:
+                print(result.to_string(index=False))
+        print(f"Cache: {service.cache.stats}")
@@ -0,0 +1,213 @@
+# Execução multiprocesso do Raw → Silver
+# O CSV Raw é dividido em faixas de bytes (shards) que começam sempre em início de
+# registro. Cada processo do pool lê a sua faixa, limpa, transforma e grava direto em
+# silver.crimes pela própria conexão (COPY na carga completa, staging própria +
+# DELETE/INSERT na incremental), de modo que leitura, transformação e serialização
+# do COPY escalam com o número de núcleos.
+#
+# Deduplicação global determinística: antes da transformação, uma varredura paralela
+# lê só DR_NO e DATE OCC de cada shard. Na ordem dos shards, os DR_NO que já
+# apareceram em um shard anterior são entregues ao shard como seen_ids de
+# clean_raw_data, reproduzindo o drop_duplicates global do modo serial (mantém a
+# 1ª ocorrência na ordem do arquivo, antes dos demais filtros).
+# As partições por ano são preparadas por cada processo com os anos do shard já
+# limpo e transformado, como nos modos serial e streaming: o estado (anos esvaziados
+# nesta carga) fica em um Manager().dict() compartilhado e prepare roda sob um lock,
+# antes da gravação do shard.
+#
+# Os processos são criados com fork: o script do ETL não tem guarda de __main__ e
+# seria reexecutado por processos spawn.
+
+import io
+import math
+import multiprocessing
+import os
+from concurrent.futures import ProcessPoolExecutor, as_completed
+
+import numpy as np
+import pandas as pd
+from sqlalchemy import create_engine
+
+from db_loader import load_table, upsert_table
+from etl_metrics import StageRecorder
+from silver_incremental import select_new_or_changed
+from silver_transform import (
+    SOURCE_COLUMNS, RAW_DTYPES, SeenIds, clean_raw_data, build_silver, downcast_integers
+)
+from table_partitions import PartitionedLoad
+
+RAW_WORKERS = int(os.getenv("ETL_RAW_WORKERS", "1"))
+# Tamanho alvo de cada shard; há pelo menos um shard por processo
+SHARD_MB = int(os.getenv("ETL_SHARD_MB", "64"))
+
+BLOCK_SIZE = 1 << 24
+
+# Estado de cada processo do pool (preenchido por init_worker)
+_worker = {}
+
+
+## Divisão do arquivo
+
+def raw_header(path):
+    return pd.read_csv(path, nrows=0).columns.tolist()
+
+
+def shard_offsets(path, shards):
+    # Faixas [início, fim) de tamanho aproximadamente igual. Cada fronteira é o
+    # primeiro '\n' após o alvo com quantidade par de aspas desde o cabeçalho, ou
+    # seja, uma quebra de linha fora de campo entre aspas
+    size = os.path.getsize(path)
+    with open(path, 'rb') as f:
+        f.readline()
+        offsets = [f.tell()]
+        data_start, pos, quotes = offsets[0], offsets[0], 0
+        for i in range(1, shards):
+            target = data_start + (size - data_start) * i // shards
+            while pos < target:
+                block = f.read(min(BLOCK_SIZE, target - pos))
+                if not block:
+                    break
+                quotes += block.count(b'"')
+                pos += len(block)
+            for line in iter(f.readline, b''):
+                quotes += line.count(b'"')
+                pos += len(line)
+                if quotes % 2 == 0:
+                    break
+            if pos >= size:
+                break
+            if pos > offsets[-1]:
+                offsets.append(pos)
+    offsets.append(size)
+    return [(start, end) for start, end in zip(offsets[:-1], offsets[1:]) if end > start]
+
+
+def read_shard(path, columns, start, end, usecols=SOURCE_COLUMNS):
+    with open(path, 'rb') as f:
+        f.seek(start)
+        data = f.read(end - start)
+    dtypes = {c: t for c, t in RAW_DTYPES.items() if c in usecols}
+    df = pd.read_csv(io.BytesIO(data), header=None, names=columns, usecols=usecols, dtype=dtypes)
+    return downcast_integers(df)
+
+
+def first_occurrence_exclusions(shard_ids):
+    # shard_ids: DR_NO distintos de cada shard, na ordem dos shards. Devolve, por
+    # shard, os DR_NO cuja 1ª ocorrência está em um shard anterior
+    if not shard_ids:
+        return []
+    ids = pd.Series(np.concatenate(shard_ids))
+    owner = np.repeat(np.arange(len(shard_ids)), [len(a) for a in shard_ids])
+    repeated = ids.duplicated(keep='first').to_numpy()
+    return [ids.to_numpy()[repeated & (owner == i)] for i in range(len(shard_ids))]
+
+
+## Funções executadas nos processos do pool
+
+def init_worker(db_url, config, partitions, truncated, lock):
+    # config: load_mode, collected_at, existing_hashes, watermark, lookback_days
+    # partitions: (tabela, replace, key) da PartitionedLoad do processo principal;
+    # truncated / lock: estado compartilhado das partições (Manager)
+    _worker.clear()
+    _worker.update(config)
+    _worker['engine'] = create_engine(db_url)
+    table, replace, key = partitions
+    _worker['partitions'] = PartitionedLoad(_worker['engine'], table, replace=replace, key=key, truncated=truncated)
+    _worker['partitions_lock'] = lock
+
+
+def scan_shard(path, columns, start, end):
+    # DR_NO distintos do shard, na ordem do arquivo
+    df = read_shard(path, columns, start, end, usecols=['DR_NO'])
+    return df['DR_NO'].dropna().drop_duplicates().to_numpy().astype('int64')
+
+
+def process_shard(index, path, columns, start, end, excluded):
+    recorder = StageRecorder()
+    engine = _worker['engine']
+    incremental = _worker['load_mode'] == 'incremental'
+
+    with recorder.stage('read_raw') as st:
+        chunk = read_shard(path, columns, start, end)
+        st['rows_out'] = len(chunk)
+    chunk_clean = clean_raw_data(chunk, seen_ids=SeenIds(excluded), verbose=False, recorder=recorder)
+    if incremental:
+        with recorder.stage('select_changed', rows_in=len(chunk_clean)) as st:
+            chunk_clean = select_new_or_changed(
+                chunk_clean, _worker['existing_hashes'], _worker['watermark'], _worker['lookback_days']
+            )
+            st['rows_out'] = len(chunk_clean)
+    with recorder.stage('build_silver', rows_in=len(chunk_clean)) as st:
+        silver = build_silver(chunk_clean, collected_at=_worker['collected_at'], verbose=False, recorder=recorder)
+        st['rows_out'] = len(silver)
+
+    load_seconds = 0.0
+    if len(silver):
+        with recorder.stage('prepare_partitions', rows_in=len(silver)) as st:
+            with _worker['partitions_lock']:
+                st['rows_out'] = len(_worker['partitions'].prepare(silver['year'], silver['crime_id']))
+        with recorder.stage('load_silver', rows_in=len(silver)) as st:
+            # Mesma ordem de gravação do modo serial (BRIN de date_occurred)
+            silver = silver.sort_values(['date_occurred', 'crime_id'], kind='stable')
+            if incremental:
+                stats = upsert_table(silver, 'crimes', engine, schema='silver', key='crime_id', verbose=False,
+                                     staging=f"crimes_staging_{index}")
+            else:
+                stats = load_table(silver, 'crimes', engine, schema='silver', verbose=False)
+            st['rows_out'] = stats['rows']
+        load_seconds = stats['seconds']
+
+    return {
+        'shard': index,
+        'raw_rows': len(chunk),
+        'silver_rows': len(silver),
+        'load_seconds': load_seconds,
+        'last_date_reported': silver['date_reported'].max() if len(silver) else None,
+        'stages': recorder.stage_dicts(),
+    }
+
+
+## Orquestração (processo principal)
+
+def run_parallel(path, db_url, partitions, recorder, config, workers=RAW_WORKERS, shard_mb=SHARD_MB):
+    # partitions: PartitionedLoad de silver.crimes; config: ver init_worker
+    if 'fork' not in multiprocessing.get_all_start_methods():
+        raise RuntimeError("ETL_RAW_WORKERS > 1 requer processos via fork (Linux/macOS)")
+
+    columns = raw_header(path)
+    with recorder.stage('shard_offsets') as st:
+        shards = max(workers, math.ceil(os.path.getsize(path) / (shard_mb * 1024**2)))
+        ranges = shard_offsets(path, shards)
+        st['rows_out'] = len(ranges)
+    print(f"   {len(ranges)} shards para {workers} processos")
+
+    totals = {'raw_rows': 0, 'silver_rows': 0, 'load_seconds': 0.0, 'last_date_reported': None}
+    context = multiprocessing.get_context('fork')
+    with context.Manager() as manager:
+        truncated = manager.dict(partitions.truncated)
+        spec = (partitions.table, partitions.replace, partitions.key)
+        pool = ProcessPoolExecutor(max_workers=workers, mp_context=context, initializer=init_worker,
+                                   initargs=(db_url, config, spec, truncated, manager.Lock()))
+        with pool:
+            with recorder.stage('scan_ids') as st:
+                scans = list(pool.map(scan_shard, *zip(*[(path, columns, s, e) for s, e in ranges])))
+                st['rows_out'] = sum(len(ids) for ids in scans)
+            excluded = first_occurrence_exclusions(scans)
+
+            with recorder.stage('parallel_shards') as st:
+                futures = [pool.submit(process_shard, i, path, columns, s, e, excluded[i])
+                           for i, (s, e) in enumerate(ranges)]
+                for future in as_completed(futures):
+                    result = future.result()
+                    recorder.merge(result['stages'])
+                    for key in ['raw_rows', 'silver_rows', 'load_seconds']:
+                        totals[key] += result[key]
+                    if result['last_date_reported'] is not None:
+                        last = totals['last_date_reported']
+                        totals['last_date_reported'] = max(last, result['last_date_reported']) if last is not None else result['last_date_reported']
+                    print(f"   Shard {result['shard'] + 1}: {result['raw_rows']:,} → {result['silver_rows']:,} registros "
+                          f"(acumulado Silver: {totals['silver_rows']:,})")
+                st['rows_out'] = totals['silver_rows']
+        partitions.truncated.update(truncated.copy())
+        partitions.known = None
+    return totals
@@ -0,0 +1,221 @@
+# Validação de schema e qualidade da Silver
+# Todas as verificações saem de contadores (QualityStats) que podem ser:
+# - calculados em uma única passada vetorizada por DataFrame/chunk (collect_stats)
+#   e somados entre chunks (merge);
+# - obtidos de uma única consulta agregada em silver.crimes (sql_quality_stats),
+#   com o mesmo filtro da leitura incremental, sem trazer linhas para o pandas.
+# evaluate() aplica os limites e monta o relatório estruturado (erros, avisos e o
+# valor de cada verificação), gravado em JSON junto das métricas da execução.
+# Em um chunk isolado (evaluate(stats, chunk=True)) só valem as verificações que
+# o chunk decide sozinho (colunas, tipos, faixa de hour); as taxas (nulos, fora de
+# LA) e os duplicados são avaliados uma vez, sobre os contadores somados.
+
+import json
+import os
+from dataclasses import dataclass, field
+
+import numpy as np
+import pandas as pd
+from sqlalchemy import text
+
+REQUIRED_COLUMNS = [
+    'crime_id', 'date_occurred', 'date_reported', 'hour',
+    'area_code', 'area_name',
+    'crime_code', 'crime_description', 'crime_category', 'crime_severity',
+    'victim_age_group', 'victim_sex_desc', 'victim_descent_desc',
+    'victim_age',
+    'latitude', 'longitude',
+    'is_violent', 'has_weapon', 'case_closed',
+    'year', 'month'
+]
+
+# Percentual máximo de nulos por coluna (acima: erro)
+NULL_THRESHOLDS = {
+    'crime_id': 0.00,
+    'date_occurred': 0.01,
+    'hour': 0.01,
+    'area_code': 0.01,
+    'crime_code': 0.01
+}
+
+DATETIME_COLUMNS = ['date_occurred', 'date_reported']
+HOUR_RANGE = (0, 23)
+LA_BOUNDS = {'latitude': (33.7, 34.4), 'longitude': (-118.7, -118.1)}
+MAX_OUTSIDE_LA = 0.05
+SEVERITY_DOMAIN = ('Serious', 'Minor')
+
+
+@dataclass
+class QualityStats:
+    rows: int = 0
+    nulls: dict = field(default_factory=dict)
+    hour_invalid: int = 0      # não nulo fora de 0-23 (nulos: NULL_THRESHOLDS)
+    coords: int = 0            # pares latitude/longitude não nulos
+    coords_outside: int = 0    # ... fora do retângulo de LA
+    severity_invalid: int = 0  # crime_severity não nulo fora do domínio
+    duplicate_ids: int = 0     # já contados (consulta SQL); nos chunks, ver crime_ids
+    missing_columns: set = field(default_factory=set)
+    non_datetime: set = field(default_factory=set)
+    crime_ids: list = field(default_factory=list)  # crime_id de cada chunk (duplicados entre chunks)
+
+    def merge(self, other):
+        self.rows += other.rows
+        for col, count in other.nulls.items():
+            self.nulls[col] = self.nulls.get(col, 0) + count
+        self.hour_invalid += other.hour_invalid
+        self.coords += other.coords
+        self.coords_outside += other.coords_outside
+        self.severity_invalid += other.severity_invalid
+        self.duplicate_ids += other.duplicate_ids
+        self.missing_columns |= other.missing_columns
+        self.non_datetime |= other.non_datetime
+        self.crime_ids.extend(other.crime_ids)
+        return self
+
+    def duplicates(self):
+        if not self.crime_ids:
+            return self.duplicate_ids
+        ids = np.concatenate(self.crime_ids)
+        return self.duplicate_ids + len(ids) - len(np.unique(ids))
+
+
+def collect_stats(df):
+    # Uma passada vetorizada pelas colunas verificadas do DataFrame
+    stats = QualityStats(rows=len(df))
+    stats.missing_columns = {c for c in REQUIRED_COLUMNS if c not in df.columns}
+    stats.non_datetime = {c for c in DATETIME_COLUMNS
+                          if c in df.columns and not pd.api.types.is_datetime64_any_dtype(df[c])}
+
+    null_cols = [c for c in NULL_THRESHOLDS if c in df.columns]
+    stats.nulls = {c: int(n) for c, n in df[null_cols].isna().sum().items()}
+
+    if 'hour' in df.columns:
+        hour = df['hour']
+        stats.hour_invalid = int((hour.notna() & ~hour.between(*HOUR_RANGE).fillna(False).astype(bool)).sum())
+
+    if 'latitude' in df.columns and 'longitude' in df.columns:
+        lat, lon = df['latitude'].to_numpy('float64', na_value=np.nan), df['longitude'].to_numpy('float64', na_value=np.nan)
+        present = ~(np.isnan(lat) | np.isnan(lon))
+        inside = ((lat >= LA_BOUNDS['latitude'][0]) & (lat <= LA_BOUNDS['latitude'][1]) &
+                  (lon >= LA_BOUNDS['longitude'][0]) & (lon <= LA_BOUNDS['longitude'][1]))
+        stats.coords = int(present.sum())
+        stats.coords_outside = int((present & ~inside).sum())
+
+    if 'crime_severity' in df.columns:
+        severity = df['crime_severity']
+        stats.severity_invalid = int((severity.notna() & ~severity.isin(SEVERITY_DOMAIN)).sum())
+
+    if 'crime_id' in df.columns:
+        stats.crime_ids = [df['crime_id'].dropna().to_numpy('int64')]
+    return stats
+
+
+def sql_quality_stats(engine, where=None, params=None, table='silver.crimes'):
+    # Os mesmos contadores em uma única consulta agregada (colunas ausentes são puladas)
+    schema, name = table.split('.')
+    with engine.connect() as conn:
+        column_types = dict(conn.execute(text(
+            "SELECT column_name, data_type FROM information_schema.columns "
+            "WHERE table_schema = :schema AND table_name = :name"
+        ), {'schema': schema, 'name': name}).all())
+
+        stats = QualityStats()
+        stats.missing_columns = {c for c in REQUIRED_COLUMNS if c not in column_types}
+        stats.non_datetime = {c for c in DATETIME_COLUMNS
+                              if c in column_types and not column_types[c].startswith('timestamp')}
+
+        exprs = {'rows': "COUNT(*)"}
+        for col in NULL_THRESHOLDS:
+            if col in column_types:
+                exprs[f"null_{col}"] = f"COUNT(*) - COUNT({col})"
+        if 'hour' in column_types:
+            exprs['hour_invalid'] = f"COUNT(*) FILTER (WHERE hour NOT BETWEEN {HOUR_RANGE[0]} AND {HOUR_RANGE[1]})"
+        if 'latitude' in column_types and 'longitude' in column_types:
+            (lat_min, lat_max), (lon_min, lon_max) = LA_BOUNDS['latitude'], LA_BOUNDS['longitude']
+            present = "latitude IS NOT NULL AND longitude IS NOT NULL"
+            exprs['coords'] = f"COUNT(*) FILTER (WHERE {present})"
+            exprs['coords_outside'] = (f"COUNT(*) FILTER (WHERE {present} AND NOT (latitude BETWEEN {lat_min} AND {lat_max} "
+                                       f"AND longitude BETWEEN {lon_min} AND {lon_max}))")
+        if 'crime_severity' in column_types:
+            domain = ', '.join(f"'{v}'" for v in SEVERITY_DOMAIN)
+            exprs['severity_invalid'] = f"COUNT(*) FILTER (WHERE crime_severity NOT IN ({domain}))"
+        if 'crime_id' in column_types:
+            exprs['duplicate_ids'] = "COUNT(crime_id) - COUNT(DISTINCT crime_id)"
+
+        select = ', '.join(f"{expr} AS {alias}" for alias, expr in exprs.items())
+        where_sql = f" WHERE {where}" if where else ""
+        row = conn.execute(text(f"SELECT {select} FROM {table}{where_sql}"), params or {}).mappings().one()
+
+    stats.rows = row['rows']
+    stats.nulls = {col: row[f"null_{col}"] for col in NULL_THRESHOLDS if f"null_{col}" in row}
+    for attr in ['hour_invalid', 'coords', 'coords_outside', 'severity_invalid', 'duplicate_ids']:
+        if attr in row:
+            setattr(stats, attr, row[attr])
+    return stats
+
+
+def evaluate(stats, chunk=False):
+    # Relatório estruturado: cada verificação com valor, limite, nível e resultado
+    # chunk: apenas as verificações decididas por um chunk isolado
+    checks = []
+
+    def check(name, level, passed, message, **values):
+        checks.append({'check': name, 'level': level, 'passed': bool(passed), 'message': message, **values})
+
+    if not chunk:
+        check('not_empty', 'error', stats.rows > 0, "Dataset vazio.", rows=stats.rows)
+    missing = sorted(stats.missing_columns)
+    check('required_columns', 'error', not missing, f"Colunas ausentes: {missing}", missing=missing)
+    for col in DATETIME_COLUMNS:
+        check(f'datetime_{col}', 'warning', col not in stats.non_datetime,
+              f"{col} não está em datetime64; verifique conversão.")
+    check('hour_range', 'error', stats.hour_invalid == 0, f"hour fora de 0-23: {stats.hour_invalid:,} registros.",
+          value=stats.hour_invalid)
+    if not chunk:
+        dataset_checks(stats, check)
+
+    failed = [c for c in checks if not c['passed']]
+    return {
+        'rows': stats.rows,
+        'passed': not any(c['level'] == 'error' for c in failed),
+        'errors': [c['message'] for c in failed if c['level'] == 'error'],
+        'warnings': [c['message'] for c in failed if c['level'] == 'warning'],
+        'checks': checks,
+    }
+
+
+def dataset_checks(stats, check):
+    # Limites sobre o dataset inteiro: taxas de nulos e de coordenadas fora de LA,
+    # domínio de crime_severity e crime_id duplicado
+    for col, max_null in NULL_THRESHOLDS.items():
+        if col in stats.nulls:
+            pct = stats.nulls[col] / stats.rows if stats.rows else 0.0
+            check(f'nulls_{col}', 'error', pct <= max_null, f"{col} com {pct:.1%} nulos (limite {max_null:.1%}).",
+                  value=stats.nulls[col], rate=pct, limit=max_null)
+    outside_rate = stats.coords_outside / stats.coords if stats.coords else 0.0
+    check('la_bounds', 'warning', outside_rate <= MAX_OUTSIDE_LA,
+          f"{stats.coords_outside:,} coordenadas fora do limite LA (>{MAX_OUTSIDE_LA:.0%}).",
+          value=stats.coords_outside, rate=outside_rate, limit=MAX_OUTSIDE_LA)
+    check('severity_domain', 'warning', stats.severity_invalid == 0,
+          f"crime_severity fora do domínio esperado: {stats.severity_invalid:,} registros.", value=stats.severity_invalid)
+    duplicates = stats.duplicates()
+    check('crime_id_unique', 'warning', duplicates == 0, f"crime_id duplicado: {duplicates:,}", value=duplicates)
+
+
+def report_validation(report, label=""):
+    if report['warnings']:
+        print(f"Avisos{label}:")
+        for w in report['warnings']:
+            print(f"   - {w}")
+
+    if report['errors']:
+        print(f"Erros{label}:")
+        for e in report['errors']:
+            print(f"   - {e}")
+        raise ValueError("Falha nas validações de schema/qualidade. Corrija antes de gerar a Gold.")
+
+
+def write_report(report, path, **context):
+    os.makedirs(path.parent, exist_ok=True)
+    path.write_text(json.dumps({**context, **report}, indent=2, default=str), encoding='utf-8')
+    return path
@@ -0,0 +1,440 @@
+# Transformações Raw → Silver
+# Limpeza, regras de classificação e feature engineering compartilhadas
+# entre o modo em memória e o modo streaming (por chunks) do ETL.
+
+from datetime import datetime
+
+import numpy as np
+import pandas as pd
+
+from etl_metrics import stage
+from spatial_grid import grid_keys
+
+
+# Mapeamentos
+descent_map = {
+    'A': 'Other Asian', 'B': 'Black', 'C': 'Chinese', 'D': 'Cambodian',
+    'F': 'Filipino', 'G': 'Guamanian', 'H': 'Hispanic/Latino', 'I': 'American Indian',
+    'J': 'Japanese', 'K': 'Korean', 'L': 'Laotian', 'O': 'Other',
+    'P': 'Pacific Islander', 'S': 'Samoan', 'U': 'Hawaiian', 'V': 'Vietnamese',
+    'W': 'White', 'X': 'Unknown', 'Z': 'Asian Indian', '-': 'Unknown'
+}
+
+sex_map = {'M': 'Male', 'F': 'Female', 'X': 'Unknown', 'H': 'Unknown', '-': 'Unknown'}
+
+# Colunas Raw usadas pela Silver (base do hash de origem de cada registro)
+SOURCE_COLUMNS = [
+    'DR_NO', 'Date Rptd', 'DATE OCC', 'TIME OCC', 'AREA', 'AREA NAME', 'Rpt Dist No',
+    'Part 1-2', 'Crm Cd', 'Crm Cd Desc', 'Vict Age', 'Vict Sex', 'Vict Descent',
+    'Premis Cd', 'Premis Desc', 'Weapon Used Cd', 'Weapon Desc', 'Status', 'Status Desc',
+    'LOCATION', 'LAT', 'LON'
+]
+
+# Schema tipado: a Raw é lida apenas com SOURCE_COLUMNS; enumerações e datas
+# (poucos valores distintos) como category e inteiros com a menor largura possível
+RAW_CATEGORY_COLUMNS = [
+    'Date Rptd', 'DATE OCC', 'AREA NAME', 'Crm Cd Desc', 'Vict Sex', 'Vict Descent',
+    'Premis Desc', 'Weapon Desc', 'Status', 'Status Desc'
+]
+RAW_DTYPES = {col: 'category' for col in RAW_CATEGORY_COLUMNS}
+
+SILVER_CATEGORY_COLUMNS = [
+    'day_name', 'period_of_day', 'area_name', 'crime_severity', 'crime_description', 'crime_category',
+    'victim_age_group', 'victim_sex', 'victim_sex_desc', 'victim_descent', 'victim_descent_desc',
+    'premise_description', 'premise_category', 'weapon_description', 'weapon_category',
+    'status_code', 'status_description'
+]
+
+RAW_DATE_FORMAT = '%m/%d/%Y %I:%M:%S %p'
+DAY_NAMES = np.array(['Monday', 'Tuesday', 'Wednesday', 'Thursday', 'Friday', 'Saturday', 'Sunday'], dtype=object)
+
+def get_period(hour):
+    if 5 <= hour < 12: return 'Morning'
+    elif 12 <= hour < 17: return 'Afternoon'
+    elif 17 <= hour < 21: return 'Evening'
+    else: return 'Night'
+
+def get_crime_category(desc):
+    desc = str(desc).upper()
+    if any(x in desc for x in ['HOMICIDE', 'RAPE', 'ROBBERY', 'ASSAULT', 'KIDNAP', 'BATTERY']):
+        return 'Violent Crime'
+    elif any(x in desc for x in ['THEFT', 'BURGLARY', 'STOLEN', 'VEHICLE', 'SHOPLIFTING']):
+        return 'Property Crime'
+    elif any(x in desc for x in ['VANDALISM', 'TRESPASS', 'DISTURBING']):
+        return 'Quality of Life'
+    else:
+        return 'Other Crime'
+
+def get_age_group(age):
+    try:
+        age = int(age)
+        if age <= 0: return 'Unknown'
+        elif age < 18: return '0-17'
+        elif age < 26: return '18-25'
+        elif age < 36: return '26-35'
+        elif age < 51: return '36-50'
+        elif age < 66: return '51-65'
+        else: return '65+'
+    except:
+        return 'Unknown'
+
+def get_premise_category(desc):
+    desc = str(desc).upper()
+    if any(x in desc for x in ['DWELLING', 'RESIDENCE', 'HOUSE', 'APARTMENT', 'CONDOMINIUM']):
+        return 'Residential'
+    elif any(x in desc for x in ['STREET', 'SIDEWALK', 'PARKING', 'ALLEY', 'PARK', 'BEACH']):
+        return 'Public'
+    elif any(x in desc for x in ['STORE', 'SHOP', 'RESTAURANT', 'COMMERCIAL', 'OFFICE', 'BANK', 'MARKET']):
+        return 'Commercial'
+    else:
+        return 'Other'
+
+def get_weapon_category(desc):
+    desc = str(desc).upper() if pd.notna(desc) else ''
+    if 'GUN' in desc or 'FIREARM' in desc or 'RIFLE' in desc or 'REVOLVER' in desc:
+        return 'Firearm'
+    elif 'KNIFE' in desc or 'BLADE' in desc or 'CUTTING' in desc:
+        return 'Blade'
+    elif 'BLUNT' in desc or 'CLUB' in desc or 'BAT' in desc:
+        return 'Blunt Object'
+    elif 'STRONG-ARM' in desc or 'HANDS' in desc or 'FIST' in desc:
+        return 'Physical Force'
+    elif desc == '' or desc == 'NAN':
+        return 'No Weapon'
+    else:
+        return 'Other Weapon'
+
+
+# Motor de classificação vetorizado
+# As regras por palavra-chave (get_*_category) são avaliadas uma única vez por
+# descrição distinta e o resultado é propagado para todas as linhas via códigos
+# do factorize. Idade e hora são classificadas com np.select.
+
+def classify_unique(values, rule):
+    codes, uniques = pd.factorize(pd.Series(values), use_na_sentinel=False)
+    labels = np.array([rule(u) for u in uniques], dtype=object)
+    return labels[codes]
+
+def classify_period(hour):
+    hour = np.asarray(hour)
+    conditions = [
+        (hour >= 5) & (hour < 12),
+        (hour >= 12) & (hour < 17),
+        (hour >= 17) & (hour < 21),
+    ]
+    return np.select(conditions, ['Morning', 'Afternoon', 'Evening'], default='Night').astype(object)
+
+def classify_age_group(age):
+    age = pd.Series(age)
+    if not pd.api.types.is_numeric_dtype(age) or pd.api.types.is_bool_dtype(age):
+        # Valores não numéricos seguem a regra original (int() com fallback)
+        return classify_unique(age, get_age_group)
+
+    age = age.to_numpy(dtype='float64', na_value=np.nan)
+    valid = np.isfinite(age)
+    age = np.trunc(np.where(valid, age, 0))
+    conditions = [
+        ~valid | (age <= 0),
+        age < 18,
+        age < 26,
+        age < 36,
+        age < 51,
+        age < 66,
+    ]
+    choices = ['Unknown', '0-17', '18-25', '26-35', '36-50', '51-65']
+    return np.select(conditions, choices, default='65+').astype(object)
+
+# Datas: poucos milhares de strings distintas em milhões de linhas (a hora é quase
+# sempre 12:00:00 AM). Cada string distinta é convertida uma única vez e o
+# resultado volta para as linhas pelos códigos do factorize.
+
+def parse_dates_cached(values, fmt=RAW_DATE_FORMAT):
+    values = pd.Series(values)
+    codes, uniques = pd.factorize(values)
+    parsed = pd.to_datetime(pd.Series(uniques, dtype=object), format=fmt, errors='coerce')
+    # Código -1 (valor nulo) aponta para o NaT acrescentado ao final
+    lookup = pd.DatetimeIndex(parsed).append(pd.DatetimeIndex([pd.NaT]))
+    return pd.Series(lookup[codes], index=values.index)
+
+def combine_date_time(dates, time_occ):
+    # DATE OCC + TIME OCC (HHMM) em um único timestamp; horários fora de
+    # 00:00-23:59 viram NaT
+    time_occ = np.asarray(time_occ)
+    hours, minutes = time_occ // 100, time_occ % 100
+    valid = (time_occ >= 0) & (hours < 24) & (minutes < 60)
+    offset = pd.to_timedelta(np.where(valid, hours * 60 + minutes, 0), unit='min')
+    combined = pd.Series(dates.to_numpy() + offset.to_numpy(), index=dates.index)
+    return combined.where(valid)
+
+def downcast_integers(df, exclude=()):
+    # Colunas inteiras (sem nulos) para int8/int16/int32 conforme o intervalo dos valores
+    for col in df.columns:
+        if col not in exclude and pd.api.types.is_integer_dtype(df[col]) and not pd.api.types.is_bool_dtype(df[col]):
+            df[col] = pd.to_numeric(df[col], downcast='integer')
+    return df
+
+def map_category(values, mapping=None, default=None):
+    # Mapeia uma enumeração categoria a categoria (mapping=None mantém o valor);
+    # ausentes e valores fora do mapeamento recebem default
+    values = pd.Series(values)
+    if not isinstance(values.dtype, pd.CategoricalDtype):
+        values = values.astype('category')
+    labels = [mapping.get(c, default) if mapping is not None else c for c in values.cat.categories]
+    lookup = np.array(labels + [default], dtype=object)
+    return pd.Categorical(lookup[values.cat.codes.to_numpy()])
+
+def compute_source_hash(df):
+    # Hash por registro das colunas Raw de origem (BIGINT), usado para detectar
+    # DR_NO alterados na carga incremental. Numéricos são normalizados para float
+    # para que o hash não dependa do dtype inferido em cada leitura/chunk.
+    source = df[SOURCE_COLUMNS].copy()
+    for col in source.columns:
+        if pd.api.types.is_numeric_dtype(source[col]):
+            source[col] = source[col].astype('float64')
+        else:
+            source[col] = source[col].astype('object')
+    return pd.util.hash_pandas_object(source, index=False).to_numpy().view('int64')
+
+def check_classifier_parity(df_clean):
+    # Compara o motor vetorizado com as funções originais aplicadas linha a linha
+    checks = {
+        'crime_category': (df_clean['Crm Cd Desc'], get_crime_category, lambda s: classify_unique(s, get_crime_category)),
+        'premise_category': (df_clean['Premis Desc'], get_premise_category, lambda s: classify_unique(s, get_premise_category)),
+        'weapon_category': (df_clean['Weapon Desc'], get_weapon_category, lambda s: classify_unique(s, get_weapon_category)),
+        'victim_age_group': (df_clean['Vict Age'], get_age_group, classify_age_group),
+        'period_of_day': (pd.to_numeric(df_clean['TIME OCC'], errors='coerce').fillna(0).astype(int) // 100, get_period, classify_period),
+    }
+    mismatches = {}
+    for name, (values, rule, vectorized) in checks.items():
+        expected = values.apply(rule).to_numpy(dtype=object)
+        actual = np.asarray(vectorized(values), dtype=object)
+        diff = int((expected != actual).sum())
+        if diff:
+            mismatches[name] = diff
+
+    # Conversão de datas em cache x pd.to_datetime linha a linha
+    for name, col in [('date_occurred', 'DATE OCC'), ('date_reported', 'Date Rptd')]:
+        expected = pd.to_datetime(df_clean[col], format=RAW_DATE_FORMAT, errors='coerce')
+        actual = parse_dates_cached(df_clean[col])
+        diff = int((~((expected == actual) | (expected.isna() & actual.isna()))).sum())
+        if diff:
+            mismatches[name] = diff
+    return mismatches
+
+
+## Leitura da Raw
+
+def read_raw(path, **kwargs):
+    df = pd.read_csv(path, usecols=SOURCE_COLUMNS, dtype=RAW_DTYPES, **kwargs)
+    return downcast_integers(df)
+
+
+## Etapa 1: Limpeza de Dados
+
+class SeenIds:
+    # DR_NO já vistos em chunks anteriores, em um array int64 ordenado: 8 bytes por
+    # id, sem objetos Python. A pertinência é uma busca binária (searchsorted) e os
+    # ids novos de cada chunk entram por intercalação linear (np.insert nas posições
+    # ordenadas), sem reconstruir uma tabela hash sobre todo o histórico a cada chunk.
+
+    def __init__(self, ids=()):
+        self.ids = np.unique(np.asarray(ids, dtype='int64'))
+
+    def __len__(self):
+        return len(self.ids)
+
+    def contains(self, values):
+        # Busca com as chaves ordenadas: acesso sequencial ao array (bem mais rápido
+        # que chaves em ordem aleatória sobre milhões de ids)
+        values = np.asarray(values, dtype='int64')
+        found = np.zeros(len(values), dtype=bool)
+        if not len(self.ids) or not len(values):
+            return found
+        order = np.argsort(values, kind='stable')
+        keys = values[order]
+        pos = np.searchsorted(self.ids, keys).clip(max=len(self.ids) - 1)
+        found[order] = self.ids[pos] == keys
+        return found
+
+    def add(self, values):
+        new = np.unique(np.asarray(values, dtype='int64'))
+        new = new[~self.contains(new)]
+        if len(new):
+            self.ids = np.insert(self.ids, np.searchsorted(self.ids, new), new)
+
+
+def clean_raw_data(df, seen_ids=None, verbose=True, recorder=None):
+    # seen_ids: SeenIds com os DR_NO já vistos em chunks anteriores (modo streaming).
+    # É atualizado in-place com todos os DR_NO do chunk, antes dos demais filtros,
+    # para reproduzir exatamente o drop_duplicates global (mantém a 1ª ocorrência).
+    # recorder: RunRecorder opcional (métricas por etapa clean_1 ... clean_7).
+    log = print if verbose else (lambda *args, **kwargs: None)
+
+    # 1. Remover duplicados
+    with stage(recorder, 'clean_1_duplicates', rows_in=len(df)) as st:
+        df_clean = df.drop_duplicates(subset=['DR_NO'])
+        if seen_ids is not None:
+            ids = df_clean['DR_NO']
+            known = ids.notna().to_numpy(copy=True)
+            known[known] = seen_ids.contains(ids[known].to_numpy())
+            df_clean = df_clean[~known]
+            seen_ids.add(df_clean['DR_NO'].dropna().to_numpy())
+        st['rows_out'] = len(df_clean)
+    log(f"   Após remover duplicados: {len(df_clean):,}")
+
+    # 2. Remover nulos críticos
+    with stage(recorder, 'clean_2_critical_nulls', rows_in=len(df_clean)) as st:
+        df_clean = df_clean.dropna(subset=['DR_NO', 'DATE OCC', 'Crm Cd'])
+        st['rows_out'] = len(df_clean)
+    log(f"   Após remover nulos críticos: {len(df_clean):,}")
+
+    # 3. Remover coordenadas inválidas (0,0)
+    with stage(recorder, 'clean_3_invalid_coords', rows_in=len(df_clean)) as st:
+        df_clean = df_clean[(df_clean['LAT'] != 0) & (df_clean['LON'] != 0)]
+        st['rows_out'] = len(df_clean)
+    log(f"   Após remover coordenadas inválidas: {len(df_clean):,}")
+
+    # 4. Remover idades inválidas
+    with stage(recorder, 'clean_4_invalid_age', rows_in=len(df_clean)) as st:
+        df_clean = df_clean[(df_clean['Vict Age'] >= 0) & (df_clean['Vict Age'] <= 120)]
+        st['rows_out'] = len(df_clean)
+    log(f"   Após remover idades inválidas: {len(df_clean):,}")
+
+    # 5. Remover registros sem dados essenciais
+    with stage(recorder, 'clean_5_essential_nulls', rows_in=len(df_clean)) as st:
+        df_clean = df_clean.dropna(subset=['Crm Cd Desc', 'AREA NAME', 'Status'])
+        st['rows_out'] = len(df_clean)
+    log(f"   Após remover campos essenciais nulos: {len(df_clean):,}")
+
+    # 6. Filtro de vítima identificada
+    with stage(recorder, 'clean_6_identified_victim', rows_in=len(df_clean)) as st:
+        df_clean = df_clean[(df_clean['Vict Age'] > 0) | (df_clean['Vict Sex'].isin(['M', 'F']))]
+        st['rows_out'] = len(df_clean)
+    log(f"   Após filtro de vítima identificada: {len(df_clean):,}")
+
+    # 7. Remover localizações inválidas
+    with stage(recorder, 'clean_7_location', rows_in=len(df_clean)) as st:
+        df_clean = df_clean[~df_clean['LOCATION'].isna()]
+        df_clean = df_clean[~df_clean['Premis Desc'].isna()]
+        st['rows_out'] = len(df_clean)
+    log(f"   Após filtro de localização: {len(df_clean):,}")
+
+    return df_clean
+
+
+## Etapa 2: Transformações e Feature Engineering
+
+def build_silver(df_clean, collected_at=None, verbose=True, recorder=None):
+    log = print if verbose else (lambda *args, **kwargs: None)
+
+    # Converter datas (sem alterar o DataFrame recebido), uma vez por string distinta
+    with stage(recorder, 'parse_dates', rows_in=len(df_clean)) as st:
+        date_temp = parse_dates_cached(df_clean['DATE OCC'])
+        date_reported_temp = parse_dates_cached(df_clean['Date Rptd'])
+        st['rows_out'] = int((date_temp.notna() & date_reported_temp.notna()).sum())
+    coerced_occ = int((date_temp.isna() & df_clean['DATE OCC'].notna()).sum())
+    coerced_rptd = int((date_reported_temp.isna() & df_clean['Date Rptd'].notna()).sum())
+    if coerced_occ or coerced_rptd:
+        log(f"   Datas não reconhecidas (NaT): DATE OCC {coerced_occ:,}, Date Rptd {coerced_rptd:,}")
+
+    # Remover registros com datas inválidas após parsing
+    initial_count = len(df_clean)
+    valid = date_temp.notna() & date_reported_temp.notna()
+    df_clean = df_clean[valid]
+    date_temp = date_temp[valid]
+    date_reported = date_reported_temp[valid]
+    log(f"   Após remover datas inválidas: {len(df_clean):,} (removidos {initial_count - len(df_clean):,})")
+
+    # Normalizar horário e combinar com a data da ocorrência
+    time_occ = pd.to_numeric(df_clean['TIME OCC'], errors='coerce').fillna(0).astype(int)
+    occurred_at = combine_date_time(date_temp, time_occ)
+    coerced_time = int(occurred_at.isna().sum())
+    if coerced_time:
+        log(f"   TIME OCC fora de 00:00-23:59 (occurred_at = NaT): {coerced_time:,}")
+
+    # Criar DataFrame Silver
+    silver = pd.DataFrame()
+
+    # Identificação
+    silver['crime_id'] = df_clean['DR_NO'].values
+
+    # Datas - use .values to avoid index alignment issues
+    silver['date_reported'] = date_reported.values
+    silver['date_occurred'] = date_temp.values
+    silver['time_occurred'] = time_occ.values
+    silver['occurred_at'] = occurred_at.values
+
+    # Temporal
+    silver['hour'] = (time_occ // 100).astype(int).values
+    silver['day_of_week'] = date_temp.dt.dayofweek.values
+    silver['day_name'] = DAY_NAMES[silver['day_of_week'].values]
+    silver['period_of_day'] = classify_period(silver['hour'].values)
+
+    # Localização
+    silver['area_code'] = df_clean['AREA'].values
+    silver['area_name'] = df_clean['AREA NAME'].values
+    silver['district_code'] = df_clean['Rpt Dist No'].values
+
+    # Crime
+    silver['crime_severity'] = map_category(df_clean['Part 1-2'], {1: 'Serious', 2: 'Minor'})
+    silver['crime_code'] = df_clean['Crm Cd'].values
+    silver['crime_description'] = df_clean['Crm Cd Desc'].values
+    with stage(recorder, 'classify_crime_category', rows_in=len(df_clean)):
+        silver['crime_category'] = classify_unique(df_clean['Crm Cd Desc'], get_crime_category)
+
+    # Vítima
+    silver['victim_age'] = df_clean['Vict Age'].values
+    silver['victim_age_group'] = classify_age_group(df_clean['Vict Age'])
+    silver['victim_sex'] = map_category(df_clean['Vict Sex'], default='X')
+    silver['victim_sex_desc'] = map_category(df_clean['Vict Sex'], sex_map, default='Unknown')
+    silver['victim_descent'] = map_category(df_clean['Vict Descent'], default='X')
+    silver['victim_descent_desc'] = map_category(df_clean['Vict Descent'], descent_map, default='Unknown')
+
+    # Premissa
+    silver['premise_code'] = df_clean['Premis Cd'].values
+    silver['premise_description'] = df_clean['Premis Desc'].values
+    with stage(recorder, 'classify_premise_category', rows_in=len(df_clean)):
+        silver['premise_category'] = classify_unique(df_clean['Premis Desc'], get_premise_category)
+
+    # Arma
+    silver['weapon_code'] = df_clean['Weapon Used Cd'].values
+    silver['weapon_description'] = df_clean['Weapon Desc'].values
+    with stage(recorder, 'classify_weapon_category', rows_in=len(df_clean)):
+        silver['weapon_category'] = classify_unique(df_clean['Weapon Desc'], get_weapon_category)
+
+    # Flags
+    silver['is_violent'] = (silver['crime_category'] == 'Violent Crime')
+    silver['has_weapon'] = (silver['weapon_category'] != 'No Weapon')
+
+    # Status
+    silver['status_code'] = df_clean['Status'].values
+    silver['status_description'] = df_clean['Status Desc'].values
+    silver['case_closed'] = df_clean['Status'].isin(['AA', 'JA']).values
+
+    # Coordenadas
+    silver['latitude'] = df_clean['LAT'].values
+    silver['longitude'] = df_clean['LON'].values
+    with stage(recorder, 'grid_key', rows_in=len(df_clean)):
+        silver['grid_key'] = grid_keys(df_clean['LAT'], df_clean['LON'])
+    silver['location'] = df_clean['LOCATION'].str.strip().values
+
+    # Dimensões temporais
+    silver['year'] = date_temp.dt.year.values
+    silver['month'] = date_temp.dt.month.values
+    silver['quarter'] = date_temp.dt.quarter.values
+
+    # Metadados
+    silver['collected_at'] = collected_at if collected_at is not None else datetime.now()
+    with stage(recorder, 'source_hash', rows_in=len(df_clean)):
+        silver['source_hash'] = compute_source_hash(df_clean)
+
+    # Tipos compactos: enumerações como category, inteiros com a menor largura
+    for col in SILVER_CATEGORY_COLUMNS:
+        silver[col] = silver[col].astype('category')
+    return downcast_integers(silver, exclude=['crime_id', 'source_hash', 'grid_key'])
+
+
+def iter_raw_chunks(path, chunk_size):
+    # Leitura do CSV Raw em blocos de tamanho fixo (mesmo schema tipado de read_raw)
+    for chunk in pd.read_csv(path, usecols=SOURCE_COLUMNS, dtype=RAW_DTYPES, chunksize=chunk_size):
+        yield downcast_integers(chunk)
@@ -0,0 +1,254 @@
+# Índice espacial em grade (quadkey / código de Morton)
+# Cada coordenada recebe grid_key: os bits de x e y do tile Web Mercator no nível
+# GRID_MAX_ZOOM intercalados (código de Morton, a mesma ordem do quadkey). O tile
+# de qualquer nível menor é um prefixo da chave (grid_key >> 2 * (GRID_MAX_ZOOM - zoom)),
+# então cada tile é um intervalo contíguo de grid_key: consultas espaciais viram
+# BETWEEN sobre um B-tree comum em silver.crimes / gold.fato_crimes.
+
+import numpy as np
+import pandas as pd
+from sqlalchemy import text
+
+GRID_MAX_ZOOM = 20  # tiles de ~32 m em Los Angeles (chave de 40 bits)
+# Níveis de gold.agg_grid_hotspots (~8 km, ~2 km e ~500 m em LA); build_gold.sql usa os mesmos
+GRID_ZOOMS = [12, 14, 16]
+EARTH_RADIUS_M = 6371008.8
+MAX_MERCATOR_LAT = 85.05112878
+
+
+## Codificação
+
+def spread_bits(v):
+    # Intercala zeros entre os 32 bits menos significativos (x → x0 0 x1 0 ...)
+    v = v.astype(np.uint64) & np.uint64(0xFFFFFFFF)
+    for shift, mask in [(16, 0x0000FFFF0000FFFF), (8, 0x00FF00FF00FF00FF), (4, 0x0F0F0F0F0F0F0F0F),
+                        (2, 0x3333333333333333), (1, 0x5555555555555555)]:
+        v = (v | (v << np.uint64(shift))) & np.uint64(mask)
+    return v
+
+
+def compact_bits(v):
+    # Inverso de spread_bits: recupera os bits das posições pares
+    v = v.astype(np.uint64) & np.uint64(0x5555555555555555)
+    for shift, mask in [(1, 0x3333333333333333), (2, 0x0F0F0F0F0F0F0F0F), (4, 0x00FF00FF00FF00FF),
+                        (8, 0x0000FFFF0000FFFF), (16, 0x00000000FFFFFFFF)]:
+        v = (v | (v >> np.uint64(shift))) & np.uint64(mask)
+    return v
+
+
+def tile_xy(lat, lon, zoom=GRID_MAX_ZOOM):
+    n = 2 ** zoom
+    lat = np.radians(np.clip(np.asarray(lat, dtype=float), -MAX_MERCATOR_LAT, MAX_MERCATOR_LAT))
+    lon = np.asarray(lon, dtype=float)
+    x = np.floor((lon + 180.0) / 360.0 * n)
+    y = np.floor((1.0 - np.log(np.tan(lat) + 1.0 / np.cos(lat)) / np.pi) / 2.0 * n)
+    return np.clip(x, 0, n - 1), np.clip(y, 0, n - 1)
+
+
+def grid_keys(lat, lon):
+    # grid_key (Int64, nulo sem coordenada) de cada par latitude/longitude
+    lat = np.asarray(lat, dtype=float)
+    lon = np.asarray(lon, dtype=float)
+    valid = ~(np.isnan(lat) | np.isnan(lon))
+    x, y = tile_xy(np.where(valid, lat, 0.0), np.where(valid, lon, 0.0))
+    keys = (spread_bits(x) | (spread_bits(y) << np.uint64(1))).astype(np.int64)
+    return pd.arrays.IntegerArray(np.where(valid, keys, 0), ~valid)
+
+
+def cell_key(keys, zoom):
+    # Tile no nível `zoom` que contém cada grid_key
+    return np.asarray(keys, dtype=np.int64) >> (2 * (GRID_MAX_ZOOM - zoom))
+
+
+def key_range(cells, zoom):
+    # Intervalo [lo, hi] de grid_key coberto por cada tile
+    shift = 2 * (GRID_MAX_ZOOM - zoom)
+    cells = np.asarray(cells, dtype=np.int64)
+    return cells << shift, ((cells + 1) << shift) - 1
+
+
+def cell_bounds(cells, zoom):
+    # (lat_min, lon_min, lat_max, lon_max) de cada tile
+    cells = np.asarray(cells, dtype=np.uint64)
+    x = compact_bits(cells).astype(float)
+    y = compact_bits(cells >> np.uint64(1)).astype(float)
+    n = 2 ** zoom
+
+    def lat_of(row):
+        return np.degrees(np.arctan(np.sinh(np.pi * (1 - 2 * row / n))))
+
+    return lat_of(y + 1), x / n * 360.0 - 180.0, lat_of(y), (x + 1) / n * 360.0 - 180.0
+
+
+def tile_width_m(lat, zoom):
+    return 2 * np.pi * EARTH_RADIUS_M * np.cos(np.radians(lat)) / 2 ** zoom
+
+
+## Agregação por célula
+
+def partial_grid_hotspots(keys, years, is_violent, zooms=GRID_ZOOMS):
+    # Contagens por (zoom, cell_key, year) de um lote; somáveis entre lotes
+    base = pd.DataFrame({'grid_key': keys, 'year': years, 'is_violent': is_violent}).dropna(subset=['grid_key', 'year'])
+    frames = []
+    for zoom in zooms:
+        cells = base.assign(zoom=zoom, cell_key=cell_key(base['grid_key'], zoom))
+        frames.append(cells.groupby(['zoom', 'cell_key', 'year']).agg(
+            total_crimes=('grid_key', 'size'),
+            violent_crimes=('is_violent', 'sum')
+        ).reset_index())
+    return pd.concat(frames, ignore_index=True)
+
+
+def merge_grid_hotspots(partials):
+    # Soma os parciais dos lotes (uma linha por zoom, célula e ano)
+    if not partials:
+        return pd.DataFrame(columns=['zoom', 'cell_key', 'year', 'total_crimes', 'violent_crimes'])
+    merged = pd.concat(partials, ignore_index=True).groupby(['zoom', 'cell_key', 'year'], as_index=False)[
+        ['total_crimes', 'violent_crimes']].sum()
+    return merged.astype({'zoom': 'int16', 'cell_key': 'int64', 'year': 'int32', 'total_crimes': 'int64', 'violent_crimes': 'int64'})
+
+
+def affected_grid_cells(keys, years, zooms=GRID_ZOOMS):
+    base = pd.DataFrame({'grid_key': keys, 'year': years}).dropna()
+    return pd.concat([
+        pd.DataFrame({'zoom': zoom, 'cell_key': cell_key(base['grid_key'], zoom), 'year': base['year'].astype(int)})
+        for zoom in zooms
+    ], ignore_index=True).drop_duplicates()
+
+
+def refresh_grid_hotspots(engine, cells):
+    # Recalcula as células afetadas a partir da fato: cada célula é um intervalo
+    # de grid_key (idx_fato_crimes_grid) dentro da partição do ano
+    if cells.empty:
+        return 0
+    lo, hi = np.empty(len(cells), dtype=np.int64), np.empty(len(cells), dtype=np.int64)
+    for zoom in cells['zoom'].unique():
+        mask = (cells['zoom'] == zoom).to_numpy()
+        lo[mask], hi[mask] = key_range(cells.loc[mask, 'cell_key'], int(zoom))
+    params = {
+        'zooms': cells['zoom'].astype(int).tolist(),
+        'cells': cells['cell_key'].astype('int64').tolist(),
+        'years': cells['year'].astype(int).tolist(),
+        'los': lo.tolist(),
+        'his': hi.tolist(),
+    }
+    groups = ("unnest(CAST(:zooms AS INTEGER[]), CAST(:cells AS BIGINT[]), CAST(:years AS INTEGER[]), "
+              "CAST(:los AS BIGINT[]), CAST(:his AS BIGINT[])) AS k(zoom, cell_key, year, lo, hi)")
+    with engine.begin() as conn:
+        conn.execute(text(f"""
+            DELETE FROM gold.agg_grid_hotspots a USING {groups}
+            WHERE a.zoom = k.zoom AND a.cell_key = k.cell_key AND a.year = k.year
+        """), params)
+        conn.execute(text(f"""
+            INSERT INTO gold.agg_grid_hotspots (zoom, cell_key, year, total_crimes, violent_crimes)
+            SELECT k.zoom, k.cell_key, k.year, COUNT(*), COALESCE(SUM(f.is_violent::int), 0)
+            FROM {groups}
+            JOIN gold.fato_crimes f ON f.grid_key BETWEEN k.lo AND k.hi AND f.year = k.year
+            GROUP BY k.zoom, k.cell_key, k.year
+        """), params)
+    return len(cells)
+
+
+## Consultas
+
+def covering_cells(lat, lon, radius_m):
+    # Tiles do maior nível cuja largura cobre o diâmetro do círculo (no máximo 2x2
+    # tiles para o retângulo envolvente) e os respectivos intervalos de grid_key
+    width = 2 * np.pi * EARTH_RADIUS_M * np.cos(np.radians(lat))
+    zoom = int(np.clip(np.floor(np.log2(width / max(2 * radius_m, 1e-3))), 0, GRID_MAX_ZOOM))
+    dlat = np.degrees(radius_m / EARTH_RADIUS_M)
+    dlon = dlat / max(np.cos(np.radians(lat)), 1e-12)
+    x0, y0 = tile_xy(lat + dlat, lon - dlon, zoom)
+    x1, y1 = tile_xy(lat - dlat, lon + dlon, zoom)
+    xs, ys = np.meshgrid(np.arange(x0, x1 + 1), np.arange(y0, y1 + 1))
+    cells = (spread_bits(xs.ravel()) | (spread_bits(ys.ravel()) << np.uint64(1))).astype(np.int64)
+    return zoom, cells
+
+
+def crimes_within(engine, lat, lon, radius_m, year=None, limit=None):
+    # Crimes da fato a até radius_m metros do ponto: filtra os intervalos de
+    # grid_key dos tiles envolventes (índice) e confere a distância exata (haversine)
+    zoom, cells = covering_cells(lat, lon, radius_m)
+    lo, hi = key_range(cells, zoom)
+    year_filter = "AND f.year = :year" if year is not None else ""
+    sql = f"""
+        SELECT f.nk_crime_id, f.sk_date, f.sk_time, f.sk_area, f.sk_crime_type, f.latitude, f.longitude,
+               f.is_violent, d.distance_m
+        FROM unnest(CAST(:los AS BIGINT[]), CAST(:his AS BIGINT[])) AS r(lo, hi)
+        JOIN gold.fato_crimes f ON f.grid_key BETWEEN r.lo AND r.hi {year_filter}
+        CROSS JOIN LATERAL (
+            SELECT 2 * :earth_radius * asin(sqrt(
+                power(sin(radians(f.latitude - :lat) / 2), 2)
+                + cos(radians(:lat)) * cos(radians(f.latitude)) * power(sin(radians(f.longitude - :lon) / 2), 2)
+            )) AS distance_m
+        ) d
+        WHERE d.distance_m <= :radius
+        ORDER BY d.distance_m
+    """
+    if limit is not None:
+        sql += f" LIMIT {int(limit)}"
+    params = {'los': lo.tolist(), 'his': hi.tolist(), 'lat': float(lat), 'lon': float(lon),
+              'radius': float(radius_m), 'earth_radius': EARTH_RADIUS_M, 'year': year}
+    with engine.connect() as conn:
+        return pd.read_sql(text(sql), conn, params=params)
+
+
+def top_hotspot_cells(engine, k=10, zoom=GRID_ZOOMS[-1], year=None):
+    # K células com mais crimes no nível `zoom` (um ano ou todos), com limites e centro
+    if year is not None:
+        # (zoom, year, total_crimes DESC) atende ORDER BY ... LIMIT direto pelo índice
+        sql = """
+            SELECT cell_key, total_crimes, violent_crimes
+            FROM gold.agg_grid_hotspots
+            WHERE zoom = :zoom AND year = :year
+            ORDER BY total_crimes DESC
+            LIMIT :k
+        """
+    else:
+        sql = """
+            SELECT cell_key, SUM(total_crimes) AS total_crimes, SUM(violent_crimes) AS violent_crimes
+            FROM gold.agg_grid_hotspots
+            WHERE zoom = :zoom
+            GROUP BY cell_key
+            ORDER BY total_crimes DESC
+            LIMIT :k
+        """
+    with engine.connect() as conn:
+        top = pd.read_sql(text(sql), conn, params={'zoom': zoom, 'year': year, 'k': k})
+    top.insert(0, 'zoom', zoom)
+    lat_min, lon_min, lat_max, lon_max = cell_bounds(top['cell_key'], zoom)
+    top['lat_min'], top['lon_min'], top['lat_max'], top['lon_max'] = lat_min, lon_min, lat_max, lon_max
+    top['center_lat'] = (lat_min + lat_max) / 2
+    top['center_lon'] = (lon_min + lon_max) / 2
+    return top
+
+
+if __name__ == '__main__':
+    import argparse
+    import os
+
+    parser = argparse.ArgumentParser(description="Consultas espaciais sobre a Gold (grade quadkey).")
+    sub = parser.add_subparsers(dest='command', required=True)
+    radius = sub.add_parser('radius', help="crimes a até N metros de um ponto")
+    radius.add_argument('lat', type=float)
+    radius.add_argument('lon', type=float)
+    radius.add_argument('meters', type=float)
+    radius.add_argument('--year', type=int)
+    radius.add_argument('--limit', type=int)
+    top = sub.add_parser('top', help="top-K células de hotspot")
+    top.add_argument('--k', type=int, default=10)
+    top.add_argument('--zoom', type=int, default=GRID_ZOOMS[-1], choices=GRID_ZOOMS)
+    top.add_argument('--year', type=int)
+    args = parser.parse_args()
+
+    from sqlalchemy import create_engine
+    engine = create_engine(
+        f"postgresql+psycopg2://{os.getenv('POSTGRES_USER', 'postgres')}:{os.getenv('POSTGRES_PASSWORD', 'postgres')}"
+        f"@{os.getenv('POSTGRES_HOST', 'localhost')}:{os.getenv('POSTGRES_PORT', '5432')}/{os.getenv('POSTGRES_DB', 'crime_data')}"
+    )
+    if args.command == 'radius':
+        result = crimes_within(engine, args.lat, args.lon, args.meters, year=args.year, limit=args.limit)
+        print(f"{len(result):,} crimes a até {args.meters:,.0f} m de ({args.lat}, {args.lon})")
+    else:
+        result = top_hotspot_cells(engine, k=args.k, zoom=args.zoom, year=args.year)
+    print(result.to_string(index=False))
@@ -0,0 +1,125 @@
+# Cache de estágios endereçado por conteúdo
+# Cada estágio nomeado dos ETLs declara as suas entradas: hash do arquivo Raw, do
+# DDL, versão do código (hash do fonte dos módulos/funções usados) e a impressão
+# digital da saída do estágio anterior. O manifesto <pipeline>.json em
+# STAGE_CACHE_DIR guarda, por estágio, o digest das entradas e a impressão digital
+# da saída produzida. Na execução seguinte o estágio é pulado quando o digest das
+# entradas é o mesmo e a saída registrada ainda confere com o banco (ex.: contagem
+# e maior valor de uma coluna da tabela gerada); caso contrário é recalculado.
+# As saídas dos estágios são as próprias tabelas no PostgreSQL (e as cópias
+# Parquet); o manifesto em disco é o que permite reconhecê-las entre execuções.
+#
+# --force ESTÁGIO[,ESTÁGIO...] (ou --force all) na linha de comando, ou a variável
+# ETL_FORCE, recalcula os estágios indicados. ETL_STAGE_CACHE=false desliga o cache.
+
+import argparse
+import hashlib
+import inspect
+import json
+import os
+import re
+from datetime import datetime
+from pathlib import Path
+
+from sqlalchemy import text
+
+STAGE_CACHE_ENABLED = os.getenv("ETL_STAGE_CACHE", "true").lower() == "true"
+STAGE_CACHE_DIR = os.getenv("ETL_STAGE_CACHE_DIR", "")  # vazio: <projeto>/Data Layer/.stage_cache
+
+DDL_TABLE = re.compile(r'CREATE\s+TABLE\s+IF\s+NOT\s+EXISTS\s+([\w.]+)', re.IGNORECASE)
+
+
+## Digests das entradas
+
+def digest(value):
+    return hashlib.sha256(json.dumps(value, sort_keys=True, default=str).encode('utf-8')).hexdigest()
+
+
+def source_digest(*objects):
+    # Versão do código: fonte dos módulos/funções que determinam a saída do estágio
+    sha = hashlib.sha256()
+    for obj in objects:
+        sha.update(inspect.getsource(obj).encode('utf-8'))
+    return sha.hexdigest()
+
+
+def table_fingerprint(engine, table, column):
+    # Impressão digital barata da saída gravada: [linhas, maior valor de column]
+    # (None quando a tabela não existe)
+    with engine.connect() as conn:
+        if conn.execute(text("SELECT to_regclass(:table)"), {'table': table}).scalar() is None:
+            return None
+        count, last = conn.execute(text(f"SELECT COUNT(*), MAX({column}) FROM {table}")).one()
+    return [int(count), None if last is None else str(last)]
+
+
+def ddl_tables_exist(engine, ddl_path):
+    # Todas as tabelas declaradas no DDL existem no banco
+    tables = DDL_TABLE.findall(Path(ddl_path).read_text(encoding='utf-8'))
+    with engine.connect() as conn:
+        return all(conn.execute(text("SELECT to_regclass(:table)"), {'table': t}).scalar() is not None for t in tables)
+
+
+## Estágios forçados
+
+def parse_force(argv=None):
+    # --force aceito na linha de comando (argumentos desconhecidos, como os do
+    # kernel do Jupyter, são ignorados) e em ETL_FORCE
+    parser = argparse.ArgumentParser(add_help=False)
+    parser.add_argument('--force', action='append', default=[])
+    args, _ = parser.parse_known_args(argv)
+    names = args.force + [os.getenv("ETL_FORCE", "")]
+    return {name.strip() for value in names for name in value.split(',') if name.strip()}
+
+
+## Manifesto
+
+class StageCache:
+    def __init__(self, pipeline, directory, force=(), enabled=STAGE_CACHE_ENABLED):
+        self.path = Path(directory) / f"{pipeline}.json"
+        self.force = set(force)
+        self.enabled = enabled
+        self.manifest = json.loads(self.path.read_text(encoding='utf-8')) if self.path.exists() else {}
+        self.checked = {}  # estágio → entradas verificadas nesta execução
+        self.skipped = []
+
+    def forced(self, stage):
+        return stage in self.force or 'all' in self.force
+
+    def is_fresh(self, stage, inputs, valid=None):
+        # True quando o estágio pode ser pulado: mesmas entradas da última execução
+        # registrada e valid(saída registrada) confirma que a saída ainda está lá
+        self.checked[stage] = inputs
+        if not self.enabled or self.forced(stage):
+            return False
+        entry = self.manifest.get(stage)
+        if entry is None or entry['inputs_digest'] != digest(inputs):
+            return False
+        if valid is not None and not valid(entry.get('output')):
+            return False
+        self.skipped.append(stage)
+        return True
+
+    def record(self, stage, output=None):
+        # Chamado depois que o estágio terminou com sucesso
+        inputs = self.checked[stage]
+        self.manifest[stage] = {
+            'inputs_digest': digest(inputs),
+            'inputs': inputs,
+            'output': output,
+            'recorded_at': datetime.now().isoformat(),
+        }
+        self.write()
+
+    def invalidate(self, stage):
+        # Antes de alterar a saída: uma execução interrompida não deixa registro válido
+        if self.manifest.pop(stage, None) is not None:
+            self.write()
+
+    def write(self):
+        if not self.enabled:
+            return
+        os.makedirs(self.path.parent, exist_ok=True)
+        tmp = self.path.with_suffix(f".{os.getpid()}.tmp")
+        tmp.write_text(json.dumps(self.manifest, indent=2, default=str), encoding='utf-8')
+        os.replace(tmp, self.path)
@@ -0,0 +1,202 @@
+# Resolução vetorizada das surrogate keys da fato
+# Cada dimensão vira uma lookup de inteiros: chave natural → sk. As linhas da
+# Silver são convertidas em códigos inteiros sem montar strings nem dicts
+# Python por linha:
+# - chaves inteiras (hour, area_code, crime_code) e datas (date_occurred, como
+#   int64 do datetime64, na unidade da Silver) são usadas diretamente;
+# - a chave composta da vítima (faixa etária, sexo, descendência) vira um único
+#   código: cada atributo é convertido para o índice no vocabulário da dimensão
+#   (via categorias/pd.factorize, ou seja, uma vez por valor distinto) e os três
+#   índices são combinados em um código (como np.ravel_multi_index).
+# Faixas de códigos pequenas usam uma tabela densa (acesso direto por índice);
+# as demais, busca binária (np.searchsorted) no array ordenado de chaves.
+#
+# Mesma semântica do mapeamento por dict anterior: chave duplicada na dimensão
+# fica com a última sk; linha sem correspondência (ou com componente nulo) fica
+# NaN e é contada em unmatched, por dimensão.
+# As lookups ficam em cache no KeyResolver e só são reconstruídas quando a
+# dimensão muda (as dimensões só crescem: novos membros são acrescentados ao fim).
+
+import numpy as np
+import pandas as pd
+
+# Maior faixa (max - min) de códigos resolvida por tabela densa
+DENSE_LOOKUP_LIMIT = 1 << 20
+
+VICTIM_ATTRIBUTES = [
+    ('victim_age_group', 'age_group'),
+    ('victim_sex_desc', 'sex'),
+    ('victim_descent_desc', 'descent'),
+]
+
+
+class IntLookup:
+    # codes: chaves naturais já como int64 (sem nulos); sks: surrogate keys
+    def __init__(self, codes, sks):
+        codes = np.asarray(codes, dtype='int64')
+        sks = np.asarray(sks, dtype='int64')
+        # Última ocorrência de cada chave (como dict(zip(...)))
+        last = len(codes) - 1 - np.unique(codes[::-1], return_index=True)[1]
+        codes, sks = codes[last], sks[last]
+        self.size = len(codes)
+        self.dense = None
+        if self.size and codes[-1] - codes[0] <= DENSE_LOOKUP_LIMIT:
+            self.offset = int(codes[0])
+            self.dense = np.full(int(codes[-1]) - self.offset + 1, -1, dtype='int64')
+            self.dense[codes - self.offset] = sks
+        else:
+            self.codes, self.sks = codes, sks
+
+    def resolve(self, values, valid):
+        # values: int64 por linha; valid: False para nulos. Devolve sk ou -1
+        result = np.full(len(values), -1, dtype='int64')
+        if not self.size:
+            return result
+        if self.dense is not None:
+            idx = values - self.offset
+            hit = valid & (idx >= 0) & (idx < len(self.dense))
+            result[hit] = self.dense[idx[hit]]
+        else:
+            pos = np.searchsorted(self.codes, values).clip(max=self.size - 1)
+            hit = valid & (self.codes[pos] == values)
+            result[hit] = self.sks[pos[hit]]
+        return result
+
+
+def integer_codes(values):
+    # Inteiros (ou float vindo de coluna com nulos) → (int64, válido)
+    values = pd.Series(values)
+    if isinstance(values.dtype, pd.CategoricalDtype):
+        values = values.astype(values.cat.categories.dtype)
+    if values.dtype.kind in 'iu':
+        return values.to_numpy('int64'), np.ones(len(values), dtype=bool)
+    numbers = values.to_numpy('float64', na_value=np.nan)
+    valid = ~np.isnan(numbers)
+    return np.where(valid, numbers, 0).astype('int64'), valid
+
+
+def datetime_codes(values, unit='ns'):
+    # Datas → int64 na unidade do datetime64 (NaT fica inválido)
+    values = pd.to_datetime(pd.Series(values)).to_numpy()
+    if np.datetime_data(values.dtype)[0] != unit:
+        values = values.astype(f'datetime64[{unit}]')
+    return values.view('int64'), ~np.isnat(values)
+
+
+def datetime_unit(values):
+    # Unidade do datetime64 da Silver (us do read_sql, ns do Parquet...)
+    dtype = pd.Series(values).dtype
+    return np.datetime_data(dtype)[0] if dtype.kind == 'M' else 'ns'
+
+
+def vocabulary_codes(values, vocabulary, invalid):
+    # Índice de cada valor no vocabulário da dimensão (invalid: nulo ou ausente),
+    # calculado uma vez por valor distinto
+    values = pd.Series(values)
+    if isinstance(values.dtype, pd.CategoricalDtype):
+        codes, uniques = values.cat.codes.to_numpy(), values.cat.categories
+    else:
+        codes, uniques = pd.factorize(values)
+    mapping = vocabulary.get_indexer(uniques)
+    # Posição extra ao fim: código -1 (nulo) cai nela
+    mapping = np.append(np.where(mapping < 0, invalid, mapping), invalid)
+    return mapping[codes]
+
+
+class VictimLookup:
+    # Código combinado = ravel_multi_index dos três índices. Atributo inválido vale
+    # -tamanho do espaço de códigos, o que torna o código combinado negativo
+    def __init__(self, dim_victim):
+        self.vocabularies = [pd.Index(dim_victim[col].dropna().unique()) for _, col in VICTIM_ATTRIBUTES]
+        self.shape = [max(len(v), 1) for v in self.vocabularies]
+        self.invalid = -int(np.prod(self.shape))
+        codes = self.combined(dim_victim, [col for _, col in VICTIM_ATTRIBUTES])
+        valid = codes >= 0
+        self.lookup = IntLookup(codes[valid], dim_victim['sk_victim'].to_numpy()[valid])
+
+    def combined(self, df, columns):
+        codes = None
+        for col, vocab, size in zip(columns, self.vocabularies, self.shape):
+            part = vocabulary_codes(df[col], vocab, self.invalid)
+            codes = part.astype('int64') if codes is None else codes * size + part
+        return codes
+
+    def resolve(self, df_silver):
+        codes = self.combined(df_silver, [col for col, _ in VICTIM_ATTRIBUTES])
+        return self.lookup.resolve(codes, codes >= 0)
+
+
+class DateLookup:
+    # Chaves da dimensão convertidas para a unidade do datetime64 da Silver
+    # (uma lookup por unidade, sem converter as linhas da Silver)
+    def __init__(self, dim_date):
+        self.dates, self.sks = dim_date['full_date'], dim_date['sk_date'].to_numpy()
+        self.by_unit = {}
+
+    def resolve(self, values):
+        unit = datetime_unit(values)
+        if unit not in self.by_unit:
+            codes, valid = datetime_codes(self.dates, unit)
+            self.by_unit[unit] = IntLookup(codes[valid], self.sks[valid])
+        return self.by_unit[unit].resolve(*datetime_codes(values, unit))
+
+
+def column_lookup(dim, key_col, sk_col, codes_of):
+    codes, valid = codes_of(dim[key_col])
+    return IntLookup(codes[valid], dim[sk_col].to_numpy()[valid])
+
+
+# Dimensão → (coluna da Silver, coluna chave da dimensão, coluna sk, conversão para códigos)
+KEY_COLUMNS = {
+    'dim_time': ('hour', 'hour', 'sk_time', integer_codes),
+    'dim_area': ('area_code', 'area_code', 'sk_area', integer_codes),
+    'dim_crime_type': ('crime_code', 'crime_code', 'sk_crime_type', integer_codes),
+}
+FACT_KEYS = {'dim_date': 'sk_date', 'dim_time': 'sk_time', 'dim_area': 'sk_area',
+             'dim_crime_type': 'sk_crime_type', 'dim_victim': 'sk_victim'}
+
+
+def dimension_fingerprint(dim, sk_col):
+    # As dimensões só recebem membros novos no fim: tamanho e última sk bastam
+    return len(dim), int(dim[sk_col].iloc[-1]) if len(dim) else None
+
+
+class KeyResolver:
+    def __init__(self):
+        self.lookups = {}  # dimensão → (fingerprint, lookup)
+        self.unmatched = {table: 0 for table in FACT_KEYS}
+        self.builds = 0
+
+    def lookup(self, table, dim):
+        fingerprint = dimension_fingerprint(dim, FACT_KEYS[table])
+        cached = self.lookups.get(table)
+        if cached is None or cached[0] != fingerprint:
+            if table == 'dim_victim':
+                built = VictimLookup(dim)
+            elif table == 'dim_date':
+                built = DateLookup(dim)
+            else:
+                _, key_col, sk_col, codes_of = KEY_COLUMNS[table]
+                built = column_lookup(dim, key_col, sk_col, codes_of)
+            cached = self.lookups[table] = (fingerprint, built)
+            self.builds += 1
+        return cached[1]
+
+    def resolve(self, df_silver, dims):
+        # dims: {dimensão: DataFrame}. Devolve {sk_*: array} (int64, ou float64 com
+        # NaN quando há linhas sem correspondência)
+        keys = {}
+        for table, sk_col in FACT_KEYS.items():
+            lookup = self.lookup(table, dims[table])
+            if table == 'dim_victim':
+                sks = lookup.resolve(df_silver)
+            elif table == 'dim_date':
+                sks = lookup.resolve(df_silver['date_occurred'])
+            else:
+                silver_col, _, _, codes_of = KEY_COLUMNS[table]
+                sks = lookup.resolve(*codes_of(df_silver[silver_col]))
+            missing = sks < 0
+            count = int(missing.sum())
+            self.unmatched[table] += count
+            keys[sk_col] = np.where(missing, np.nan, sks) if count else sks
+        return keys
@@ -0,0 +1,337 @@
+# Gerador de dados Raw sintéticos
+# Produz CSVs no schema exato do dataset "Crime Data from 2020 to Present" (LAPD)
+# esperado pelo ETL Raw → Silver, com cardinalidades e assimetrias realistas:
+# 21 áreas com pesos distintos, ~140 códigos de crime e ~300 locais com cauda
+# longa (Zipf), ~65% dos registros sem arma, datas 2020-2024 com sazonalidade
+# semanal e atraso de registro, horários concentrados em 12:00 e horas cheias.
+#
+# Uso: python synthetic_raw.py --rows 1000000 --output data_raw.csv [--seed 42]
+
+import argparse
+import time
+from pathlib import Path
+
+import numpy as np
+import pandas as pd
+
+RAW_COLUMNS = [
+    'DR_NO', 'Date Rptd', 'DATE OCC', 'TIME OCC', 'AREA', 'AREA NAME', 'Rpt Dist No', 'Part 1-2',
+    'Crm Cd', 'Crm Cd Desc', 'Mocodes', 'Vict Age', 'Vict Sex', 'Vict Descent', 'Premis Cd', 'Premis Desc',
+    'Weapon Used Cd', 'Weapon Desc', 'Status', 'Status Desc', 'Crm Cd 1', 'Crm Cd 2', 'Crm Cd 3', 'Crm Cd 4',
+    'LOCATION', 'Cross Street', 'LAT', 'LON'
+]
+
+# (código, nome, peso relativo, latitude, longitude)
+AREAS = [
+    (1, 'Central', 6.9, 34.0440, -118.2470), (2, 'Rampart', 4.7, 34.0670, -118.2790),
+    (3, 'Southwest', 5.6, 34.0180, -118.3120), (4, 'Hollenbeck', 3.7, 34.0450, -118.2050),
+    (5, 'Harbor', 4.1, 33.7810, -118.2700), (6, 'Hollywood', 5.3, 34.0980, -118.3300),
+    (7, 'Wilshire', 4.9, 34.0620, -118.3470), (8, 'West LA', 4.6, 34.0460, -118.4450),
+    (9, 'Van Nuys', 4.4, 34.1860, -118.4490), (10, 'West Valley', 4.2, 34.1950, -118.5360),
+    (11, 'Northeast', 4.4, 34.1170, -118.2450), (12, '77th Street', 6.8, 33.9700, -118.2900),
+    (13, 'Newton', 4.8, 34.0120, -118.2560), (14, 'Pacific', 5.7, 33.9900, -118.4400),
+    (15, 'N Hollywood', 5.1, 34.1720, -118.3800), (16, 'Foothill', 3.3, 34.2530, -118.3900),
+    (17, 'Devonshire', 4.1, 34.2570, -118.5300), (18, 'Southeast', 5.0, 33.9380, -118.2750),
+    (19, 'Mission', 4.0, 34.2720, -118.4470), (20, 'Olympic', 5.0, 34.0500, -118.2950),
+    (21, 'Topanga', 4.3, 34.2010, -118.6000),
+]
+
+# (código, descrição, Part 1-2, peso relativo, probabilidade de arma)
+CRIMES = [
+    (510, 'VEHICLE - STOLEN', 1, 11.0, 0.01),
+    (624, 'BATTERY - SIMPLE ASSAULT', 2, 7.6, 0.95),
+    (330, 'BURGLARY FROM VEHICLE', 1, 6.1, 0.02),
+    (354, 'THEFT OF IDENTITY', 2, 6.0, 0.00),
+    (740, 'VANDALISM - FELONY ($400 & OVER, ALL CHURCH VANDALISMS)', 2, 6.0, 0.05),
+    (310, 'BURGLARY', 1, 5.9, 0.03),
+    (230, 'ASSAULT WITH DEADLY WEAPON, AGGRAVATED ASSAULT', 1, 5.5, 1.00),
+    (440, 'THEFT PLAIN - PETTY ($950 & UNDER)', 1, 5.0, 0.01),
+    (626, 'INTIMATE PARTNER - SIMPLE ASSAULT', 2, 4.6, 0.97),
+    (420, 'THEFT FROM MOTOR VEHICLE - PETTY ($950 & UNDER)', 1, 3.8, 0.01),
+    (745, 'VANDALISM - MISDEAMEANOR ($399 OR UNDER)', 2, 3.0, 0.04),
+    (331, 'THEFT FROM MOTOR VEHICLE - GRAND ($950.01 AND OVER)', 1, 2.9, 0.01),
+    (341, 'THEFT-GRAND ($950.01 & OVER)EXCPT,GUNS,FOWL,LIVESTK,PROD', 1, 2.7, 0.01),
+    (930, 'CRIMINAL THREATS - NO WEAPON DISPLAYED', 2, 2.6, 0.90),
+    (210, 'ROBBERY', 1, 2.6, 0.98),
+    (442, 'SHOPLIFTING - PETTY THEFT ($950 & UNDER)', 1, 2.3, 0.02),
+    (901, 'VIOLATION OF RESTRAINING ORDER', 2, 1.6, 0.30),
+    (888, 'TRESPASSING', 2, 1.4, 0.05),
+    (236, 'INTIMATE PARTNER - AGGRAVATED ASSAULT', 1, 1.3, 1.00),
+    (350, 'THEFT, PERSON', 1, 1.0, 0.05),
+    (480, 'BICYCLE - STOLEN', 1, 0.9, 0.00),
+    (662, 'BUNCO, GRAND THEFT', 2, 0.8, 0.00),
+    (900, 'VIOLATION OF COURT ORDER', 2, 0.8, 0.10),
+    (946, 'OTHER MISCELLANEOUS CRIME', 2, 0.8, 0.20),
+    (761, 'BRANDISH WEAPON', 2, 0.8, 1.00),
+    (220, 'ATTEMPTED ROBBERY', 1, 0.6, 0.98),
+    (649, 'DOCUMENT FORGERY / STOLEN FELONY', 2, 0.5, 0.00),
+    (956, 'LETTERS, LEWD  -  TELEPHONE CALLS, LEWD', 2, 0.5, 0.10),
+    (668, 'EMBEZZLEMENT, GRAND THEFT ($950.01 & OVER)', 2, 0.5, 0.00),
+    (664, 'BUNCO, PETTY THEFT', 2, 0.3, 0.00),
+    (110, 'CRIMINAL HOMICIDE', 1, 0.2, 1.00),
+    (121, 'RAPE, FORCIBLE', 1, 0.3, 0.90),
+    (122, 'RAPE, ATTEMPTED', 1, 0.05, 0.90),
+    (235, 'CHILD ABUSE (PHYSICAL) - AGGRAVATED ASSAULT', 1, 0.1, 1.00),
+    (627, 'CHILD ABUSE (PHYSICAL) - SIMPLE ASSAULT', 2, 0.3, 0.95),
+    (910, 'KIDNAPPING', 2, 0.1, 0.80),
+    (343, 'SHOPLIFTING-GRAND THEFT ($950.01 & OVER)', 1, 0.3, 0.02),
+    (352, 'PICKPOCKET', 1, 0.1, 0.00),
+    (410, 'BURGLARY FROM VEHICLE, ATTEMPTED', 1, 0.2, 0.02),
+    (520, 'VEHICLE - ATTEMPT STOLEN', 1, 0.2, 0.01),
+    (886, 'DISTURBING THE PEACE', 2, 0.3, 0.30),
+    (434, 'FALSE IMPRISONMENT', 2, 0.1, 0.80),
+    (928, 'THREATENING PHONE CALLS/LETTERS', 2, 0.2, 0.50),
+    (940, 'EXTORTION', 2, 0.05, 0.50),
+]
+CRIME_TAIL = 95  # códigos raros adicionais (cauda longa)
+
+# (código, descrição, peso relativo)
+PREMISES = [
+    (101, 'STREET', 25.0), (501, 'SINGLE FAMILY DWELLING', 16.8),
+    (502, 'MULTI-UNIT DWELLING (APARTMENT, DUPLEX, ETC)', 12.1), (108, 'PARKING LOT', 6.9),
+    (203, 'OTHER BUSINESS', 4.6), (102, 'SIDEWALK', 4.2), (122, 'VEHICLE, PASSENGER/TRUCK', 2.9),
+    (707, 'GARAGE/CARPORT', 1.9), (210, 'RESTAURANT/FAST FOOD', 1.6), (503, 'HOTEL', 1.2),
+    (404, 'DEPARTMENT STORE', 1.2), (124, 'PARKING UNDERGROUND/BUILDING', 1.1),
+    (120, 'STORAGE SHED', 0.4), (405, 'CLOTHING STORE', 0.7), (402, 'MARKET', 0.8),
+    (801, 'LIQUOR STORE', 0.6), (504, 'OTHER RESIDENCE', 0.8), (119, 'PORCH, RESIDENTIAL', 0.6),
+    (506, 'CONDOMINIUM/TOWNHOUSE', 0.5), (104, 'DRIVEWAY', 1.0), (103, 'ALLEY', 0.8),
+    (109, 'PARK/PLAYGROUND', 0.7), (118, 'YARD (RESIDENTIAL/BUSINESS)', 0.6),
+    (401, 'MINI-MART', 0.3), (406, 'OTHER STORE', 0.6), (711, 'BEACH', 0.2),
+    (221, 'PUBLIC STORAGE', 0.2), (301, 'GAS STATION', 0.5), (410, 'BANK', 0.3),
+    (726, 'POLICE FACILITY', 0.2), (417, 'OFFICE BUILDING/OFFICE', 0.6),
+]
+PREMISE_TAIL = 270
+
+# (código, descrição, peso relativo entre os registros com arma)
+WEAPONS = [
+    (400, 'STRONG-ARM (HANDS, FIST, FEET OR BODILY FORCE)', 55.0),
+    (500, 'UNKNOWN WEAPON/OTHER WEAPON', 9.0), (511, 'VERBAL THREAT', 7.5),
+    (102, 'HAND GUN', 5.4), (200, 'KNIFE WITH BLADE 6INCHES OR LESS', 1.7),
+    (109, 'SEMI-AUTOMATIC PISTOL', 1.7), (307, 'VEHICLE', 1.4), (106, 'UNKNOWN FIREARM', 1.6),
+    (308, 'STICK', 0.6), (207, 'OTHER KNIFE', 1.6), (312, 'PIPE/METAL PIPE', 0.5),
+    (512, 'MACE/PEPPER SPRAY', 0.6), (201, 'KNIFE WITH BLADE OVER 6 INCHES IN LENGTH', 0.7),
+    (302, 'BLUNT INSTRUMENT', 0.5), (301, 'AIR PISTOL/REVOLVER/RIFLE/BB GUN', 0.3),
+    (304, 'CLUB/BAT', 0.4), (113, 'SIMULATED GUN', 0.3), (101, 'REVOLVER', 0.3),
+    (205, 'KITCHEN KNIFE', 0.4), (309, 'SCREWDRIVER', 0.2), (306, 'ROCK/THROWN OBJECT', 0.5),
+    (104, 'SHOTGUN', 0.1), (114, 'SAWED OFF RIFLE/SHOTGUN', 0.05), (115, 'ASSAULT WEAPON/UZI/AK47/ETC', 0.05),
+    (212, 'BOTTLE', 0.3), (218, 'OTHER CUTTING INSTRUMENT', 0.3), (223, 'UNKNOWN TYPE CUTTING INSTRUMENT', 0.1),
+    (506, 'FIRE', 0.1), (515, 'PHYSICAL PRESENCE', 0.3), (516, 'DOG/ANIMAL (SIC ANIMAL ON PERSON)', 0.1),
+]
+
+STATUSES = [('IC', 'Invest Cont', 80.0), ('AO', 'Adult Other', 10.9), ('AA', 'Adult Arrest', 8.6),
+            ('JA', 'Juv Arrest', 0.3), ('JO', 'Juv Other', 0.2), ('CC', 'UNK', 0.01)]
+VICT_SEX = [('M', 40.0), ('F', 36.0), ('X', 10.5), ('H', 0.01)]
+VICT_DESCENT = [('H', 30.0), ('W', 20.4), ('B', 13.7), ('X', 10.7), ('O', 7.9), ('A', 2.2), ('K', 0.6),
+                ('F', 0.4), ('C', 0.4), ('J', 0.2), ('V', 0.1), ('I', 0.1), ('Z', 0.05), ('P', 0.03),
+                ('U', 0.02), ('D', 0.01), ('G', 0.01), ('L', 0.01), ('S', 0.01), ('-', 0.001)]
+STREETS = ['MAIN', 'BROADWAY', 'FIGUEROA', 'VERMONT', 'WESTERN', 'SUNSET', 'HOLLYWOOD', 'WILSHIRE',
+           'PICO', 'OLYMPIC', 'VENICE', 'SLAUSON', 'FLORENCE', 'MANCHESTER', 'CENTURY', 'SEPULVEDA',
+           'VAN NUYS', 'RESEDA', 'ROSCOE', 'SHERMAN', 'VICTORY', 'CRENSHAW', 'LA BREA', 'ALVARADO',
+           '1ST', '3RD', '5TH', '7TH', '6TH', '8TH', '9TH', 'SAN PEDRO', 'CESAR E CHAVEZ', 'SOTO']
+SUFFIXES = ['ST', 'AV', 'BL', 'DR', 'WY', 'PL']
+
+DATE_START = pd.Timestamp('2020-01-01')
+DATE_END = pd.Timestamp('2024-12-31')
+DATE_FORMAT = '%m/%d/%Y %I:%M:%S %p'
+MO_CODES = np.array([f"{c:04d}" for c in range(100, 2200)], dtype=object)
+
+
+def catalog_with_tail(entries, tail, code_start, label):
+    # Completa o catálogo com `tail` códigos raros (pesos Zipf) para reproduzir a
+    # cardinalidade real sem listar todos os valores
+    codes = [e[0] for e in entries]
+    descs = [e[1] for e in entries]
+    weights = [e[-1] if len(e) == 3 else e[3] for e in entries]
+    used = set(codes)
+    code = code_start
+    for i in range(tail):
+        while code in used:
+            code += 1
+        used.add(code)
+        codes.append(code)
+        descs.append(f"{label} {code}")
+        weights.append(0.2 / (i + 1) ** 0.8)
+    weights = np.asarray(weights, dtype=float)
+    return np.asarray(codes), np.asarray(descs, dtype=object), weights / weights.sum()
+
+
+def normalized(weights):
+    weights = np.asarray(weights, dtype=float)
+    return weights / weights.sum()
+
+
+def build_catalogs():
+    crime_codes, crime_descs, crime_p = catalog_with_tail(CRIMES, CRIME_TAIL, 100, 'OTHER OFFENSE')
+    crime_part = np.array([c[2] for c in CRIMES] + [2] * CRIME_TAIL)
+    crime_weapon_p = np.array([c[4] for c in CRIMES] + [0.2] * CRIME_TAIL)
+    premise_codes, premise_descs, premise_p = catalog_with_tail(PREMISES, PREMISE_TAIL, 100, 'OTHER PREMISE')
+    return {
+        'crime': (crime_codes, crime_descs, crime_p, crime_part, crime_weapon_p),
+        'premise': (premise_codes, premise_descs, premise_p),
+    }
+
+
+def daily_weights():
+    # Leve tendência de alta e sazonalidade semanal (sexta/sábado mais movimentados);
+    # o dia 1º de cada mês concentra registros com data aproximada, como no dataset real
+    days = pd.date_range(DATE_START, DATE_END, freq='D')
+    weekday = np.array([0.96, 0.97, 0.98, 0.99, 1.08, 1.06, 0.96])[days.dayofweek]
+    trend = np.linspace(0.9, 1.1, len(days))
+    first_of_month = np.where(days.day == 1, 1.6, 1.0)
+    return days, normalized(weekday * trend * first_of_month)
+
+
+def generate_chunk(n, rng, catalogs, days, day_labels, day_p, dr_counters):
+    crime_codes, crime_descs, crime_p, crime_part, crime_weapon_p = catalogs['crime']
+    premise_codes, premise_descs, premise_p = catalogs['premise']
+
+    area_idx = rng.choice(len(AREAS), n, p=normalized([a[2] for a in AREAS]))
+    area_codes = np.array([a[0] for a in AREAS])[area_idx]
+    crime_idx = rng.choice(len(crime_codes), n, p=crime_p)
+    premise_idx = rng.choice(len(premise_codes), n, p=premise_p)
+
+    # Datas: ocorrência + atraso de registro (metade no mesmo dia, cauda exponencial)
+    # (trabalha com índices de dia; o texto de cada data é formatado uma única vez)
+    occ = rng.choice(len(days), n, p=day_p)
+    lag = np.where(rng.random(n) < 0.5, 0, np.minimum(rng.exponential(12, n), 1500)).astype(int)
+    rptd = np.minimum(occ + lag, len(days) - 1)
+
+    # Horário: picos em 12:00 e 00:01 e minutos arredondados
+    hour = rng.choice(24, n, p=normalized([3, 2, 1.5, 1.2, 1, 1, 1.5, 2.5, 3.5, 4, 4.2, 4.4,
+                                           6, 4.6, 4.7, 4.9, 5.2, 5.5, 5.8, 5.4, 5, 4.7, 4.3, 3.6]))
+    minute = np.where(rng.random(n) < 0.55, rng.choice([0, 15, 30, 45], n), rng.integers(0, 60, n))
+    time_occ = hour * 100 + minute
+    special = rng.random(n)
+    time_occ = np.where(special < 0.05, 1200, np.where(special < 0.065, 1, time_occ))
+
+    # Arma depende do tipo de crime
+    has_weapon = rng.random(n) < crime_weapon_p[crime_idx]
+    weapon_idx = rng.choice(len(WEAPONS), n, p=normalized([w[2] for w in WEAPONS]))
+    weapon_codes = np.where(has_weapon, np.array([w[0] for w in WEAPONS])[weapon_idx], np.nan)
+    weapon_descs = np.where(has_weapon, np.array([w[1] for w in WEAPONS], dtype=object)[weapon_idx], None)
+
+    # Vítima: ~25% sem pessoa física (idade 0, sexo X/nulo), idades com leve assimetria
+    no_person = rng.random(n) < 0.25
+    age = np.clip(rng.gamma(7.5, 5.2, n), 2, 99).astype(int)
+    age = np.where(no_person, 0, age)
+    age = np.where(rng.random(n) < 0.0005, rng.choice([-1, -2], n), age)
+    sex = rng.choice([s[0] for s in VICT_SEX], n, p=normalized([s[1] for s in VICT_SEX])).astype(object)
+    sex = np.where(no_person, np.where(rng.random(n) < 0.4, 'X', None), sex)
+    descent = rng.choice([d[0] for d in VICT_DESCENT], n, p=normalized([d[1] for d in VICT_DESCENT])).astype(object)
+    descent = np.where(no_person, np.where(rng.random(n) < 0.4, 'X', None), descent)
+
+    status_idx = rng.choice(len(STATUSES), n, p=normalized([s[2] for s in STATUSES]))
+
+    # Localização: centróide da área + ruído; ~0,2% com coordenadas (0, 0)
+    lat = np.array([a[3] for a in AREAS])[area_idx] + rng.normal(0, 0.025, n)
+    lon = np.array([a[4] for a in AREAS])[area_idx] + rng.normal(0, 0.03, n)
+    zero = rng.random(n) < 0.002
+    lat, lon = np.where(zero, 0.0, lat.round(4)), np.where(zero, 0.0, lon.round(4))
+
+    street = rng.choice(STREETS, n).astype(object)
+    suffix = rng.choice(SUFFIXES, n).astype(object)
+    block = (rng.zipf(1.6, n) % 200) * 100
+    location = pd.Series(block).astype(str) + ' ' + pd.Series(street) + ' ' + pd.Series(suffix)
+    location = location.str.pad(40, side='right').to_numpy(dtype=object)
+    cross = np.where(rng.random(n) < 0.15, pd.Series(rng.choice(STREETS, n)) + ' ' + pd.Series(rng.choice(SUFFIXES, n)), None)
+
+    # Mocodes: 1 a 5 códigos de 4 dígitos separados por espaço
+    mo_count = rng.integers(1, 6, n)
+    mocodes = pd.Series(MO_CODES[rng.integers(0, len(MO_CODES), n)])
+    for k in range(1, 5):
+        extra = pd.Series(MO_CODES[rng.integers(0, len(MO_CODES), n)])
+        mocodes = mocodes.where(mo_count <= k, mocodes + ' ' + extra)
+    mocodes = np.where(rng.random(n) < 0.14, None, mocodes.to_numpy(dtype=object))
+
+    # DR_NO: AA (ano do registro) + área + sequencial por (ano, área)
+    yy = days.year.to_numpy()[rptd] % 100
+    dr_no = np.empty(n, dtype=np.int64)
+    keys = yy * 100 + area_codes
+    order = np.argsort(keys, kind='stable')
+    sorted_keys = keys[order]
+    starts = np.r_[0, np.flatnonzero(np.diff(sorted_keys)) + 1]
+    for start, end in zip(starts, np.r_[starts[1:], n]):
+        key = sorted_keys[start]
+        base = dr_counters.get(key, 0)
+        seq = base + np.arange(1, end - start + 1)
+        dr_counters[key] = base + (end - start)
+        # Sequência de 5 dígitos; acima disso o número cresce (evita colisões em volumes grandes)
+        dr_no[order[start:end]] = np.where(seq < 100000, (key * 100000) + seq, key * 10**7 + seq)
+
+    crime_cd = crime_codes[crime_idx]
+    crm2 = np.where(rng.random(n) < 0.07, rng.choice(crime_codes, n), np.nan)
+    crm3 = np.where(rng.random(n) < 0.002, rng.choice(crime_codes, n), np.nan)
+
+    return pd.DataFrame({
+        'DR_NO': dr_no,
+        'Date Rptd': day_labels[rptd],
+        'DATE OCC': day_labels[occ],
+        'TIME OCC': time_occ,
+        'AREA': area_codes,
+        'AREA NAME': np.array([a[1] for a in AREAS], dtype=object)[area_idx],
+        'Rpt Dist No': area_codes * 100 + rng.integers(1, 100, n),
+        'Part 1-2': crime_part[crime_idx],
+        'Crm Cd': crime_cd,
+        'Crm Cd Desc': crime_descs[crime_idx],
+        'Mocodes': mocodes,
+        'Vict Age': age,
+        'Vict Sex': sex,
+        'Vict Descent': descent,
+        'Premis Cd': premise_codes[premise_idx].astype(float),
+        'Premis Desc': premise_descs[premise_idx],
+        'Weapon Used Cd': weapon_codes,
+        'Weapon Desc': weapon_descs,
+        'Status': np.array([s[0] for s in STATUSES], dtype=object)[status_idx],
+        'Status Desc': np.array([s[1] for s in STATUSES], dtype=object)[status_idx],
+        'Crm Cd 1': crime_cd.astype(float),
+        'Crm Cd 2': crm2,
+        'Crm Cd 3': crm3,
+        'Crm Cd 4': np.nan,
+        'LOCATION': location,
+        'Cross Street': cross,
+        'LAT': lat,
+        'LON': lon,
+    }, columns=RAW_COLUMNS)
+
+
+def generate_raw_csv(path, rows, seed=42, chunk_size=500_000, duplicate_rate=0.0005, verbose=True):
+    # Gera o CSV em blocos (memória limitada ao bloco); determinístico por seed.
+    # duplicate_rate: fração de linhas repetidas (exercita a deduplicação por DR_NO)
+    path = Path(path)
+    path.parent.mkdir(parents=True, exist_ok=True)
+    tmp = path.with_name(path.name + '.tmp')
+    catalogs = build_catalogs()
+    days, day_p = daily_weights()
+    day_labels = np.asarray(days.strftime(DATE_FORMAT), dtype=object)
+    dr_counters = {}
+    start = time.perf_counter()
+
+    written = 0
+    for i, offset in enumerate(range(0, rows, chunk_size)):
+        n = min(chunk_size, rows - offset)
+        rng = np.random.default_rng([seed, i])
+        chunk = generate_chunk(n, rng, catalogs, days, day_labels, day_p, dr_counters)
+        dups = rng.random(n) < duplicate_rate
+        if dups.any():
+            chunk.iloc[np.flatnonzero(dups)] = chunk.iloc[rng.integers(0, n, dups.sum())].to_numpy()
+        chunk.to_csv(tmp, mode='w' if i == 0 else 'a', header=(i == 0), index=False)
+        written += n
+        if verbose:
+            print(f"   {written:,}/{rows:,} linhas ({time.perf_counter() - start:.1f}s)")
+
+    tmp.replace(path)
+    return path
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description="Gera um CSV Raw sintético no schema LAPD.")
+    parser.add_argument('--rows', type=int, default=100_000)
+    parser.add_argument('--output', default='data_raw.csv')
+    parser.add_argument('--seed', type=int, default=42)
+    parser.add_argument('--chunk-size', type=int, default=500_000)
+    parser.add_argument('--duplicate-rate', type=float, default=0.0005)
+    args = parser.parse_args()
+
+    print(f"Gerando {args.rows:,} linhas em {args.output}...")
+    generate_raw_csv(args.output, args.rows, seed=args.seed, chunk_size=args.chunk_size, duplicate_rate=args.duplicate_rate)
+    print("Concluído")
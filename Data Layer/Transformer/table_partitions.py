@@ -0,0 +1,170 @@
+# Particionamento por ano de ocorrência
+# silver.crimes e gold.fato_crimes são declaradas nos DDLs com PARTITION BY RANGE (year):
+# uma partição por ano (<tabela>_<ano>), criada sob demanda antes de cada gravação,
+# e uma partição DEFAULT. Cargas de substituição esvaziam apenas as partições dos
+# anos que recebem dados na execução; os demais anos não são tocados.
+# Tabelas criadas antes do particionamento (heap comum) são migradas uma vez:
+# renomeadas para <tabela>_legacy antes do DDL e copiadas para a versão particionada depois.
+
+import pandas as pd
+from sqlalchemy import text
+
+
+def split_table(table):
+    schema, name = table.split('.')
+    return schema, name
+
+
+def relkind(conn, table):
+    # 'r' = tabela comum, 'p' = particionada, None = inexistente
+    schema, name = split_table(table)
+    return conn.execute(text("""
+        SELECT c.relkind FROM pg_class c JOIN pg_namespace n ON n.oid = c.relnamespace
+        WHERE n.nspname = :schema AND c.relname = :name
+    """), {'schema': schema, 'name': name}).scalar()
+
+
+def partition_name(table, year):
+    return f"{table}_{int(year)}"
+
+
+def distinct_years(values):
+    return {int(y) for y in pd.unique(pd.Series(values).dropna())}
+
+
+def child_partitions(conn, table):
+    # Nomes das partições (<tabela>_<ano> e <tabela>_default)
+    schema, name = split_table(table)
+    return set(conn.execute(text("""
+        SELECT c.relname FROM pg_inherits i
+        JOIN pg_class c ON c.oid = i.inhrelid
+        JOIN pg_class p ON p.oid = i.inhparent
+        JOIN pg_namespace n ON n.oid = p.relnamespace
+        WHERE n.nspname = :schema AND p.relname = :name
+    """), {'schema': schema, 'name': name}).scalars())
+
+
+def year_partitions(conn, table):
+    # Anos que já têm partição própria (pelo nome <tabela>_<ano>)
+    _, name = split_table(table)
+    suffixes = (child[len(name) + 1:] for child in child_partitions(conn, table))
+    return {int(s) for s in suffixes if s.isdigit()}
+
+
+def ensure_year_partitions(conn, table, years, unlogged=False):
+    # unlogged: partições de uma tabela em montagem (publicação por troca de schema)
+    persistence = "UNLOGGED " if unlogged else ""
+    for year in sorted(years):
+        conn.exec_driver_sql(
+            f"CREATE {persistence}TABLE IF NOT EXISTS {partition_name(table, year)} PARTITION OF {table} "
+            f"FOR VALUES FROM ({year}) TO ({year + 1})"
+        )
+
+
+class PartitionedLoad:
+    # Partições tocadas por uma carga: prepare(anos) cria as que faltam e, com
+    # replace=True, esvazia cada partição na primeira vez que a execução a toca
+    # (chunks seguintes do mesmo ano apenas acrescentam linhas).
+    # key: com replace=True, as chaves recebidas (prepare(anos, chaves)) são removidas
+    # das partições que a execução não esvaziou. A chave primária inclui o ano, então
+    # um registro cujo ano mudou (ou vindo de um extrato que não recarrega o seu ano
+    # anterior) ficaria duplicado; as partições esvaziadas só têm linhas desta carga.
+    # truncated: ano → True; um Manager().dict() compartilha o estado entre processos
+    # (silver_parallel.py), com prepare serializado por um lock.
+    # Chamado na thread principal, antes de submeter a gravação ao pool.
+    def __init__(self, engine, table, replace=False, unlogged=False, key=None, truncated=None):
+        self.engine = engine
+        self.table = table
+        self.replace = replace
+        self.unlogged = unlogged
+        self.key = key
+        self.known = None
+        self.truncated = {} if truncated is None else truncated
+
+    def prepare(self, years, keys=None):
+        years = distinct_years(years)
+        with self.engine.begin() as conn:
+            if self.known is None:
+                self.known = year_partitions(conn, self.table)
+            ensure_year_partitions(conn, self.table, years - self.known, self.unlogged)
+            self.known |= years
+            if self.replace:
+                for year in sorted(years):
+                    if year not in self.truncated:
+                        conn.exec_driver_sql(f"TRUNCATE {partition_name(self.table, year)}")
+                        self.truncated[year] = True
+                if self.key is not None and keys is not None:
+                    self.discard_keys(conn, keys)
+        return years
+
+    def discard_keys(self, conn, keys):
+        keys = [int(k) for k in pd.unique(pd.Series(keys).dropna())]
+        if not keys:
+            return
+        replaced = {partition_name(self.table, year).split('.')[1] for year in list(self.truncated.keys())}
+        schema, _ = split_table(self.table)
+        for partition in sorted(child_partitions(conn, self.table) - replaced):
+            conn.execute(text(f"DELETE FROM {schema}.{partition} WHERE {self.key} = ANY(CAST(:keys AS BIGINT[]))"),
+                         {'keys': keys})
+
+
+def prepare_source_partitions(engine, table, source_sql, unlogged=False):
+    # Cria as partições dos anos devolvidos por source_sql (ex.: build push-down)
+    with engine.begin() as conn:
+        years = distinct_years(conn.execute(text(source_sql)).scalars().all())
+        ensure_year_partitions(conn, table, years - year_partitions(conn, table), unlogged)
+    return years
+
+
+## Migração de tabelas não particionadas
+
+def detach_legacy_table(engine, table):
+    # Antes do DDL: uma tabela comum com o nome da particionada é renomeada para
+    # <tabela>_legacy e perde índices e chaves (os nomes passam a ser do DDL)
+    schema, name = split_table(table)
+    legacy = f"{name}_legacy"
+    with engine.begin() as conn:
+        if relkind(conn, table) != 'r':
+            return None
+        if relkind(conn, f"{schema}.{legacy}") is not None:
+            raise RuntimeError(f"{schema}.{legacy} já existe: conclua ou remova a migração anterior de {table}")
+        conn.exec_driver_sql(f"ALTER TABLE {table} RENAME TO {legacy}")
+        constraints = conn.execute(text("""
+            SELECT conname FROM pg_constraint
+            WHERE conrelid = CAST(:legacy AS regclass) AND contype IN ('p', 'u')
+        """), {'legacy': f"{schema}.{legacy}"}).scalars().all()
+        for constraint in constraints:
+            conn.exec_driver_sql(f'ALTER TABLE {schema}.{legacy} DROP CONSTRAINT "{constraint}"')
+        indexes = conn.execute(text(
+            "SELECT indexname FROM pg_indexes WHERE schemaname = :schema AND tablename = :legacy"
+        ), {'schema': schema, 'legacy': legacy}).scalars().all()
+        for index in indexes:
+            conn.exec_driver_sql(f'DROP INDEX {schema}."{index}"')
+    return f"{schema}.{legacy}"
+
+
+def migrate_legacy_rows(engine, table, year_sql='l.year'):
+    # Depois do DDL: copia as linhas de <tabela>_legacy (alias l) para a tabela
+    # particionada, com o ano dado por year_sql, e remove a tabela antiga
+    schema, name = split_table(table)
+    legacy = f"{schema}.{name}_legacy"
+    with engine.begin() as conn:
+        if relkind(conn, legacy) is None:
+            return 0
+        target = conn.execute(text(
+            "SELECT column_name FROM information_schema.columns WHERE table_schema = :schema AND table_name = :name"
+        ), {'schema': schema, 'name': name}).scalars().all()
+        source = set(conn.execute(text(
+            "SELECT column_name FROM information_schema.columns WHERE table_schema = :schema AND table_name = :name"
+        ), {'schema': schema, 'name': f"{name}_legacy"}).scalars().all())
+        columns = [c for c in target if c in source and c != 'year']
+        years = distinct_years(conn.execute(text(f"SELECT DISTINCT {year_sql} FROM {legacy} l")).scalars().all())
+        ensure_year_partitions(conn, table, years - year_partitions(conn, table))
+        insert_columns = ', '.join(f'"{c}"' for c in columns)
+        select_columns = ', '.join(f'l."{c}"' for c in columns)
+        rows = conn.execute(text(
+            f"INSERT INTO {table} ({insert_columns}, year) SELECT {select_columns}, {year_sql} FROM {legacy} l"
+        )).rowcount
+        conn.exec_driver_sql(f"DROP TABLE {legacy}")
+    print(f"   {table}: {rows:,} registros migrados para a tabela particionada por ano")
+    return rows
@@ -0,0 +1,22 @@
+# Os módulos do Transformer importam uns aos outros pelo nome (scripts na mesma
+# pasta): os testes rodam com essa pasta no sys.path
+# Uso: python -m pytest "Data Layer/Transformer/tests"
+
+import sys
+from pathlib import Path
+
+import pytest
+
+TRANSFORMER_DIR = Path(__file__).resolve().parents[1]
+if str(TRANSFORMER_DIR) not in sys.path:
+    sys.path.insert(0, str(TRANSFORMER_DIR))
+
+SYNTHETIC_ROWS = 20_000
+
+
+@pytest.fixture(scope='session')
+def synthetic_raw_path(tmp_path_factory):
+    # CSV Raw sintético (schema LAPD) compartilhado pelos testes da sessão
+    from synthetic_raw import generate_raw_csv
+    return generate_raw_csv(tmp_path_factory.mktemp('raw') / 'data_raw.csv', SYNTHETIC_ROWS,
+                            seed=7, duplicate_rate=0.01, verbose=False)
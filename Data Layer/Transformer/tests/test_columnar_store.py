@@ -0,0 +1,44 @@
+# Gravação de Parquet em lotes (ParquetAppender): colunas esparsas e falhas no meio
+
+import numpy as np
+import pandas as pd
+import pytest
+
+pa = pytest.importorskip('pyarrow')
+pq = pytest.importorskip('pyarrow.parquet')
+
+from columnar_store import ParquetAppender, arrow_type
+
+SCHEMA = pa.schema([('crime_id', pa.int64()), ('weapon_description', pa.large_string()), ('sk_victim', pa.int64())])
+
+
+def test_sparse_column_in_first_batch(tmp_path):
+    # weapon_description só com nulos no 1º lote: com o schema explícito o tipo não vira null
+    path = tmp_path / 'fato.parquet'
+    appender = ParquetAppender(path, SCHEMA)
+    appender.write(pd.DataFrame({'crime_id': [1, 2], 'weapon_description': [None, None], 'sk_victim': [np.nan, np.nan]}))
+    appender.write(pd.DataFrame({'crime_id': [3, 4], 'weapon_description': ['KNIFE', None], 'sk_victim': [7.0, np.nan]}))
+    assert appender.close() == 4
+
+    table = pq.read_table(path)
+    assert table.schema == SCHEMA
+    assert table.column('weapon_description').to_pylist() == [None, None, 'KNIFE', None]
+    assert table.column('sk_victim').to_pylist() == [None, None, 7, None]
+    assert not path.with_name(path.name + '.tmp').exists()
+
+
+def test_abort_discards_partial_file(tmp_path):
+    path = tmp_path / 'silver.parquet'
+    path.write_bytes(b'anterior')
+    appender = ParquetAppender(path, SCHEMA)
+    appender.write(pd.DataFrame({'crime_id': [1], 'weapon_description': ['KNIFE'], 'sk_victim': [1]}))
+    appender.abort()
+    assert not path.with_name(path.name + '.tmp').exists()
+    assert path.read_bytes() == b'anterior'
+
+
+def test_arrow_type_of_postgres_columns():
+    # BIGINT, INTEGER, NUMERIC, VARCHAR, TIMESTAMP, BOOLEAN
+    assert [arrow_type(oid) for oid in (20, 23, 1700, 1043, 1114, 16)] == [
+        pa.int64(), pa.int32(), pa.float64(), pa.large_string(), pa.timestamp('us'), pa.bool_()]
+    assert arrow_type(3802) is None  # jsonb: sem equivalente, schema inferido do lote
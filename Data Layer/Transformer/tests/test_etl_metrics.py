@@ -0,0 +1,30 @@
+# Pico do tracemalloc por estágio com estágios aninhados (etl_metrics.StageRecorder)
+
+import tracemalloc
+
+import pytest
+
+from etl_metrics import StageRecorder
+
+
+@pytest.fixture
+def tracing():
+    started = not tracemalloc.is_tracing()
+    if started:
+        tracemalloc.start()
+    yield
+    if started:
+        tracemalloc.stop()
+
+
+def test_nested_stage_keeps_enclosing_peak(tracing):
+    recorder = StageRecorder()
+    with recorder.stage('chunk'):
+        block = bytearray(40 * 1024**2)
+        del block
+        with recorder.stage('clean_1_duplicates'):
+            block = bytearray(1024**2)
+            del block
+    peaks = {s['name']: s['tracemalloc_peak_mb'] for s in recorder.stage_dicts()}
+    # O reset do estágio interno não apaga o pico de 40 MB do chunk
+    assert peaks['chunk'] >= peaks['clean_1_duplicates'] + 35
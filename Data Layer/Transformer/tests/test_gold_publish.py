@@ -0,0 +1,61 @@
+# Publicação por troca de schema (gold_publish.SchemaSwap): tabelas do pandas
+# criadas UNLOGGED no staging e privilégios de gold repetidos antes da troca.
+# Requer ETL_TEST_DATABASE_URL (banco descartável, ver test_gold_pushdown.py).
+
+import os
+
+import pandas as pd
+import pytest
+from sqlalchemy import create_engine, text
+
+from gold_publish import SchemaSwap
+
+DATABASE_URL = os.getenv("ETL_TEST_DATABASE_URL")
+STAGING = 'gold_staging_test'
+
+pytestmark = pytest.mark.skipif(not DATABASE_URL, reason="ETL_TEST_DATABASE_URL não configurada")
+
+
+@pytest.fixture
+def swap(tmp_path):
+    engine = create_engine(DATABASE_URL)
+    with engine.begin() as conn:
+        conn.exec_driver_sql("CREATE SCHEMA IF NOT EXISTS gold")
+        conn.exec_driver_sql("DROP TABLE IF EXISTS gold.publish_probe")
+        conn.exec_driver_sql("CREATE TABLE gold.publish_probe (id INTEGER)")
+        conn.exec_driver_sql(f"DROP SCHEMA IF EXISTS {STAGING} CASCADE")
+        conn.exec_driver_sql(f"CREATE SCHEMA {STAGING}")
+    yield SchemaSwap(engine, tmp_path / 'ddl.sql', staging=STAGING)
+    with engine.begin() as conn:
+        conn.exec_driver_sql(f"DROP SCHEMA IF EXISTS {STAGING} CASCADE")
+        conn.exec_driver_sql("DROP TABLE IF EXISTS gold.publish_probe")
+        conn.exec_driver_sql("REVOKE USAGE ON SCHEMA gold FROM PUBLIC")
+    engine.dispose()
+
+
+def persistence(engine, table):
+    with engine.connect() as conn:
+        return conn.execute(text("SELECT relpersistence FROM pg_class WHERE oid = to_regclass(:t)"), {'t': table}).scalar()
+
+
+def test_pandas_table_created_unlogged(swap):
+    df = pd.DataFrame({'sk_area': [1, 2], 'area_name': ['Central', 'Newton'], 'region': ['Central', None]})
+    assert swap.create_table(df, 'dim_area')
+    assert not swap.create_table(df, 'dim_area')  # já criada: a gravação apenas acrescenta
+    assert persistence(swap.engine, f'{STAGING}.dim_area') == 'u'
+
+    df.to_sql('dim_area', swap.engine, schema=STAGING, if_exists='append', index=False)
+    assert swap.create_table(df.head(1), 'dim_area', replace=True)  # if_exists='replace'
+    with swap.engine.connect() as conn:
+        assert conn.execute(text(f"SELECT COUNT(*) FROM {STAGING}.dim_area")).scalar() == 0
+
+
+def test_privileges_copied_to_staging(swap):
+    with swap.engine.begin() as conn:
+        conn.exec_driver_sql("GRANT USAGE ON SCHEMA gold TO PUBLIC")
+        conn.exec_driver_sql("GRANT SELECT ON gold.publish_probe TO PUBLIC")
+        conn.exec_driver_sql(f"CREATE TABLE {STAGING}.publish_probe (id INTEGER)")
+        assert swap.copy_privileges(conn) == 2
+        assert conn.execute(text("SELECT has_schema_privilege('public', :s, 'USAGE')"), {'s': STAGING}).scalar()
+        assert conn.execute(text("SELECT has_table_privilege('public', :t, 'SELECT')"),
+                            {'t': f'{STAGING}.publish_probe'}).scalar()
@@ -0,0 +1,40 @@
+# Validação da Silver por chunk x sobre os contadores somados (silver_quality.py)
+
+import numpy as np
+import pandas as pd
+
+from silver_quality import REQUIRED_COLUMNS, QualityStats, collect_stats, evaluate
+
+
+def silver_chunk(start, rows, null_dates=0):
+    df = pd.DataFrame({col: np.ones(rows, dtype='int64') for col in REQUIRED_COLUMNS})
+    df['crime_id'] = np.arange(start, start + rows)
+    df['date_occurred'] = pd.Series(pd.to_datetime(['2023-01-01'] * rows))
+    df['date_reported'] = df['date_occurred']
+    df.loc[:null_dates - 1, 'date_occurred'] = pd.NaT
+    df['hour'] = 12
+    df['latitude'], df['longitude'] = 34.0, -118.3
+    df['crime_severity'] = 'Serious'
+    return df
+
+
+def test_rate_limits_apply_to_merged_stats_only():
+    # 30% de date_occurred nulo em um chunk; 0,6% na Silver inteira (limite 1%)
+    clustered = collect_stats(silver_chunk(0, 1_000, null_dates=300))
+    assert evaluate(clustered, chunk=True)['passed']
+    assert not evaluate(clustered)['passed']
+
+    merged = QualityStats()
+    for stats in [clustered] + [collect_stats(silver_chunk(10_000 * i, 10_000)) for i in range(1, 6)]:
+        merged.merge(stats)
+    report = evaluate(merged)
+    assert report['passed'] and not report['warnings'], report
+    assert {c['check'] for c in report['checks']} >= {'not_empty', 'nulls_date_occurred', 'la_bounds', 'crime_id_unique'}
+
+
+def test_chunk_checks_still_fail_fast():
+    df = silver_chunk(0, 100)
+    df.loc[0, 'hour'] = 25
+    report = evaluate(collect_stats(df.drop(columns=['area_name'])), chunk=True)
+    assert not report['passed']
+    assert {c['check'] for c in report['checks'] if not c['passed']} == {'required_columns', 'hour_range'}
@@ -0,0 +1,174 @@
+# Paridade do motor de classificação vetorizado (classify_*) e de build_silver com
+# as regras originais aplicadas linha a linha (Series.apply(get_*))
+
+from datetime import datetime
+
+import numpy as np
+import pandas as pd
+import pytest
+
+from silver_transform import (
+    read_raw, iter_raw_chunks, clean_raw_data, build_silver, SeenIds,
+    classify_unique, classify_period, classify_age_group,
+    get_period, get_crime_category, get_premise_category, get_weapon_category, get_age_group,
+    sex_map, descent_map,
+)
+
+COLLECTED_AT = datetime(2024, 1, 1, 12, 0, 0)
+
+
+def baseline_build_silver(df_clean, collected_at):
+    # build_silver antes da vetorização: datas com pd.to_datetime e regras via .apply
+    date_temp = pd.to_datetime(df_clean['DATE OCC'], format='%m/%d/%Y %I:%M:%S %p', errors='coerce')
+    date_reported_temp = pd.to_datetime(df_clean['Date Rptd'], format='%m/%d/%Y %I:%M:%S %p', errors='coerce')
+    valid = date_temp.notna() & date_reported_temp.notna()
+    df_clean = df_clean[valid]
+    date_temp = date_temp[valid]
+    date_reported = date_reported_temp[valid]
+    time_occ = pd.to_numeric(df_clean['TIME OCC'], errors='coerce').fillna(0).astype(int)
+
+    silver = pd.DataFrame()
+    silver['crime_id'] = df_clean['DR_NO'].values
+    silver['date_reported'] = date_reported.values
+    silver['date_occurred'] = date_temp.values
+    silver['time_occurred'] = time_occ.values
+    silver['hour'] = (time_occ // 100).astype(int).values
+    silver['day_of_week'] = date_temp.dt.dayofweek.values
+    silver['day_name'] = date_temp.dt.day_name().values
+    silver['period_of_day'] = silver['hour'].apply(get_period)
+    silver['area_code'] = df_clean['AREA'].values
+    silver['area_name'] = df_clean['AREA NAME'].values
+    silver['district_code'] = df_clean['Rpt Dist No'].values
+    silver['crime_severity'] = df_clean['Part 1-2'].map({1: 'Serious', 2: 'Minor'}).values
+    silver['crime_code'] = df_clean['Crm Cd'].values
+    silver['crime_description'] = df_clean['Crm Cd Desc'].values
+    silver['crime_category'] = df_clean['Crm Cd Desc'].apply(get_crime_category).values
+    silver['victim_age'] = df_clean['Vict Age'].values
+    silver['victim_age_group'] = df_clean['Vict Age'].apply(get_age_group).values
+    silver['victim_sex'] = df_clean['Vict Sex'].astype(object).fillna('X').values
+    silver['victim_sex_desc'] = df_clean['Vict Sex'].astype(object).map(sex_map).fillna('Unknown').values
+    silver['victim_descent'] = df_clean['Vict Descent'].astype(object).fillna('X').values
+    silver['victim_descent_desc'] = df_clean['Vict Descent'].astype(object).map(descent_map).fillna('Unknown').values
+    silver['premise_code'] = df_clean['Premis Cd'].values
+    silver['premise_description'] = df_clean['Premis Desc'].values
+    silver['premise_category'] = df_clean['Premis Desc'].apply(get_premise_category).values
+    silver['weapon_code'] = df_clean['Weapon Used Cd'].values
+    silver['weapon_description'] = df_clean['Weapon Desc'].values
+    silver['weapon_category'] = df_clean['Weapon Desc'].apply(get_weapon_category).values
+    silver['is_violent'] = (silver['crime_category'] == 'Violent Crime')
+    silver['has_weapon'] = (silver['weapon_category'] != 'No Weapon')
+    silver['status_code'] = df_clean['Status'].values
+    silver['status_description'] = df_clean['Status Desc'].values
+    silver['case_closed'] = df_clean['Status'].isin(['AA', 'JA']).values
+    silver['latitude'] = df_clean['LAT'].values
+    silver['longitude'] = df_clean['LON'].values
+    silver['location'] = df_clean['LOCATION'].str.strip().values
+    silver['year'] = date_temp.dt.year.values
+    silver['month'] = date_temp.dt.month.values
+    silver['quarter'] = date_temp.dt.quarter.values
+    silver['collected_at'] = collected_at
+    return silver
+
+
+def as_values(series):
+    # Mesmos valores independentemente do dtype (category, inteiros compactos, unidade do datetime)
+    if isinstance(series.dtype, pd.CategoricalDtype) or series.dtype == object or pd.api.types.is_string_dtype(series):
+        return series.astype(object).where(series.notna(), None).reset_index(drop=True)
+    if pd.api.types.is_datetime64_any_dtype(series):
+        return series.astype('datetime64[ns]').reset_index(drop=True)
+    if pd.api.types.is_bool_dtype(series):
+        return series.astype(bool).reset_index(drop=True)
+    return series.astype('float64').reset_index(drop=True)
+
+
+def assert_same_labels(expected, actual):
+    expected = np.asarray(expected, dtype=object)
+    actual = np.asarray(actual, dtype=object)
+    assert actual.shape == expected.shape
+    mismatches = np.flatnonzero(expected != actual)
+    assert mismatches.size == 0, f"{mismatches.size} divergências, ex.: {expected[mismatches[:5]]} != {actual[mismatches[:5]]}"
+
+
+@pytest.fixture(scope='module')
+def df_clean(synthetic_raw_path):
+    return clean_raw_data(read_raw(synthetic_raw_path), verbose=False)
+
+
+## Classificadores sobre a saída do gerador sintético
+
+@pytest.mark.parametrize('column, rule', [
+    ('Crm Cd Desc', get_crime_category),
+    ('Premis Desc', get_premise_category),
+    ('Weapon Desc', get_weapon_category),
+])
+def test_classify_unique_matches_apply(df_clean, column, rule):
+    values = df_clean[column]
+    assert isinstance(values.dtype, pd.CategoricalDtype)
+    assert_same_labels(values.apply(rule), classify_unique(values, rule))
+    assert_same_labels(values.astype(object).apply(rule), classify_unique(values.astype(object), rule))
+
+
+def test_classify_age_group_matches_apply(df_clean):
+    ages = df_clean['Vict Age']
+    assert_same_labels(ages.apply(get_age_group), classify_age_group(ages))
+
+
+def test_classify_period_matches_apply(df_clean):
+    hours = pd.to_numeric(df_clean['TIME OCC'], errors='coerce').fillna(0).astype(int) // 100
+    assert_same_labels(hours.apply(get_period), classify_period(hours))
+
+
+## Casos de borda
+
+@pytest.mark.parametrize('rule', [get_crime_category, get_premise_category, get_weapon_category])
+def test_classify_unique_edge_descriptions(rule):
+    values = ['ROBBERY', np.nan, None, '', 'nan', 'HAND GUN', 'street', 'KNIFE', 'ROBBERY', np.nan]
+    for series in [pd.Series(values, dtype=object), pd.Series(values, dtype='category'),
+                   pd.Series(values, dtype='string')]:
+        assert_same_labels(series.apply(rule), classify_unique(series, rule))
+
+
+@pytest.mark.parametrize('ages', [
+    pd.Series([0, 1, 17, 18, 25, 26, 35, 36, 50, 51, 65, 66, 120, -1, -5], dtype='int16'),
+    pd.Series([0.5, 17.9, 18.0, 25.99, -0.5, -1.5, 65.5, 66.0, np.nan]),
+    pd.Series([np.inf, -np.inf, np.nan, 30.0]),
+    pd.Series([30, None, 40], dtype='Int64'),
+    pd.Series(['30', 'abc', '', None, '17', '-3', '4.5'], dtype=object),
+    pd.Series([True, False]),
+])
+def test_classify_age_group_edge_inputs(ages):
+    assert_same_labels(ages.apply(get_age_group), classify_age_group(ages))
+
+
+def test_classify_period_edge_hours():
+    hours = pd.Series([0, 4, 5, 11, 12, 16, 17, 20, 21, 23])
+    assert_same_labels(hours.apply(get_period), classify_period(hours))
+    assert list(classify_period(pd.Series([0, 23]))) == ['Night', 'Night']
+
+
+## build_silver x build_silver original
+
+def test_build_silver_matches_baseline(df_clean):
+    expected = baseline_build_silver(df_clean, COLLECTED_AT)
+    actual = build_silver(df_clean, collected_at=COLLECTED_AT, verbose=False)
+    assert len(actual) == len(expected)
+    for col in expected.columns:
+        pd.testing.assert_series_equal(as_values(actual[col]), as_values(expected[col]), check_names=False, obj=col)
+
+
+## Deduplicação entre chunks (modo streaming)
+
+def test_seen_ids_membership_and_merge():
+    seen = SeenIds([30, 10, 10])
+    assert list(seen.contains([5, 10, 20, 30, 40])) == [False, True, False, True, False]
+    seen.add(np.array([20, 40, 10, 20]))
+    assert seen.ids.tolist() == [10, 20, 30, 40] and seen.ids.dtype == np.int64
+    assert not SeenIds().contains([1]).any()
+
+
+def test_chunked_clean_matches_whole_file(synthetic_raw_path):
+    whole = clean_raw_data(read_raw(synthetic_raw_path), verbose=False)
+    seen = SeenIds()
+    chunks = [clean_raw_data(chunk, seen_ids=seen, verbose=False) for chunk in iter_raw_chunks(synthetic_raw_path, 3_000)]
+    chunked = pd.concat(chunks)
+    assert chunked['DR_NO'].tolist() == whole['DR_NO'].tolist()
@@ -0,0 +1,333 @@
+-- ============================================
+-- Build Gold em SQL (push-down)
+-- Crime Data Analytics
+-- ============================================
+-- Recria dimensões, fato e agregações diretamente a partir de silver.crimes com
+-- INSERT ... SELECT, sem trafegar os dados pelo Python. Produz as mesmas linhas
+-- do build em pandas (etl_silver_to_gold.py): as surrogate keys seguem a ordem
+-- da primeira ocorrência de cada membro por crime_id.
+-- A fato é a tabela particionada por ano do ddl.sql: apenas esvaziada (as
+-- partições dos anos da Silver são criadas pelo ETL antes deste script).
+
+TRUNCATE gold.fato_crimes;
+DROP TABLE IF EXISTS gold.dim_date CASCADE;
+DROP TABLE IF EXISTS gold.dim_time CASCADE;
+DROP TABLE IF EXISTS gold.dim_area CASCADE;
+DROP TABLE IF EXISTS gold.dim_crime_type CASCADE;
+DROP TABLE IF EXISTS gold.dim_victim CASCADE;
+DROP TABLE IF EXISTS gold.agg_area_month CASCADE;
+DROP TABLE IF EXISTS gold.agg_crime_year CASCADE;
+
+-- ============================================
+-- DIMENSÕES
+-- ============================================
+
+-- DIMENSÃO: Data
+CREATE TABLE gold.dim_date (
+    sk_date BIGINT,
+    full_date TIMESTAMP,
+    year INTEGER,
+    quarter INTEGER,
+    month INTEGER,
+    month_name TEXT,
+    week_of_year INTEGER,
+    day_of_month INTEGER,
+    day_of_week INTEGER,
+    day_name TEXT,
+    is_weekend BOOLEAN
+);
+
+INSERT INTO gold.dim_date
+SELECT
+    ROW_NUMBER() OVER (ORDER BY first_crime_id) AS sk_date,
+    full_date,
+    EXTRACT(YEAR FROM full_date)::int,
+    EXTRACT(QUARTER FROM full_date)::int,
+    EXTRACT(MONTH FROM full_date)::int,
+    to_char(full_date, 'FMMonth'),
+    EXTRACT(WEEK FROM full_date)::int,
+    EXTRACT(DAY FROM full_date)::int,
+    EXTRACT(ISODOW FROM full_date)::int - 1,
+    to_char(full_date, 'FMDay'),
+    EXTRACT(ISODOW FROM full_date) IN (6, 7)
+FROM (
+    SELECT date_occurred AS full_date, MIN(crime_id) AS first_crime_id
+    FROM silver.crimes
+    WHERE date_occurred IS NOT NULL
+    GROUP BY date_occurred
+) d;
+
+-- DIMENSÃO: Tempo
+CREATE TABLE gold.dim_time (
+    hour BIGINT,
+    sk_time BIGINT,
+    period_of_day TEXT,
+    is_rush_hour BOOLEAN
+);
+
+INSERT INTO gold.dim_time
+SELECT
+    h,
+    h + 1,
+    CASE WHEN h < 6 THEN 'Madrugada' WHEN h < 12 THEN 'Manhã' WHEN h < 18 THEN 'Tarde' ELSE 'Noite' END,
+    h IN (7, 8, 9, 17, 18, 19)
+FROM generate_series(0, 23) AS h;
+
+-- DIMENSÃO: Área
+CREATE TABLE gold.dim_area (
+    area_code BIGINT,
+    area_name TEXT,
+    sk_area BIGINT,
+    region TEXT
+);
+
+INSERT INTO gold.dim_area
+SELECT
+    area_code,
+    area_name,
+    ROW_NUMBER() OVER (ORDER BY first_crime_id),
+    CASE
+        WHEN area_name IN ('DEVONSHIRE', 'FOOTHILL', 'MISSION', 'NORTH HOLLYWOOD', 'VAN NUYS', 'WEST VALLEY') THEN 'North'
+        WHEN area_name IN ('77TH STREET', 'HARBOR', 'SOUTHEAST', 'SOUTHWEST') THEN 'South'
+        WHEN area_name IN ('CENTRAL', 'HOLLENBECK', 'RAMPART') THEN 'Central'
+        WHEN area_name IN ('HOLLYWOOD', 'OLYMPIC', 'PACIFIC', 'WEST LA', 'WILSHIRE') THEN 'West'
+        ELSE 'Other'
+    END
+FROM (
+    SELECT area_code, area_name, MIN(crime_id) AS first_crime_id
+    FROM silver.crimes
+    GROUP BY area_code, area_name
+) a;
+
+-- DIMENSÃO: Tipo de Crime
+CREATE TABLE gold.dim_crime_type (
+    crime_code BIGINT,
+    crime_description TEXT,
+    crime_category TEXT,
+    crime_severity TEXT,
+    sk_crime_type BIGINT,
+    is_violent BOOLEAN,
+    severity_level BIGINT
+);
+
+INSERT INTO gold.dim_crime_type
+SELECT
+    crime_code,
+    crime_description,
+    crime_category,
+    crime_severity,
+    ROW_NUMBER() OVER (ORDER BY first_crime_id),
+    crime_category = 'Violent Crime',
+    CASE crime_severity WHEN 'Serious' THEN 3 WHEN 'Minor' THEN 1 END
+FROM (
+    SELECT crime_code, crime_description, crime_category, crime_severity, MIN(crime_id) AS first_crime_id
+    FROM silver.crimes
+    GROUP BY crime_code, crime_description, crime_category, crime_severity
+) ct;
+
+-- DIMENSÃO: Vítima
+CREATE TABLE gold.dim_victim (
+    age_group TEXT,
+    sex TEXT,
+    descent TEXT,
+    sk_victim BIGINT
+);
+
+INSERT INTO gold.dim_victim
+SELECT
+    victim_age_group,
+    victim_sex_desc,
+    victim_descent_desc,
+    ROW_NUMBER() OVER (ORDER BY first_crime_id)
+FROM (
+    SELECT victim_age_group, victim_sex_desc, victim_descent_desc, MIN(crime_id) AS first_crime_id
+    FROM silver.crimes
+    GROUP BY victim_age_group, victim_sex_desc, victim_descent_desc
+) v;
+
+-- ============================================
+-- FATO: Crimes
+-- ============================================
+-- Área e tipo de crime são mapeados pelo código (como no dicionário do pandas,
+-- vale o último membro quando um código aparece com mais de uma descrição)
+INSERT INTO gold.fato_crimes (
+    sk_crime, nk_crime_id, sk_date, sk_time, sk_area, sk_crime_type, sk_victim,
+    latitude, longitude, grid_key, is_violent, has_weapon, case_closed, year
+)
+SELECT
+    ROW_NUMBER() OVER (ORDER BY c.crime_id),
+    c.crime_id,
+    dd.sk_date,
+    dt.sk_time,
+    da.sk_area,
+    dct.sk_crime_type,
+    dv.sk_victim,
+    c.latitude::double precision,
+    c.longitude::double precision,
+    c.grid_key,
+    c.is_violent,
+    c.has_weapon,
+    c.case_closed,
+    c.year
+FROM silver.crimes c
+LEFT JOIN gold.dim_date dd ON dd.full_date = c.date_occurred
+LEFT JOIN gold.dim_time dt ON dt.hour = c.hour
+LEFT JOIN (
+    SELECT DISTINCT ON (area_code) area_code, sk_area
+    FROM gold.dim_area
+    ORDER BY area_code, sk_area DESC
+) da ON da.area_code = c.area_code
+LEFT JOIN (
+    SELECT DISTINCT ON (crime_code) crime_code, sk_crime_type
+    FROM gold.dim_crime_type
+    ORDER BY crime_code, sk_crime_type DESC
+) dct ON dct.crime_code = c.crime_code
+LEFT JOIN gold.dim_victim dv
+    ON dv.age_group = c.victim_age_group
+   AND dv.sex = c.victim_sex_desc
+   AND dv.descent = c.victim_descent_desc;
+
+-- ============================================
+-- AGREGAÇÕES
+-- ============================================
+
+-- Agregação: Crimes por Área e Mês
+CREATE TABLE gold.agg_area_month (
+    area_name TEXT,
+    year BIGINT,
+    month BIGINT,
+    total_crimes BIGINT,
+    violent_crimes BIGINT,
+    crimes_with_weapon BIGINT,
+    cases_closed BIGINT
+);
+
+INSERT INTO gold.agg_area_month
+SELECT
+    area_name,
+    year,
+    month,
+    COUNT(crime_id),
+    COALESCE(SUM(is_violent::int), 0),
+    COALESCE(SUM(has_weapon::int), 0),
+    COALESCE(SUM(case_closed::int), 0)
+FROM silver.crimes
+WHERE area_name IS NOT NULL AND year IS NOT NULL AND month IS NOT NULL
+GROUP BY area_name, year, month;
+
+-- Agregação: Crimes por Tipo e Ano
+CREATE TABLE gold.agg_crime_year (
+    crime_description TEXT,
+    crime_category TEXT,
+    year BIGINT,
+    total_crimes BIGINT,
+    avg_victim_age DOUBLE PRECISION
+);
+
+INSERT INTO gold.agg_crime_year
+SELECT
+    crime_description,
+    crime_category,
+    year,
+    COUNT(crime_id),
+    AVG(victim_age)::double precision
+FROM silver.crimes
+WHERE crime_description IS NOT NULL AND crime_category IS NOT NULL AND year IS NOT NULL
+GROUP BY crime_description, crime_category, year;
+
+-- ============================================
+-- AGREGAÇÕES DOS DASHBOARDS
+-- ============================================
+-- Tabelas declaradas no ddl.sql (com chave primária): apenas esvaziadas. As três
+-- saem de uma única leitura da fato com GROUPING SETS, e GROUPING(sk_area,
+-- sk_crime_type) identifica o conjunto (1 = área/período, 2 = tipo/ano, 3 = grade).
+TRUNCATE gold.agg_crimes_area_period, gold.agg_crimes_type_year, gold.agg_crime_hotspots;
+
+CREATE TEMP TABLE dashboard_groups ON COMMIT DROP AS
+SELECT
+    GROUPING(f.sk_area, f.sk_crime_type) AS grouping_set,
+    f.sk_area,
+    f.sk_crime_type,
+    s.year,
+    s.month,
+    dt.period_of_day,
+    ROUND(f.latitude::numeric, 2) AS grid_lat,
+    ROUND(f.longitude::numeric, 2) AS grid_lon,
+    COUNT(*) AS total_crimes,
+    COALESCE(SUM(f.is_violent::int), 0) AS violent_crimes,
+    COALESCE(SUM((s.crime_category = 'Property Crime')::int), 0) AS property_crimes,
+    ROUND(AVG(s.victim_age), 2) AS avg_victim_age,
+    COALESCE(SUM((EXTRACT(ISODOW FROM s.date_occurred) < 6)::int), 0) AS weekday_crimes,
+    COALESCE(SUM((EXTRACT(ISODOW FROM s.date_occurred) >= 6)::int), 0) AS weekend_crimes
+FROM gold.fato_crimes f
+JOIN silver.crimes s ON s.crime_id = f.nk_crime_id AND s.year = f.year
+JOIN gold.dim_time dt ON dt.sk_time = f.sk_time
+GROUP BY GROUPING SETS (
+    (f.sk_area, s.year, s.month, dt.period_of_day),
+    (f.sk_crime_type, s.year),
+    (ROUND(f.latitude::numeric, 2), ROUND(f.longitude::numeric, 2), s.year)
+);
+
+-- Agregação: Crimes por Área e Período
+INSERT INTO gold.agg_crimes_area_period (sk_area, year, month, period_of_day, total_crimes, violent_crimes, property_crimes, avg_victim_age)
+SELECT sk_area, year, month, period_of_day, total_crimes, violent_crimes, property_crimes, avg_victim_age
+FROM dashboard_groups
+WHERE grouping_set = 1 AND sk_area IS NOT NULL AND year IS NOT NULL AND month IS NOT NULL AND period_of_day IS NOT NULL;
+
+-- Agregação: Crimes por Tipo e Ano
+INSERT INTO gold.agg_crimes_type_year (sk_crime_type, year, total_crimes, weekday_crimes, weekend_crimes)
+SELECT sk_crime_type, year, total_crimes, weekday_crimes, weekend_crimes
+FROM dashboard_groups
+WHERE grouping_set = 2 AND sk_crime_type IS NOT NULL AND year IS NOT NULL;
+
+-- Agregação: Hotspots Geográficos (grade de 0,01°, nível pelos percentis do ano)
+INSERT INTO gold.agg_crime_hotspots (grid_lat, grid_lon, year, total_crimes, violent_crimes)
+SELECT grid_lat, grid_lon, year, total_crimes, violent_crimes
+FROM dashboard_groups
+WHERE grouping_set = 3 AND grid_lat IS NOT NULL AND grid_lon IS NOT NULL AND year IS NOT NULL;
+
+UPDATE gold.agg_crime_hotspots h
+SET hotspot_level = CASE
+    WHEN h.total_crimes >= p.p90 THEN 'Hotspot Crítico'
+    WHEN h.total_crimes >= p.p75 THEN 'Hotspot Alto'
+    WHEN h.total_crimes >= p.p50 THEN 'Hotspot Médio'
+    ELSE 'Área Normal'
+END
+FROM (
+    SELECT
+        year,
+        PERCENTILE_CONT(0.9) WITHIN GROUP (ORDER BY total_crimes) AS p90,
+        PERCENTILE_CONT(0.75) WITHIN GROUP (ORDER BY total_crimes) AS p75,
+        PERCENTILE_CONT(0.5) WITHIN GROUP (ORDER BY total_crimes) AS p50
+    FROM gold.agg_crime_hotspots
+    GROUP BY year
+) p
+WHERE h.year = p.year;
+
+-- Agregação: Hotspots por célula da grade quadkey (níveis de GRID_ZOOMS em spatial_grid.py)
+TRUNCATE gold.agg_grid_hotspots;
+
+INSERT INTO gold.agg_grid_hotspots (zoom, cell_key, year, total_crimes, violent_crimes)
+SELECT
+    z.zoom,
+    f.grid_key >> (2 * (20 - z.zoom)),
+    f.year,
+    COUNT(*),
+    COALESCE(SUM(f.is_violent::int), 0)
+FROM gold.fato_crimes f
+CROSS JOIN (VALUES (12), (14), (16)) AS z(zoom)
+WHERE f.grid_key IS NOT NULL
+GROUP BY z.zoom, f.grid_key >> (2 * (20 - z.zoom)), f.year;
+
+ANALYZE gold.dim_date;
+ANALYZE gold.dim_time;
+ANALYZE gold.dim_area;
+ANALYZE gold.dim_crime_type;
+ANALYZE gold.dim_victim;
+ANALYZE gold.fato_crimes;
+ANALYZE gold.agg_area_month;
+ANALYZE gold.agg_crime_year;
+ANALYZE gold.agg_crimes_area_period;
+ANALYZE gold.agg_crimes_type_year;
+ANALYZE gold.agg_crime_hotspots;
+ANALYZE gold.agg_grid_hotspots
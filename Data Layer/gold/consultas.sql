@@ -30,17 +30,17 @@ ORDER BY total_ocorrencias DESC;
 
 -- ============================================
 -- 3. Análise temporal - Crimes por ano e mês
+-- (servida por gold.agg_crimes_area_period, sem varrer a fato)
 -- ============================================
 SELECT 
-    dd.year,
-    dd.month,
-    dd.month_name,
-    COUNT(*) as total_crimes,
-    SUM(CASE WHEN fc.is_violent THEN 1 ELSE 0 END) as violent_crimes
-FROM gold.fato_crimes fc
-JOIN gold.dim_date dd ON fc.sk_date = dd.sk_date
-GROUP BY dd.year, dd.month, dd.month_name
-ORDER BY dd.year, dd.month;
+    ap.year,
+    ap.month,
+    to_char(make_date(ap.year, ap.month, 1), 'FMMonth') as month_name,
+    SUM(ap.total_crimes) as total_crimes,
+    SUM(ap.violent_crimes) as violent_crimes
+FROM gold.agg_crimes_area_period ap
+GROUP BY ap.year, ap.month
+ORDER BY ap.year, ap.month;
 
 -- ============================================
 -- 4. Crimes por período do dia
@@ -83,14 +83,17 @@ ORDER BY total_vitimas DESC;
 
 -- ============================================
 -- 7. Crimes em finais de semana vs dias úteis
+-- (servida por gold.agg_crimes_type_year)
 -- ============================================
 SELECT 
-    dd.is_weekend,
-    COUNT(*) as total_crimes,
-    ROUND(COUNT(*) * 100.0 / SUM(COUNT(*)) OVER(), 2) as percentual
-FROM gold.fato_crimes fc
-JOIN gold.dim_date dd ON fc.sk_date = dd.sk_date
-GROUP BY dd.is_weekend;
+    w.is_weekend,
+    w.total_crimes,
+    ROUND(w.total_crimes * 100.0 / SUM(w.total_crimes) OVER(), 2) as percentual
+FROM (
+    SELECT FALSE as is_weekend, SUM(weekday_crimes) as total_crimes FROM gold.agg_crimes_type_year
+    UNION ALL
+    SELECT TRUE, SUM(weekend_crimes) FROM gold.agg_crimes_type_year
+) w;
 
 -- ============================================
 -- 8. Locais mais perigosos (Premises)
@@ -108,28 +111,28 @@ LIMIT 20;
 
 -- ============================================
 -- 9. Mapa de calor - Crimes por localização
+-- (servida por gold.agg_crime_hotspots, grade de 0,01°)
 -- ============================================
 SELECT 
-    ROUND(fc.latitude::numeric, 2) as lat_group,
-    ROUND(fc.longitude::numeric, 2) as lon_group,
-    COUNT(*) as total_crimes
-FROM gold.fato_crimes fc
-WHERE fc.latitude IS NOT NULL AND fc.longitude IS NOT NULL
-GROUP BY ROUND(fc.latitude::numeric, 2), ROUND(fc.longitude::numeric, 2)
+    hs.grid_lat as lat_group,
+    hs.grid_lon as lon_group,
+    SUM(hs.total_crimes) as total_crimes
+FROM gold.agg_crime_hotspots hs
+GROUP BY hs.grid_lat, hs.grid_lon
 ORDER BY total_crimes DESC;
 
 -- ============================================
 -- 10. Tendência anual de crimes violentos
+-- (servida por gold.agg_crimes_area_period)
 -- ============================================
 SELECT
-    dd.year,
-    COUNT(*) as total_crimes,
-    SUM(CASE WHEN fc.is_violent THEN 1 ELSE 0 END) as violent_crimes,
-    ROUND(SUM(CASE WHEN fc.is_violent THEN 1 ELSE 0 END) * 100.0 / COUNT(*), 2) as pct_violent
-FROM gold.fato_crimes fc
-JOIN gold.dim_date dd ON fc.sk_date = dd.sk_date
-GROUP BY dd.year
-ORDER BY dd.year;
+    ap.year,
+    SUM(ap.total_crimes) as total_crimes,
+    SUM(ap.violent_crimes) as violent_crimes,
+    ROUND(SUM(ap.violent_crimes) * 100.0 / SUM(ap.total_crimes), 2) as pct_violent
+FROM gold.agg_crimes_area_period ap
+GROUP BY ap.year
+ORDER BY ap.year;
 
 -- ============================================
 -- 11. Áreas com crimes acima da média (SUBQUERY)
@@ -355,3 +358,37 @@ SELECT
     END as trend
 FROM growth_calculation
 ORDER BY region, year;
+
+-- ============================================
+-- 17. Top 10 células da grade quadkey (nível 16, ~500 m) no ano mais recente
+-- (idx_agg_grid_hotspots_rank atende o ORDER BY ... LIMIT, limites e centro
+-- de cada célula: spatial_grid.py top)
+-- ============================================
+SELECT
+    g.cell_key,
+    g.total_crimes,
+    g.violent_crimes,
+    ROUND(g.violent_crimes * 100.0 / g.total_crimes, 2) as violent_rate
+FROM gold.agg_grid_hotspots g
+WHERE g.zoom = 16
+  AND g.year = (SELECT MAX(year) FROM gold.agg_grid_hotspots)
+ORDER BY g.total_crimes DESC
+LIMIT 10;
+
+-- ============================================
+-- 18. Crimes por área e mês nos dois últimos anos (poda de partições)
+-- (o filtro em fc.year, a chave de partição da fato, restringe a leitura às
+-- partições gold.fato_crimes_<ano> desses anos)
+-- ============================================
+SELECT
+    fc.year,
+    dd.month,
+    da.area_name,
+    COUNT(*) as total_crimes,
+    SUM(CASE WHEN fc.is_violent THEN 1 ELSE 0 END) as violent_crimes
+FROM gold.fato_crimes fc
+JOIN gold.dim_date dd ON fc.sk_date = dd.sk_date
+JOIN gold.dim_area da ON fc.sk_area = da.sk_area
+WHERE fc.year >= (SELECT MAX(year) - 1 FROM gold.dim_date)
+GROUP BY fc.year, dd.month, da.area_name
+ORDER BY fc.year, dd.month, total_crimes DESC;
@@ -91,21 +91,31 @@ CREATE TABLE IF NOT EXISTS gold.dim_victim (
 -- ============================================
 -- FATO: Crimes (criar depois das dimensões)
 -- ============================================
+-- Mesmas colunas gravadas pelo ETL (build_fato / build_gold.sql), particionada
+-- pelo ano de ocorrência (gold.fato_crimes_<ano>, criadas pelo ETL) para que
+-- filtros por year podem as partições. A carga completa apenas esvazia a tabela:
+-- partições e índices são mantidos. Sem chaves estrangeiras: as dimensões são
+-- recriadas a cada carga completa.
+-- grid_key: célula da grade espacial (quadkey de nível 20 em código de Morton, ver spatial_grid.py)
 CREATE TABLE IF NOT EXISTS gold.fato_crimes (
-    sk_crime SERIAL PRIMARY KEY,
+    sk_crime BIGINT NOT NULL,
     nk_crime_id BIGINT NOT NULL,
-    sk_area INTEGER REFERENCES gold.dim_area(sk_area),
-    sk_crime_type INTEGER REFERENCES gold.dim_crime_type(sk_crime_type),
-    sk_weapon INTEGER REFERENCES gold.dim_weapon(sk_weapon),
-    sk_premise INTEGER REFERENCES gold.dim_premise(sk_premise),
-    sk_date INTEGER REFERENCES gold.dim_date(sk_date),
-    sk_time INTEGER REFERENCES gold.dim_time(sk_time),
-    sk_victim INTEGER REFERENCES gold.dim_victim(sk_victim),
-    latitude DECIMAL(10, 6),
-    longitude DECIMAL(10, 6),
+    sk_date BIGINT,
+    sk_time BIGINT,
+    sk_area BIGINT,
+    sk_crime_type BIGINT,
+    sk_victim BIGINT,
+    latitude DOUBLE PRECISION,
+    longitude DOUBLE PRECISION,
+    grid_key BIGINT,
     is_violent BOOLEAN,
-    created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
-);
+    has_weapon BOOLEAN,
+    case_closed BOOLEAN,
+    year INTEGER NOT NULL,
+    PRIMARY KEY (sk_crime, year)
+) PARTITION BY RANGE (year);
+
+CREATE TABLE IF NOT EXISTS gold.fato_crimes_default PARTITION OF gold.fato_crimes DEFAULT;
 
 -- ============================================
 -- AGREGAÇÕES PARA DASHBOARDS
@@ -145,10 +155,117 @@ CREATE TABLE IF NOT EXISTS gold.agg_crime_hotspots (
     PRIMARY KEY (grid_lat, grid_lon, year)
 );
 
+-- Agregação: Hotspots por célula da grade quadkey (níveis 12, 14 e 16)
+-- cell_key = grid_key >> 2 * (20 - zoom): cada célula é um intervalo de grid_key
+CREATE TABLE IF NOT EXISTS gold.agg_grid_hotspots (
+    zoom SMALLINT,
+    cell_key BIGINT,
+    year INTEGER,
+    total_crimes INTEGER,
+    violent_crimes INTEGER,
+    PRIMARY KEY (zoom, cell_key, year)
+);
+
+-- ============================================
+-- SKETCHES PARA RESPOSTAS APROXIMADAS
+-- ============================================
+
+-- Sketches combináveis por área, ano e mês (Transformer/crime_sketches.py), um por
+-- métrica (crime_types, weapons, premises, hotspot_cells): HyperLogLog para
+-- contagens distintas, Count-Min para frequências e os itens mais frequentes do
+-- grupo (candidates, JSON [[item, contagem], ...]) para o top-K.
+-- hll / cms: arrays NumPy serializados e comprimidos (zlib)
+CREATE TABLE IF NOT EXISTS gold.agg_sketches (
+    sk_area BIGINT NOT NULL,
+    year INTEGER NOT NULL,
+    month INTEGER NOT NULL,
+    metric VARCHAR(30) NOT NULL,
+    items BIGINT NOT NULL,
+    hll BYTEA NOT NULL,
+    cms BYTEA NOT NULL,
+    candidates TEXT NOT NULL,
+    PRIMARY KEY (sk_area, year, month, metric)
+);
+
+-- Amostra dos fatos por área, ano e mês: os N fatos de menor prioridade (hash de
+-- nk_crime_id). A união das amostras de vários grupos, cortada nas N menores
+-- prioridades, é uma amostra uniforme dos fatos desses grupos
+CREATE TABLE IF NOT EXISTS gold.agg_sketch_sample (
+    sk_area BIGINT NOT NULL,
+    year INTEGER NOT NULL,
+    month INTEGER NOT NULL,
+    priority BIGINT NOT NULL,
+    nk_crime_id BIGINT NOT NULL,
+    sk_crime BIGINT,
+    sk_date BIGINT,
+    sk_time BIGINT,
+    sk_crime_type BIGINT,
+    sk_victim BIGINT,
+    latitude DOUBLE PRECISION,
+    longitude DOUBLE PRECISION,
+    grid_key BIGINT,
+    is_violent BOOLEAN,
+    has_weapon BOOLEAN,
+    case_closed BOOLEAN,
+    PRIMARY KEY (sk_area, year, month, nk_crime_id)
+);
+
+-- ============================================
+-- CONTROLE DE CARGA INCREMENTAL
+-- ============================================
+
+-- Watermark: maior silver.crimes.collected_at já publicado na Gold
+CREATE TABLE IF NOT EXISTS gold.etl_watermark (
+    pipeline VARCHAR(50) PRIMARY KEY,
+    last_collected_at TIMESTAMP,
+    rows_processed INTEGER,
+    updated_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+);
+
+-- Versão dos dados publicados na Gold: incrementada ao fim de cada carga e usada
+-- como parte da chave do cache de consultas (Transformer/query_service.py)
+CREATE TABLE IF NOT EXISTS gold.data_version (
+    id SMALLINT PRIMARY KEY DEFAULT 1 CHECK (id = 1),
+    version BIGINT NOT NULL,
+    updated_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+);
+
+-- Métricas de execução do ETL (uma linha por execução e uma por estágio)
+CREATE TABLE IF NOT EXISTS gold.etl_runs (
+    run_id VARCHAR(40) PRIMARY KEY,
+    pipeline VARCHAR(50) NOT NULL,
+    status VARCHAR(20) NOT NULL,
+    started_at TIMESTAMP NOT NULL,
+    finished_at TIMESTAMP,
+    wall_seconds DOUBLE PRECISION,
+    cpu_seconds DOUBLE PRECISION,
+    peak_rss_mb DOUBLE PRECISION,
+    config TEXT
+);
+
+CREATE TABLE IF NOT EXISTS gold.etl_stage_metrics (
+    run_id VARCHAR(40) NOT NULL REFERENCES gold.etl_runs(run_id) ON DELETE CASCADE,
+    stage_order INTEGER NOT NULL,
+    stage VARCHAR(100) NOT NULL,
+    calls INTEGER,
+    wall_seconds DOUBLE PRECISION,
+    cpu_seconds DOUBLE PRECISION,
+    peak_rss_mb DOUBLE PRECISION,
+    rss_growth_mb DOUBLE PRECISION,
+    tracemalloc_peak_mb DOUBLE PRECISION,
+    rows_in BIGINT,
+    rows_out BIGINT,
+    PRIMARY KEY (run_id, stage_order)
+);
+
 -- ============================================
 -- ÍNDICES
 -- ============================================
 CREATE INDEX IF NOT EXISTS idx_fato_crimes_date ON gold.fato_crimes(sk_date);
 CREATE INDEX IF NOT EXISTS idx_fato_crimes_area ON gold.fato_crimes(sk_area);
 CREATE INDEX IF NOT EXISTS idx_fato_crimes_type ON gold.fato_crimes(sk_crime_type);
-CREATE INDEX IF NOT EXISTS idx_fato_crimes_violent ON gold.fato_crimes(is_violent);
+-- Troca das linhas alteradas na carga incremental (DELETE por nk_crime_id)
+CREATE INDEX IF NOT EXISTS idx_fato_crimes_nk ON gold.fato_crimes(nk_crime_id);
+CREATE INDEX IF NOT EXISTS idx_fato_crimes_grid ON gold.fato_crimes(grid_key);
+-- Top-K de células por nível e ano direto pelo índice (ORDER BY total_crimes DESC LIMIT k)
+CREATE INDEX IF NOT EXISTS idx_agg_grid_hotspots_rank ON gold.agg_grid_hotspots(zoom, year, total_crimes DESC);
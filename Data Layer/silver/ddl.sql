@@ -7,11 +7,14 @@
 CREATE SCHEMA IF NOT EXISTS silver;
 
 -- Tabela principal de crimes (dados limpos e normalizados)
+-- Particionada por ano de ocorrência: uma partição por ano (silver.crimes_<ano>),
+-- criada pelo ETL antes de gravar o ano (table_partitions.py), e a DEFAULT
 CREATE TABLE IF NOT EXISTS silver.crimes (
-    crime_id BIGINT PRIMARY KEY,
+    crime_id BIGINT NOT NULL,
     date_reported TIMESTAMP NOT NULL,
     date_occurred TIMESTAMP NOT NULL,
     time_occurred INTEGER,
+    occurred_at TIMESTAMP,
     hour INTEGER,
     day_of_week INTEGER,
     day_name VARCHAR(15),
@@ -43,10 +46,61 @@ CREATE TABLE IF NOT EXISTS silver.crimes (
     latitude DECIMAL(10, 6),
     longitude DECIMAL(10, 6),
     location VARCHAR(255),
-    year INTEGER,
+    year INTEGER NOT NULL,
     month INTEGER,
     quarter INTEGER,
-    collected_at TIMESTAMP
+    collected_at TIMESTAMP,
+    source_hash BIGINT,
+    grid_key BIGINT,
+    PRIMARY KEY (crime_id, year)
+) PARTITION BY RANGE (year);
+
+CREATE TABLE IF NOT EXISTS silver.crimes_default PARTITION OF silver.crimes DEFAULT;
+
+-- Hash das colunas Raw de origem (detecção de alterações na carga incremental)
+ALTER TABLE silver.crimes ADD COLUMN IF NOT EXISTS source_hash BIGINT;
+
+-- Data + hora da ocorrência (DATE OCC + TIME OCC)
+ALTER TABLE silver.crimes ADD COLUMN IF NOT EXISTS occurred_at TIMESTAMP;
+
+-- Célula da grade espacial (quadkey de nível 20 em código de Morton, ver spatial_grid.py)
+ALTER TABLE silver.crimes ADD COLUMN IF NOT EXISTS grid_key BIGINT;
+
+-- Controle de carga incremental (watermark por pipeline)
+CREATE TABLE IF NOT EXISTS silver.etl_watermark (
+    pipeline VARCHAR(50) PRIMARY KEY,
+    last_date_reported TIMESTAMP,
+    source_file_hash CHAR(64),
+    rows_upserted INTEGER,
+    updated_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+);
+
+-- Métricas de execução do ETL (uma linha por execução e uma por estágio)
+CREATE TABLE IF NOT EXISTS silver.etl_runs (
+    run_id VARCHAR(40) PRIMARY KEY,
+    pipeline VARCHAR(50) NOT NULL,
+    status VARCHAR(20) NOT NULL,
+    started_at TIMESTAMP NOT NULL,
+    finished_at TIMESTAMP,
+    wall_seconds DOUBLE PRECISION,
+    cpu_seconds DOUBLE PRECISION,
+    peak_rss_mb DOUBLE PRECISION,
+    config TEXT
+);
+
+CREATE TABLE IF NOT EXISTS silver.etl_stage_metrics (
+    run_id VARCHAR(40) NOT NULL REFERENCES silver.etl_runs(run_id) ON DELETE CASCADE,
+    stage_order INTEGER NOT NULL,
+    stage VARCHAR(100) NOT NULL,
+    calls INTEGER,
+    wall_seconds DOUBLE PRECISION,
+    cpu_seconds DOUBLE PRECISION,
+    peak_rss_mb DOUBLE PRECISION,
+    rss_growth_mb DOUBLE PRECISION,
+    tracemalloc_peak_mb DOUBLE PRECISION,
+    rows_in BIGINT,
+    rows_out BIGINT,
+    PRIMARY KEY (run_id, stage_order)
 );
 
 -- Tabela de dimensão: Áreas
@@ -84,12 +138,15 @@ CREATE TABLE IF NOT EXISTS silver.dim_premises (
 );
 
 -- Índices para performance
-CREATE INDEX IF NOT EXISTS idx_crimes_date ON silver.crimes(date_occurred);
+-- BRIN nas datas: cada partição é gravada em ordem de date_occurred e
+-- collected_at só cresce entre cargas (filtro da carga incremental da Gold).
+-- is_violent e hour (2 e 24 valores) não têm índice: um B-tree não seria usado
+CREATE INDEX IF NOT EXISTS idx_crimes_date ON silver.crimes USING BRIN (date_occurred);
+CREATE INDEX IF NOT EXISTS idx_crimes_collected ON silver.crimes USING BRIN (collected_at);
 CREATE INDEX IF NOT EXISTS idx_crimes_area ON silver.crimes(area_code);
 CREATE INDEX IF NOT EXISTS idx_crimes_type ON silver.crimes(crime_code);
 CREATE INDEX IF NOT EXISTS idx_crimes_location ON silver.crimes(latitude, longitude);
-CREATE INDEX IF NOT EXISTS idx_crimes_violent ON silver.crimes(is_violent);
-CREATE INDEX IF NOT EXISTS idx_crimes_hour ON silver.crimes(hour);
+CREATE INDEX IF NOT EXISTS idx_crimes_grid ON silver.crimes(grid_key);
 
 -- View para análise temporal
 CREATE OR REPLACE VIEW silver.vw_crimes_temporal AS